@@ -0,0 +1,178 @@
+"""
+アドミッション制御
+同時実行数・待ち行列の上限とクライアントごとのトークンバケットで受け付けを制御し、
+過負荷時はタイムアウトを待たせずに即座に拒否する（429 + Retry-After）
+"""
+
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+
+class AdmissionRejected(Exception):
+    """受け付け拒否（reason: rate_limit / queue_full / wait_too_long）"""
+
+    def __init__(self, reason: str, retry_after: float, message: str):
+        super().__init__(message)
+        self.reason = reason
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After ヘッダー値（秒、切り上げ）"""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """トークンバケット（rate 個/秒で補充、最大 capacity 個）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> float:
+        """トークンを消費（成功時は0、不足時は補充までの待ち秒数を返す）"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+
+class AdmissionController:
+    """
+    アドミッション制御（イベントループ上でのみ使用する）
+
+    - 同時に処理するリクエストは max_concurrent 件まで、それ以上は待ち行列に入る
+    - 待ち行列が max_queue 件に達している、または推定待ち時間が max_wait_seconds を
+      超える場合は即座に拒否する（推定待ち時間は処理時間の指数移動平均から算出）
+    - client_rate > 0 の場合、クライアントごとにトークンバケットで流量を制限する
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = 4,
+        max_queue: int = 32,
+        max_wait_seconds: float = 5.0,
+        client_rate: float = 0.0,
+        client_burst: float = 0.0,
+        max_clients: int = 10000
+    ):
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_seconds = max_wait_seconds
+        self.client_rate = client_rate
+        self.client_burst = client_burst or max(1.0, client_rate * 2)
+        self.max_clients = max_clients
+
+        self.active = 0
+        self.waiting = 0
+        self.avg_service_seconds = 0.0
+        self.admitted = 0
+        self.rejected: Dict[str, int] = {"rate_limit": 0, "queue_full": 0, "wait_too_long": 0}
+
+        self._semaphore = asyncio.Semaphore(self.max_concurrent)
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def estimated_wait(self) -> float:
+        """新しいリクエストの推定待ち時間（秒）"""
+        if self.active < self.max_concurrent:
+            return 0.0
+        return (self.waiting + 1) / self.max_concurrent * self.avg_service_seconds
+
+    def _check_rate(self, client_id: str, cost: float) -> float:
+        """クライアントのトークンを消費（不足時は待ち秒数）"""
+        if self.client_rate <= 0:
+            return 0.0
+        bucket = self._buckets.get(client_id)
+        if bucket is None:
+            bucket = self._buckets[client_id] = TokenBucket(self.client_rate, self.client_burst)
+            # 古いクライアントから破棄してメモリを一定に保つ
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(client_id)
+        return bucket.take(min(cost, self.client_burst))
+
+    def _reject(self, reason: str, retry_after: float, message: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        return AdmissionRejected(reason, retry_after, message)
+
+    @asynccontextmanager
+    async def slot(self, client_id: str, cost: float = 1.0) -> AsyncIterator[None]:
+        """
+        処理枠を確保（確保できない場合は AdmissionRejected を送出）
+
+        cost はトークンバケットから消費する量（一括リクエストでは件数）。
+        """
+        retry_after = self._check_rate(client_id, cost)
+        if retry_after > 0:
+            raise self._reject("rate_limit", retry_after, "リクエスト数が制限を超えています")
+
+        if self.active >= self.max_concurrent:
+            if self.waiting >= self.max_queue:
+                raise self._reject(
+                    "queue_full", max(self.estimated_wait(), 1.0),
+                    "サーバーが混雑しています（待ち行列が満杯です）"
+                )
+            wait = self.estimated_wait()
+            if wait > self.max_wait_seconds:
+                raise self._reject(
+                    "wait_too_long", wait,
+                    f"サーバーが混雑しています（推定待ち時間 {wait:.1f}秒）"
+                )
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        self.admitted += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.active -= 1
+            self._semaphore.release()
+            # 処理時間の指数移動平均（推定待ち時間の算出用）
+            if self.avg_service_seconds == 0.0:
+                self.avg_service_seconds = elapsed
+            else:
+                self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * elapsed
+
+    def stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "avg_service_seconds": self.avg_service_seconds,
+            "estimated_wait_seconds": self.estimated_wait(),
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected)
+        }
+
+
+def client_identifier(headers: Dict[str, str], remote: Optional[str], trust_proxy: bool = False) -> str:
+    """
+    レート制限に使うクライアント識別子
+
+    trust_proxy が有効な場合は X-Forwarded-For の先頭（元のクライアント）を使う。
+    プロキシ配下でない環境で有効にするとヘッダー偽装で制限を回避できるため注意。
+    """
+    if trust_proxy:
+        forwarded = headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return remote or "unknown"
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Word Association API 負荷ベンチマーク
+指定した同時実行数とリクエスト構成でAPIに負荷をかけ、スループットと
+レイテンシ分位点（p50/p95/p99）を計測する。結果はJSONのベースラインとして
+保存し、後の実行と比較して性能劣化を検出できる。
+
+実行方法:
+    # プロセス内（ASGI）で起動したアプリを計測
+    python bench_api.py --concurrency 1 8 32 --requests 500
+
+    # 起動済みサーバーを計測
+    python bench_api.py --url http://localhost:8080
+
+    # ベースラインの保存と比較
+    python bench_api.py --save baseline.json
+    python bench_api.py --compare baseline.json --tolerance 0.1
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import platform
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+# 既定のホットキーワード（繰り返し要求されキャッシュに載る語）
+DEFAULT_HOT_KEYWORDS = ["犬", "猫", "東京", "音楽", "科学"]
+# URL指定時の既定のコールドキーワード（プロセス内実行時は語彙から抽出）
+DEFAULT_COLD_KEYWORDS = [
+    "山", "川", "海", "空", "花", "鳥", "車", "電車", "学校", "病院",
+    "野球", "サッカー", "映画", "小説", "料理", "経済", "政治", "歴史", "数学", "宇宙"
+]
+
+
+def parse_weights(spec: str) -> Dict[int, float]:
+    """'2:0.4,3:0.3,4:0.2,5:0.1' 形式の世代数の重みを解析"""
+    weights = {}
+    for item in spec.split(","):
+        generation, _, weight = item.partition(":")
+        weights[int(generation)] = float(weight or 1)
+    return weights
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    """昇順に並んだ値の分位点（nearest-rank法）"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, math.ceil(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    """レイテンシの統計値（ミリ秒）"""
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "mean_ms": sum(values) / len(values) * 1000 if values else 0.0,
+        "p50_ms": percentile(values, 50) * 1000,
+        "p95_ms": percentile(values, 95) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": values[-1] * 1000 if values else 0.0
+    }
+
+
+class RequestMix:
+    """リクエスト構成（世代数・閾値・ホット/コールドキーワードの比率）"""
+
+    def __init__(
+        self,
+        generations: Dict[int, float],
+        thresholds: List[float],
+        hot_keywords: List[str],
+        cold_keywords: List[str],
+        hot_ratio: float = 0.8,
+        seed_ratio: float = 0.0
+    ):
+        self.generations = list(generations)
+        self.generation_weights = [generations[g] for g in self.generations]
+        self.thresholds = thresholds
+        self.hot_keywords = hot_keywords
+        self.cold_keywords = cold_keywords or hot_keywords
+        self.hot_ratio = hot_ratio
+        self.seed_ratio = seed_ratio
+
+    def make_request(self, rng: random.Random) -> Dict[str, Any]:
+        """1リクエスト分のボディを作成"""
+        hot = rng.random() < self.hot_ratio
+        request = {
+            "keyword": rng.choice(self.hot_keywords if hot else self.cold_keywords),
+            "generation": rng.choices(self.generations, self.generation_weights)[0],
+            "threshold": rng.choice(self.thresholds)
+        }
+        if rng.random() < self.seed_ratio:
+            # seed付きリクエストはレスポンスキャッシュの対象になる
+            request["seed"] = rng.randrange(8)
+        return request
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "generations": dict(zip(self.generations, self.generation_weights)),
+            "thresholds": self.thresholds,
+            "hot_keywords": len(self.hot_keywords),
+            "cold_keywords": len(self.cold_keywords),
+            "hot_ratio": self.hot_ratio,
+            "seed_ratio": self.seed_ratio
+        }
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    mix: RequestMix,
+    concurrency: int,
+    total_requests: int,
+    seed: int = 0
+) -> Dict[str, Any]:
+    """同時実行数 concurrency で total_requests 件のリクエストを送信して計測"""
+    rng = random.Random(seed)
+    requests = [mix.make_request(rng) for _ in range(total_requests)]
+    latencies: List[float] = []
+    by_generation: Dict[int, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(requests):
+            request = requests[next_index]
+            next_index += 1
+
+            started = time.perf_counter()
+            try:
+                response = await client.post("/api/v1/associate", json=request)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            elapsed = time.perf_counter() - started
+
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies.append(elapsed)
+                by_generation.setdefault(request["generation"], []).append(elapsed)
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+
+    errors = sum(count for status, count in statuses.items() if status != "200")
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "seconds": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "errors": errors,
+        "statuses": statuses,
+        "latency": summarize_latencies(latencies),
+        "by_generation": {
+            str(g): summarize_latencies(values) for g, values in sorted(by_generation.items())
+        }
+    }
+
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float
+) -> List[str]:
+    """ベースラインと比較し、許容範囲を超えて劣化した項目を返す"""
+    regressions = []
+    baseline_runs = {run["concurrency"]: run for run in baseline.get("runs", [])}
+
+    for run in current["runs"]:
+        base = baseline_runs.get(run["concurrency"])
+        if base is None:
+            continue
+        label = f"同時実行数 {run['concurrency']}"
+
+        if run["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(
+                f"{label}: スループット {base['throughput_rps']:.1f} -> {run['throughput_rps']:.1f} req/s"
+            )
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if run["latency"][key] > base["latency"][key] * (1 + tolerance):
+                regressions.append(
+                    f"{label}: {key} {base['latency'][key]:.1f} -> {run['latency'][key]:.1f} ms"
+                )
+        if run["errors"] > base["errors"]:
+            regressions.append(f"{label}: エラー数 {base['errors']} -> {run['errors']}")
+
+    return regressions
+
+
+def print_run(run: Dict[str, Any]) -> None:
+    """1回分の結果を表示"""
+    latency = run["latency"]
+    print(
+        f"⚡ 同時実行数 {run['concurrency']:>3}: {run['throughput_rps']:8.1f} req/s | "
+        f"p50 {latency['p50_ms']:7.1f}ms  p95 {latency['p95_ms']:7.1f}ms  "
+        f"p99 {latency['p99_ms']:7.1f}ms | エラー {run['errors']}"
+    )
+    for generation, stats in run["by_generation"].items():
+        print(
+            f"     世代数{generation}: {stats['count']:>5}件  "
+            f"p50 {stats['p50_ms']:7.1f}ms  p95 {stats['p95_ms']:7.1f}ms  p99 {stats['p99_ms']:7.1f}ms"
+        )
+    if run["errors"]:
+        print(f"     ステータス内訳: {run['statuses']}")
+
+
+@asynccontextmanager
+async def open_client(url: Optional[str], timeout: float):
+    """
+    計測対象へのクライアントを作成
+
+    URL未指定時はアプリをプロセス内で起動し（モデル読み込みを含むlifespanを実行）、
+    ASGI経由で直接呼び出す。ネットワークを介さないため、サーバー側の処理時間に
+    近い値が得られる（クライアントと同じイベントループを共有する点に注意）。
+    """
+    if url:
+        async with httpx.AsyncClient(base_url=url, timeout=timeout) as client:
+            await wait_until_ready(client)
+            yield client, None
+        return
+
+    import main
+
+    async with main.app.router.lifespan_context(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as client:
+            await wait_until_ready(client)
+            yield client, main.registry.get()
+
+
+async def wait_until_ready(client: httpx.AsyncClient, timeout: float = 1800.0) -> None:
+    """モデルの準備（バックグラウンド読み込み・ウォームアップ）が終わるまで待機"""
+    deadline = time.monotonic() + timeout
+    last_phase = None
+    while True:
+        response = await client.get("/api/v1/health/ready")
+        if response.status_code == 200:
+            return
+        status = response.json()
+        if status.get("phase") == "failed":
+            raise RuntimeError(f"モデルの準備に失敗しました: {status.get('error')}")
+        if status.get("phase") != last_phase:
+            last_phase = status.get("phase")
+            print(f"⏳ モデル準備中: {last_phase}")
+        if time.monotonic() > deadline:
+            raise RuntimeError("モデルの準備が完了しませんでした（タイムアウト）")
+        await asyncio.sleep(0.5)
+
+
+def sample_cold_keywords(model, count: int, exclude: List[str], seed: int) -> List[str]:
+    """語彙からコールドキーワードを抽出（プロセス内実行時）"""
+    vocabulary = model.model.index_to_key
+    rng = random.Random(seed)
+    picks = rng.sample(range(len(vocabulary)), min(count + len(exclude), len(vocabulary)))
+    excluded = set(exclude)
+    return [vocabulary[i] for i in picks if vocabulary[i] not in excluded][:count]
+
+
+async def run_benchmark(
+    url: Optional[str] = None,
+    concurrency: List[int] = (1, 8, 32),
+    total_requests: int = 500,
+    warmup: int = 20,
+    mix_options: Optional[Dict[str, Any]] = None,
+    timeout: float = 60.0,
+    seed: int = 0,
+    verbose: bool = True
+) -> Dict[str, Any]:
+    """ベンチマークを実行して結果を返す（test_api.py からも利用）"""
+    options = {
+        "generations": {2: 0.4, 3: 0.3, 4: 0.2, 5: 0.1},
+        "thresholds": [0.3, 0.5, 0.7],
+        "hot_keywords": DEFAULT_HOT_KEYWORDS,
+        "cold_keywords": None,
+        "cold_count": 1000,
+        "hot_ratio": 0.8,
+        "seed_ratio": 0.0,
+        **(mix_options or {})
+    }
+
+    async with open_client(url, timeout) as (client, model):
+        hot_keywords = options["hot_keywords"]
+        cold_keywords = options["cold_keywords"]
+        if model is not None:
+            # モデルに存在しないホットキーワードは除外（404は計測対象外）
+            hot_keywords = [w for w in hot_keywords if model.contains_word(w)] or \
+                sample_cold_keywords(model, len(hot_keywords), [], seed + 1)
+            if cold_keywords is None:
+                cold_keywords = sample_cold_keywords(model, options["cold_count"], hot_keywords, seed)
+        if cold_keywords is None:
+            cold_keywords = DEFAULT_COLD_KEYWORDS
+
+        mix = RequestMix(
+            generations=options["generations"],
+            thresholds=options["thresholds"],
+            hot_keywords=hot_keywords,
+            cold_keywords=cold_keywords,
+            hot_ratio=options["hot_ratio"],
+            seed_ratio=options["seed_ratio"]
+        )
+
+        if warmup:
+            await run_load(client, mix, max(concurrency), warmup, seed=seed + 2)
+
+        runs = []
+        for level in concurrency:
+            run = await run_load(client, mix, level, total_requests, seed=seed)
+            runs.append(run)
+            if verbose:
+                print_run(run)
+
+    return {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "target": url or "in-process",
+        "python": platform.python_version(),
+        "mix": mix.describe(),
+        "runs": runs
+    }
+
+
+async def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Word Association API 負荷ベンチマーク")
+    parser.add_argument("--url", help="計測するAPIのURL（省略時はプロセス内で起動）")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="同時実行数")
+    parser.add_argument("--requests", type=int, default=500, help="同時実行数ごとのリクエスト数")
+    parser.add_argument("--warmup", type=int, default=20, help="計測前のウォームアップリクエスト数")
+    parser.add_argument("--generations", default="2:0.4,3:0.3,4:0.2,5:0.1", help="世代数と重み（例: 2:0.5,5:0.5）")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.3, 0.5, 0.7], help="閾値の候補")
+    parser.add_argument("--hot-keywords", nargs="+", default=DEFAULT_HOT_KEYWORDS, help="ホットキーワード")
+    parser.add_argument("--cold-keywords-file", help="コールドキーワード一覧（1行1語）")
+    parser.add_argument("--hot-ratio", type=float, default=0.8, help="ホットキーワードの割合")
+    parser.add_argument("--seed-ratio", type=float, default=0.0, help="seed付きリクエストの割合")
+    parser.add_argument("--seed", type=int, default=0, help="リクエスト列の乱数シード")
+    parser.add_argument("--timeout", type=float, default=60.0, help="リクエストタイムアウト（秒）")
+    parser.add_argument("--save", help="結果をJSONベースラインとして保存")
+    parser.add_argument("--compare", help="比較するJSONベースライン")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="劣化とみなす変化率（0.1 = 10%%）")
+    args = parser.parse_args()
+
+    cold_keywords = None
+    if args.cold_keywords_file:
+        cold_keywords = [
+            line.strip() for line in Path(args.cold_keywords_file).read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+
+    print("🏁 Word Association API 負荷ベンチマーク")
+    print(f"🎯 対象: {args.url or 'プロセス内（ASGI）'}")
+    print("=" * 50)
+
+    result = await run_benchmark(
+        url=args.url,
+        concurrency=args.concurrency,
+        total_requests=args.requests,
+        warmup=args.warmup,
+        mix_options={
+            "generations": parse_weights(args.generations),
+            "thresholds": args.thresholds,
+            "hot_keywords": args.hot_keywords,
+            "cold_keywords": cold_keywords,
+            "hot_ratio": args.hot_ratio,
+            "seed_ratio": args.seed_ratio
+        },
+        timeout=args.timeout,
+        seed=args.seed
+    )
+    print("=" * 50)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(result, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 ベースラインを保存しました: {args.save}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text(encoding="utf-8"))
+        regressions = compare_results(result, baseline, args.tolerance)
+        if regressions:
+            print(f"❌ ベースライン（{baseline.get('created_at', '?')}）から劣化しています:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            return 1
+        print(f"✅ ベースライン（{baseline.get('created_at', '?')}）から劣化していません")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
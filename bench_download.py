@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+モデルダウンロード ベンチマークスクリプト
+ローカルHTTPサーバーをS3の代わりに使い、並列Rangeダウンロードのスループットと
+中断からの再開・SHA-256検証を確認する
+"""
+
+import argparse
+import asyncio
+import hashlib
+import logging
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+from downloader import RangeDownloader
+
+
+class RangeRequestHandler(BaseHTTPRequestHandler):
+    """Rangeリクエスト対応の静的ファイルハンドラー（S3の代用）"""
+
+    protocol_version = "HTTP/1.1"
+    file_path: Path = None
+    failure_rate: float = 0.0
+    latency: float = 0.0
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_HEAD(self):
+        self.send_response(200)
+        self.send_header("Content-Length", str(self.file_path.stat().st_size))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+    def do_GET(self):
+        size = self.file_path.stat().st_size
+        start, end = 0, size - 1
+        status = 200
+
+        match = re.match(r"bytes=(\d+)-(\d*)", self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else size - 1
+            status = 206
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        length = end - start + 1
+        self.send_response(status)
+        self.send_header("Content-Length", str(length))
+        self.send_header("Accept-Ranges", "bytes")
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+
+        # 指定確率で途中切断して障害を再現
+        cut = length // 2 if random.random() < self.failure_rate else None
+        with open(self.file_path, "rb") as f:
+            f.seek(start)
+            remaining = length if cut is None else cut
+            while remaining > 0:
+                data = f.read(min(1024 * 1024, remaining))
+                self.wfile.write(data)
+                remaining -= len(data)
+        if cut is not None:
+            self.close_connection = True
+
+
+def start_server(file_path: Path, failure_rate: float, latency: float) -> ThreadingHTTPServer:
+    """ローカルHTTPサーバーをバックグラウンドで起動"""
+    handler = type("Handler", (RangeRequestHandler,), {
+        "file_path": file_path,
+        "failure_rate": failure_rate,
+        "latency": latency
+    })
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def create_test_file(path: Path, size_mb: int) -> str:
+    """ランダムなテストファイルを作成してSHA-256を返す"""
+    hasher = hashlib.sha256()
+    with open(path, "wb") as f:
+        for _ in range(size_mb):
+            data = os.urandom(1024 * 1024)
+            f.write(data)
+            hasher.update(data)
+    return hasher.hexdigest()
+
+
+async def run_download(url: str, dest: Path, sha256: str, connections: int, segment_mb: int) -> dict:
+    """1回分のダウンロードを実行"""
+    downloader = RangeDownloader(
+        url, str(dest), sha256=sha256,
+        connections=connections,
+        segment_size=segment_mb * 1024 * 1024,
+        max_retries=1
+    )
+    ok = await downloader.download()
+    return {"ok": ok, **downloader.stats}
+
+
+async def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="モデルダウンロード ベンチマーク")
+    parser.add_argument("--size-mb", type=int, default=256, help="テストファイルサイズ（MB）")
+    parser.add_argument("--connections", type=int, nargs="+", default=[1, 4, 8, 16], help="比較するコネクション数")
+    parser.add_argument("--segment-mb", type=int, default=16, help="セグメントサイズ（MB）")
+    parser.add_argument("--latency", type=float, default=0.0, help="リクエストごとの疑似レイテンシ（秒）")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="レスポンスを途中切断する確率（再開の確認用）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / "model.bin"
+        print(f"📦 テストファイル作成中 ({args.size_mb}MB)...")
+        sha256 = create_test_file(source, args.size_mb)
+
+        server = start_server(source, args.failure_rate, args.latency)
+        url = f"http://127.0.0.1:{server.server_port}/model.bin"
+        print(f"🌐 ローカルサーバー: {url}")
+        print("=" * 50)
+
+        all_ok = True
+        for connections in args.connections:
+            dest = Path(tmp) / f"download_{connections}.bin"
+            attempts = 0
+            started = time.perf_counter()
+
+            # 障害注入時は完了まで再実行（完了済みセグメントから再開される）
+            while True:
+                attempts += 1
+                result = await run_download(url, dest, sha256, connections, args.segment_mb)
+                if result["ok"] or attempts >= 20:
+                    break
+
+            elapsed = time.perf_counter() - started
+            if result["ok"]:
+                throughput = args.size_mb / elapsed
+                print(f"✅ コネクション数 {connections:>3}: {elapsed:6.2f}秒, {throughput:8.1f}MB/s (実行回数: {attempts})")
+            else:
+                all_ok = False
+                print(f"❌ コネクション数 {connections:>3}: 失敗 (実行回数: {attempts})")
+
+            if dest.exists():
+                dest.unlink()
+
+        # 誤ったハッシュが検出されることを確認
+        dest = Path(tmp) / "download_bad.bin"
+        result = await run_download(url, dest, "0" * 64, args.connections[-1], args.segment_mb)
+        if result["ok"] or dest.exists():
+            all_ok = False
+            print("❌ SHA-256不一致が検出されませんでした")
+        else:
+            print("✅ SHA-256不一致を検出しました")
+
+        server.shutdown()
+
+    print("=" * 50)
+    return 0 if all_ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+連想語エンジン マイクロベンチマーク
+合成モデル（make_synthetic_model.py）を使い、語彙数ごとに Word2VecModel の
+load_model / get_similar_words / get_generations の処理時間とピークメモリを計測する。
+ネットワークもS3の実モデルも不要で、完全にオフラインで実行できる。
+
+語彙数ごとに子プロセスで計測するため、ピークメモリ（RSS）は語彙数間で干渉しない。
+メモリは各処理の区間内でのRSSの最大増分（+MB）と、プロセス全体のピークRSSを示す。
+
+実行方法:
+    python bench_engine.py --vocab-sizes 10000 100000 1000000
+    python bench_engine.py --vocab-sizes 10000 50000 --dim 100 --save engine.json
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import logging
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from bench_api import summarize_latencies
+from make_synthetic_model import generate_model
+
+# 子プロセスの結果行の目印
+RESULT_PREFIX = "BENCH_RESULT "
+
+
+def peak_rss_mb() -> float:
+    """プロセスのピークRSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux は KB、macOS はバイト単位
+    return peak / 1024**2 if sys.platform == "darwin" else peak / 1024
+
+
+def current_rss_mb() -> float:
+    """プロセスの現在のRSS（MB、/proc がない環境ではピークRSSで代用）"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024**2
+    except (OSError, ValueError):
+        return peak_rss_mb()
+
+
+class RSSSampler:
+    """
+    区間内のRSSの最大増分を計測
+
+    tracemalloc はモデル読み込みのような割り当ての多い処理を大きく遅くするため、
+    別スレッドで一定間隔ごとにRSSを読み取る。mmapで参照したページも含まれる。
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.baseline = 0.0
+        self.peak = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.peak = max(self.peak, current_rss_mb())
+
+    def __enter__(self) -> "RSSSampler":
+        self.baseline = self.peak = current_rss_mb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._stop.set()
+        self._thread.join()
+        self.peak = max(self.peak, current_rss_mb())
+
+    @property
+    def delta_mb(self) -> float:
+        return self.peak - self.baseline
+
+
+async def measure_load(model_path: str) -> Dict[str, Any]:
+    """load_model の処理時間とRSSの最大増分を計測"""
+    from w2v_model import Word2VecModel
+
+    with RSSSampler() as sampler:
+        started = time.perf_counter()
+        model = Word2VecModel(model_path=model_path)
+        if not await model.load_model():
+            raise RuntimeError(f"モデルの読み込みに失敗しました: {model_path}")
+        elapsed = time.perf_counter() - started
+
+    return {"model": model, "seconds": elapsed, "peak_memory_mb": sampler.delta_mb}
+
+
+async def run_worker(model_path: str, queries: int, generation_queries: int, seed: int) -> Dict[str, Any]:
+    """子プロセス側: 1つの語彙数について全項目を計測"""
+    from w2v_model import load_word2vec_file, save_native_format
+
+    result: Dict[str, Any] = {}
+
+    # word2vec形式からの読み込み（パースを含む）
+    loaded = await measure_load(model_path)
+    result["load_word2vec"] = {"seconds": loaded["seconds"], "peak_memory_mb": loaded["peak_memory_mb"]}
+    vocab_size = len(loaded["model"].model.key_to_index)
+    del loaded
+    gc.collect()
+
+    # ネイティブキャッシュ形式からの読み込み（mmap）
+    cache_path = os.environ["MODEL_CACHE_PATH"]
+    started = time.perf_counter()
+    save_native_format(load_word2vec_file(model_path), cache_path)
+    result["convert_native"] = {"seconds": time.perf_counter() - started}
+
+    loaded = await measure_load(cache_path)
+    result["load_native"] = {"seconds": loaded["seconds"], "peak_memory_mb": loaded["peak_memory_mb"]}
+    model = loaded["model"]
+
+    rng = random.Random(seed)
+    vocabulary = model.model.index_to_key
+    words = [vocabulary[i] for i in rng.sample(range(vocab_size), min(queries, vocab_size))]
+
+    # get_similar_words（候補キャッシュは無効化済みのため毎回検索）
+    latencies = []
+    with RSSSampler() as sampler:
+        for word in words:
+            started = time.perf_counter()
+            await model.get_similar_words(word, topn=6, threshold=0.0)
+            latencies.append(time.perf_counter() - started)
+    result["get_similar_words"] = {**summarize_latencies(latencies), "peak_memory_mb": sampler.delta_mb}
+
+    # get_generations（世代数ごと）
+    result["get_generations"] = {}
+    for generation in range(2, 6):
+        latencies = []
+        with RSSSampler() as sampler:
+            for word in words[:generation_queries]:
+                started = time.perf_counter()
+                await model.get_generations(word, generation, threshold=0.0, seed=seed)
+                latencies.append(time.perf_counter() - started)
+        result["get_generations"][str(generation)] = {
+            **summarize_latencies(latencies), "peak_memory_mb": sampler.delta_mb
+        }
+
+    result["vocab_size"] = vocab_size
+    result["dim"] = model.model.vector_size
+    result["peak_rss_mb"] = peak_rss_mb()
+    return result
+
+
+def run_in_subprocess(model_path: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """語彙数1つ分の計測を子プロセスで実行"""
+    with tempfile.TemporaryDirectory() as workdir:
+        env = {
+            **os.environ,
+            "MODEL_CACHE_PATH": str(Path(workdir) / "models" / "synthetic.kv"),
+            "NEIGHBOR_TABLE_PATH": str(Path(workdir) / "models" / "synthetic.neighbors"),
+            "ANN_INDEX_PATH": str(Path(workdir) / "models" / "synthetic.ivf.npz"),
+            "ANN_INDEX": args.index,
+            "VECTOR_DTYPE": args.dtype,
+            "NEIGHBOR_CACHE_SIZE": "0",
+            "MODEL_CACHE_AUTO_CONVERT": "false"
+        }
+        command = [
+            sys.executable, str(Path(__file__).resolve()), "--worker",
+            "--model-path", str(Path(model_path).resolve()),
+            "--queries", str(args.queries),
+            "--generation-queries", str(args.generation_queries),
+            "--seed", str(args.seed)
+        ]
+        # Word2VecModel は作業ディレクトリに models/ を作るため一時ディレクトリで実行
+        completed = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        for line in completed.stdout.splitlines():
+            if line.startswith(RESULT_PREFIX):
+                return json.loads(line[len(RESULT_PREFIX):])
+        raise RuntimeError(f"計測に失敗しました:\n{completed.stderr[-2000:]}")
+
+
+def print_result(result: Dict[str, Any]) -> None:
+    """1つの語彙数の結果を表示"""
+    similar = result["get_similar_words"]
+    print(
+        f"📊 語彙数 {result['vocab_size']:>9,} (次元 {result['dim']}): "
+        f"ピークRSS {result['peak_rss_mb']:8.1f}MB"
+    )
+    print(
+        f"   load_model   word2vec形式 {result['load_word2vec']['seconds']:7.2f}秒 "
+        f"(+{result['load_word2vec']['peak_memory_mb']:7.1f}MB) | "
+        f"ネイティブ {result['load_native']['seconds']:7.2f}秒 "
+        f"(+{result['load_native']['peak_memory_mb']:7.1f}MB)"
+    )
+    print(
+        f"   get_similar_words  p50 {similar['p50_ms']:7.2f}ms  "
+        f"p95 {similar['p95_ms']:7.2f}ms  p99 {similar['p99_ms']:7.2f}ms  "
+        f"(+{similar['peak_memory_mb']:.1f}MB)"
+    )
+    for generation, stats in result["get_generations"].items():
+        print(
+            f"   get_generations({generation})  p50 {stats['p50_ms']:7.2f}ms  "
+            f"p95 {stats['p95_ms']:7.2f}ms  max {stats['max_ms']:7.2f}ms  "
+            f"(+{stats['peak_memory_mb']:.1f}MB)"
+        )
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="連想語エンジン マイクロベンチマーク")
+    parser.add_argument("--vocab-sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="計測する語彙数")
+    parser.add_argument("--dim", type=int, default=200, help="ベクトル次元")
+    parser.add_argument("--fixtures-dir", default="models/synthetic", help="合成モデルの保存先（再利用される）")
+    parser.add_argument("--queries", type=int, default=200, help="get_similar_words の計測回数")
+    parser.add_argument("--generation-queries", type=int, default=20, help="世代数ごとの get_generations の計測回数")
+    parser.add_argument("--index", default="exact", help="類似度検索インデックス（ANN_INDEX）")
+    parser.add_argument("--dtype", default="float32", help="ベクトル格納形式（VECTOR_DTYPE）")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--save", help="結果をJSONで保存")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--model-path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        logging.basicConfig(level=logging.WARNING)
+        result = asyncio.run(run_worker(args.model_path, args.queries, args.generation_queries, args.seed))
+        print(RESULT_PREFIX + json.dumps(result))
+        return 0
+
+    print("🏁 連想語エンジン マイクロベンチマーク")
+    print(f"🔎 インデックス: {args.index}, 格納形式: {args.dtype}")
+    print("=" * 50)
+
+    results: List[Dict[str, Any]] = []
+    for vocab_size in args.vocab_sizes:
+        model_path = Path(args.fixtures_dir) / f"synthetic_{vocab_size}_{args.dim}_{args.seed}.bin"
+        if not model_path.exists():
+            print(f"🧪 合成モデル生成中: {model_path}")
+            generate_model(str(model_path), vocab_size, dim=args.dim, seed=args.seed)
+
+        try:
+            result = run_in_subprocess(str(model_path), args)
+        except RuntimeError as e:
+            print(f"❌ 語彙数 {vocab_size:,}: {e}")
+            return 1
+        results.append(result)
+        print_result(result)
+
+    print("=" * 50)
+    if args.save:
+        Path(args.save).write_text(json.dumps({
+            "index": args.index,
+            "dtype": args.dtype,
+            "results": results
+        }, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"💾 結果を保存しました: {args.save}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+近傍テーブル構築スクリプト
+全語彙の上位K件の類似語を事前計算し、mmap可能なファイルに書き出す
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+from gensim.models import KeyedVectors
+
+from similarity_index import build_index, build_neighbor_table
+from w2v_model import load_word2vec_file
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Word2Vec 近傍テーブル構築")
+    parser.add_argument("--model", default="models/entity_vector.kv", help="モデルファイル（.kv / .bin / .txt）")
+    parser.add_argument("--output", default="models/entity_vector.neighbors", help="出力パス（.indices.npy / .scores.npy / .fingerprint が作成される）")
+    parser.add_argument("-k", type=int, default=32, help="語ごとに保持する近傍数")
+    parser.add_argument("--index", default="exact", choices=["exact", "ivf"], help="検索に使うインデックス")
+    parser.add_argument("--chunk-size", type=int, default=1024, help="1回の検索で処理する語数")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="並列スレッド数")
+    args = parser.parse_args()
+    
+    if not Path(args.model).exists():
+        logger.error(f"❌ モデルが見つかりません: {args.model}")
+        return 1
+    
+    logger.info(f"📁 モデル読み込み中: {args.model}")
+    if args.model.endswith('.kv'):
+        model = KeyedVectors.load(args.model, mmap='r')
+    else:
+        model = load_word2vec_file(args.model)
+    model.fill_norms()
+    vocab_size = len(model.key_to_index)
+    logger.info(f"📊 語彙数: {vocab_size:,}")
+    
+    index = build_index(args.index, model.vectors, model.norms)
+    
+    started = time.perf_counter()
+    last_report = [0.0]
+    
+    def progress(done: int, total: int) -> None:
+        now = time.perf_counter()
+        if now - last_report[0] >= 10 or done == total:
+            last_report[0] = now
+            rate = done / max(now - started, 1e-9)
+            logger.info(f"進捗: {done / total * 100:.1f}% ({done:,} / {total:,}, {rate:,.0f} 語/秒)")
+    
+    logger.info(f"🔍 近傍テーブル構築中 (K={args.k}, スレッド数={args.workers})")
+    table = build_neighbor_table(
+        index, model.vectors, model.norms, args.output,
+        k=args.k, chunk_size=args.chunk_size, workers=args.workers,
+        progress=progress
+    )
+    
+    logger.info(f"✅ 構築完了: {args.output} (K={table.k}, {time.perf_counter() - started:.1f}秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+モデル階層構築スクリプト
+完全版モデルから頻度上位の語彙に絞った light / medium / large モデルを作成
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+from gensim.models import KeyedVectors
+
+from similarity_index import QuantizedIndex, measure_ranking_drift
+from w2v_model import load_word2vec_file, save_native_format, truncate_vocabulary
+from w2v_model_large import Word2VecModelLarge
+from w2v_model_light import Word2VecModelLight
+from w2v_model_medium import Word2VecModelMedium
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+TIERS = {
+    "light": Word2VecModelLight,
+    "medium": Word2VecModelMedium,
+    "large": Word2VecModelLarge
+}
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Word2Vec モデル階層構築")
+    parser.add_argument("--source", default="models/entity_vector.kv", help="完全版モデル（.kv / .bin / .txt）")
+    parser.add_argument("--tiers", nargs="+", default=list(TIERS), choices=list(TIERS), help="作成する階層")
+    parser.add_argument("--output-dir", default="models", help="出力ディレクトリ")
+    parser.add_argument(
+        "--drift-dtypes", nargs="*", default=[], choices=["float16", "int8"],
+        help="作成した階層ごとに厳密検索との順位ずれを計測する量子化形式（VECTOR_DTYPE）"
+    )
+    parser.add_argument("--drift-sample", type=int, default=100, help="順位ずれの計測に使う語数")
+    parser.add_argument("--rescore", type=int, default=0, help="計測時の再採点件数（QUANTIZED_RESCORE）")
+    args = parser.parse_args()
+    
+    if not Path(args.source).exists():
+        logger.error(f"❌ 完全版モデルが見つかりません: {args.source}")
+        return 1
+    
+    logger.info(f"📁 完全版モデル読み込み中: {args.source}")
+    if args.source.endswith('.kv'):
+        model = KeyedVectors.load(args.source, mmap='r')
+    else:
+        # 最大の階層に必要な語数だけ読み込む
+        limit = max(TIERS[tier].VOCAB_LIMIT for tier in args.tiers)
+        model = load_word2vec_file(args.source, limit=limit)
+    logger.info(f"📊 語彙数: {len(model.key_to_index):,}")
+    
+    for tier in args.tiers:
+        model_class = TIERS[tier]
+        output = Path(args.output_dir) / f"{model_class.MODEL_NAME}.kv"
+        started = time.perf_counter()
+        
+        truncated = truncate_vocabulary(model, model_class.VOCAB_LIMIT)
+        save_native_format(truncated, str(output))
+        
+        logger.info(
+            f"✅ {tier}: {len(truncated.key_to_index):,}語 -> {output} "
+            f"({truncated.vectors.nbytes / 1024**2:,.1f}MB, {time.perf_counter() - started:.1f}秒)"
+        )
+        
+        if args.drift_dtypes:
+            measure_drift(str(output), args.drift_dtypes, args.drift_sample, args.rescore)
+    
+    return 0
+
+
+def measure_drift(path: str, dtypes: List[str], sample_size: int, rescore: int) -> None:
+    """
+    作成したモデルで量子化による順位ずれを計測
+    
+    起動時に計測すると全語彙の厳密検索でfloat32行列を全て読み込むため、ここで事前に確認する。
+    """
+    model = KeyedVectors.load(path, mmap='r')
+    model.fill_norms()
+    for dtype in dtypes:
+        index = QuantizedIndex.build(model.vectors, model.norms, dtype=dtype, rescore=rescore)
+        drift = measure_ranking_drift(index, model.vectors, model.norms, sample_size=sample_size)
+        logger.info(
+            f"📐 {dtype}（再採点: {rescore}件）: recall@{drift['k']}: {drift['recall_at_k']:.3f}, "
+            f"類似度誤差: {drift['mean_score_error']:.4f} ({drift['sample_size']}語)"
+        )
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+モデル変換スクリプト
+word2vec形式のモデルを高速読み込み用のネイティブキャッシュ形式に変換
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+
+from w2v_model import load_word2vec_file, save_native_format
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="Word2Vecモデル ネイティブ形式変換")
+    parser.add_argument("--source", default="models/entity_vector.model.bin", help="変換元モデル（.bin / .txt）")
+    parser.add_argument("--output", default="models/entity_vector.kv", help="変換先パス")
+    args = parser.parse_args()
+    
+    if not Path(args.source).exists():
+        logger.error(f"❌ 変換元モデルが見つかりません: {args.source}")
+        return 1
+    
+    logger.info(f"📁 モデル読み込み中: {args.source}")
+    started = time.perf_counter()
+    model = load_word2vec_file(args.source)
+    logger.info(f"📊 語彙数: {len(model.key_to_index):,} ({time.perf_counter() - started:.1f}秒)")
+    
+    logger.info(f"💾 ネイティブ形式で保存中: {args.output}")
+    save_native_format(model, args.output)
+    
+    logger.info(f"✅ 変換完了 ({time.perf_counter() - started:.1f}秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,289 @@
+"""
+モデルファイルダウンローダー
+HTTP Rangeリクエストによる並列・再開可能・SHA-256検証付きダウンロード
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Set
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+
+class RangeDownloader:
+    """
+    並列Rangeダウンロードクラス
+
+    ファイルを固定長セグメントに分割し、複数コネクションで並列に取得して
+    事前確保した一時ファイル（<path>.part）の該当位置へ直接書き込む。
+    完了済みセグメントは状態ファイル（<path>.part.json）に記録され、
+    失敗後の再実行では未完了のセグメントだけを取得する。
+    SHA-256 はファイル先頭から連続して完了した範囲を順に読み進めて計算する。
+    """
+
+    def __init__(
+        self,
+        url: str,
+        path: str,
+        sha256: Optional[str] = None,
+        connections: int = 8,
+        segment_size: int = 16 * 1024 * 1024,
+        chunk_size: int = 1024 * 1024,
+        max_retries: int = 3,
+        timeout_seconds: int = 300
+    ):
+        self.url = url
+        self.path = Path(path)
+        self.part_path = Path(f"{path}.part")
+        self.state_path = Path(f"{path}.part.json")
+        self.sha256 = sha256.lower() if sha256 else None
+        self.connections = max(1, connections)
+        self.segment_size = segment_size
+        self.chunk_size = chunk_size
+        self.max_retries = max_retries
+        self.timeout_seconds = timeout_seconds
+
+        self.size = 0
+        self.done: Set[int] = set()
+        self.stats: Dict[str, Any] = {}
+        self._hasher = hashlib.sha256()
+        self._hashed_segments = 0
+        self._downloaded = 0
+        self._last_progress = 0
+
+    @property
+    def segment_count(self) -> int:
+        return (self.size + self.segment_size - 1) // self.segment_size
+
+    def _segment_range(self, segment: int) -> tuple:
+        start = segment * self.segment_size
+        end = min(start + self.segment_size, self.size) - 1
+        return start, end
+
+    async def download(self) -> bool:
+        """ダウンロードを実行（成功時は path にファイルが配置される）"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        started = time.perf_counter()
+
+        async with aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=None, sock_read=self.timeout_seconds)
+        ) as session:
+            size, accepts_ranges = await self._probe(session)
+
+            if not size or not accepts_ranges:
+                logger.info("Rangeリクエスト非対応のため単一コネクションでダウンロードします")
+                ok = await self._download_single(session)
+            else:
+                self.size = size
+                self._prepare_part_file()
+                ok = await self._download_segments(session)
+
+        if not ok:
+            return False
+
+        digest = self._hasher.hexdigest()
+        if self.sha256 and digest != self.sha256:
+            logger.error(f"✗ SHA-256が一致しません: {digest} (期待値: {self.sha256})")
+            self._discard()
+            return False
+
+        os.replace(self.part_path, self.path)
+        if self.state_path.exists():
+            self.state_path.unlink()
+
+        elapsed = time.perf_counter() - started
+        self.stats = {
+            "bytes": self.size,
+            "seconds": elapsed,
+            "throughput_mb_s": self.size / 1024**2 / elapsed if elapsed > 0 else 0.0,
+            "sha256": digest,
+            "connections": self.connections
+        }
+        logger.info(
+            f"✓ ダウンロード完了: {self.path} "
+            f"({self.size:,} bytes, {elapsed:.1f}秒, {self.stats['throughput_mb_s']:.1f}MB/s)"
+        )
+        return True
+
+    async def _probe(self, session: aiohttp.ClientSession) -> tuple:
+        """ファイルサイズとRange対応可否を取得"""
+        try:
+            async with session.head(self.url, allow_redirects=True) as response:
+                response.raise_for_status()
+                size = int(response.headers.get("Content-Length", 0))
+                accepts_ranges = response.headers.get("Accept-Ranges", "").lower() == "bytes"
+                return size, accepts_ranges
+        except Exception as e:
+            logger.warning(f"HEADリクエスト失敗: {e}")
+            return 0, False
+
+    def _prepare_part_file(self) -> None:
+        """一時ファイルを事前確保し、再開可能な状態を読み込む"""
+        state = None
+        if self.state_path.exists() and self.part_path.exists():
+            try:
+                state = json.loads(self.state_path.read_text())
+            except ValueError:
+                state = None
+
+        if (
+            state
+            and state.get("url") == self.url
+            and state.get("size") == self.size
+            and state.get("segment_size") == self.segment_size
+            and self.part_path.stat().st_size == self.size
+        ):
+            self.done = set(state.get("done", []))
+            logger.info(f"ダウンロードを再開: 完了済みセグメント {len(self.done)}/{self.segment_count}")
+        else:
+            self.done = set()
+            with open(self.part_path, "wb") as f:
+                f.truncate(self.size)
+
+        self._downloaded = sum(
+            self._segment_range(s)[1] - self._segment_range(s)[0] + 1 for s in self.done
+        )
+        self._save_state()
+        self._advance_hash()
+
+    def _save_state(self) -> None:
+        """完了済みセグメントを状態ファイルに記録"""
+        tmp = self.state_path.with_name(self.state_path.name + ".tmp")
+        tmp.write_text(json.dumps({
+            "url": self.url,
+            "size": self.size,
+            "segment_size": self.segment_size,
+            "done": sorted(self.done)
+        }))
+        os.replace(tmp, self.state_path)
+
+    def _advance_hash(self) -> None:
+        """先頭から連続して完了したセグメントまでSHA-256を進める"""
+        if self._hashed_segments >= self.segment_count or self._hashed_segments not in self.done:
+            return
+        with open(self.part_path, "rb") as f:
+            while self._hashed_segments in self.done:
+                start, end = self._segment_range(self._hashed_segments)
+                f.seek(start)
+                remaining = end - start + 1
+                while remaining > 0:
+                    data = f.read(min(self.chunk_size, remaining))
+                    self._hasher.update(data)
+                    remaining -= len(data)
+                self._hashed_segments += 1
+
+    async def _download_segments(self, session: aiohttp.ClientSession) -> bool:
+        """未完了のセグメントを並列に取得"""
+        queue: asyncio.Queue = asyncio.Queue()
+        for segment in range(self.segment_count):
+            if segment not in self.done:
+                queue.put_nowait(segment)
+
+        failed = []
+
+        async def worker() -> None:
+            with open(self.part_path, "r+b") as f:
+                while not failed:
+                    try:
+                        segment = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    if not await self._fetch_segment(session, f, segment):
+                        failed.append(segment)
+                        return
+                    self.done.add(segment)
+                    self._save_state()
+                    self._advance_hash()
+
+        await asyncio.gather(*[worker() for _ in range(min(self.connections, queue.qsize() or 1))])
+
+        if failed:
+            logger.error(f"✗ セグメント {failed[0]} の取得に失敗しました（次回は完了済み部分から再開します）")
+            return False
+        return True
+
+    async def _fetch_segment(self, session: aiohttp.ClientSession, f, segment: int) -> bool:
+        """1セグメントを取得して書き込み（失敗時は指数バックオフで再試行）"""
+        start, end = self._segment_range(segment)
+
+        for attempt in range(self.max_retries):
+            written = 0
+            try:
+                headers = {"Range": f"bytes={start}-{end}"}
+                async with session.get(self.url, headers=headers) as response:
+                    if response.status != 206:
+                        raise RuntimeError(f"部分取得に非対応の応答: {response.status}")
+                    f.seek(start)
+                    async for chunk in response.content.iter_chunked(self.chunk_size):
+                        f.write(chunk)
+                        written += len(chunk)
+                        self._report_progress(len(chunk))
+
+                if written != end - start + 1:
+                    raise RuntimeError(f"取得サイズが不足しています: {written} / {end - start + 1}")
+                # ハッシュ計算で読み戻す前にバッファをファイルへ反映
+                f.flush()
+                return True
+
+            except Exception as e:
+                self._report_progress(-written)
+                logger.warning(f"セグメント {segment} 取得失敗 (試行 {attempt + 1}/{self.max_retries}): {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)  # 指数バックオフ
+
+        return False
+
+    async def _download_single(self, session: aiohttp.ClientSession) -> bool:
+        """単一コネクションでのストリーミングダウンロード（再試行付き）"""
+        for attempt in range(self.max_retries):
+            try:
+                self._hasher = hashlib.sha256()
+                self._downloaded = 0
+                async with session.get(self.url) as response:
+                    response.raise_for_status()
+                    self.size = int(response.headers.get("Content-Length", 0))
+                    with open(self.part_path, "wb") as f:
+                        async for chunk in response.content.iter_chunked(self.chunk_size):
+                            f.write(chunk)
+                            self._hasher.update(chunk)
+                            self._report_progress(len(chunk))
+                self.size = self._downloaded
+                return True
+
+            except Exception as e:
+                logger.warning(f"ダウンロード試行 {attempt + 1}/{self.max_retries} 失敗: {e}")
+                if attempt < self.max_retries - 1:
+                    await asyncio.sleep(2 ** attempt)  # 指数バックオフ
+
+        self._discard()
+        return False
+
+    def _report_progress(self, delta: int) -> None:
+        """ダウンロード進捗を記録（10%毎にログ出力）"""
+        self._downloaded += delta
+        if self.size > 0:
+            progress = int(self._downloaded * 10 // self.size)
+            if progress > self._last_progress:
+                self._last_progress = progress
+                logger.info(
+                    f"ダウンロード進捗: {self._downloaded / self.size * 100:.1f}% "
+                    f"({self._downloaded:,} / {self.size:,} bytes)"
+                )
+
+    @property
+    def progress(self) -> float:
+        """進捗率（0.0-1.0）"""
+        return self._downloaded / self.size if self.size else 0.0
+
+    def _discard(self) -> None:
+        """一時ファイルと状態ファイルを削除"""
+        for path in (self.part_path, self.state_path):
+            if path.exists():
+                path.unlink()
@@ -0,0 +1,41 @@
+"""
+高速JSONエンコーダー
+orjson がインストールされていれば使用し、なければ標準の json で代替する
+（どちらも区切り文字の空白なし・非ASCII文字はそのまま出力する）
+"""
+
+import json
+from typing import Any
+
+from fastapi.responses import Response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 任意の依存関係
+    orjson = None
+
+
+def dumps(content: Any) -> bytes:
+    """JSONのバイト列に変換"""
+    if orjson is not None:
+        return orjson.dumps(content)
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+
+
+class FastJSONResponse(Response):
+    """
+    検証済みの辞書をそのままJSONにするレスポンス
+
+    response_model による検証・変換を経由しないため、値はエンドポイント側で
+    スキーマどおりに組み立てておくこと。
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -6,18 +6,37 @@ FastAPIを使用したWord2Vec連想語APIサーバー
 import os
 import logging
 import asyncio
-from contextlib import asynccontextmanager
-from typing import Dict, Any
+import hashlib
+import hmac
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import Depends, FastAPI, Header, HTTPException, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 import uvicorn
 
+from admission import AdmissionController, AdmissionRejected, client_identifier
+from cache import LRUCache
+from fast_json import FastJSONResponse, dumps as json_dumps
+from metrics import REGISTRY, CONTENT_TYPE as METRICS_CONTENT_TYPE, cache_metrics
+from model_registry import ModelRegistry, UnknownModel
+from shared_cache import RedisClient, SharedCache, decode_response, encode_response
+
 from models import (
     AssociationRequest, 
     AssociationResponse, 
+    AssociationBatchRequest,
+    AssociationBatchItem,
+    AssociationBatchResponse,
     ModelInfoResponse,
+    ModelListResponse,
+    ModelReloadRequest,
+    ModelReloadResponse,
+    CacheStatsResponse,
+    VocabSuggestResponse,
     ErrorResponse,
     ErrorCodeEnum,
     StatusEnum
@@ -32,20 +51,22 @@ logger = logging.getLogger(__name__)
 
 logger.info(f"🎯 モデルタイプ: {model_type}")
 
-# 遅延インポートでエラーを回避
-Word2VecModel = None
+# 登録できるモデル名（モデルタイプ）
+MODEL_TYPES = ("light", "medium", "large", "full")
+
+# モデル名 -> モデルクラス（遅延インポートでエラーを回避）
+model_classes: Dict[str, Any] = {}
 
-def get_model_class():
-    global Word2VecModel
-    if Word2VecModel is None:
+def get_model_class(name: str = model_type):
+    if name not in model_classes:
         try:
-            if model_type == "light":
+            if name == "light":
                 logger.info("📦 軽量版モデルを読み込み中...")
                 from w2v_model_light import Word2VecModelLight as Word2VecModel
-            elif model_type == "medium":
+            elif name == "medium":
                 logger.info("📦 中程度モデルを読み込み中...")
                 from w2v_model_medium import Word2VecModelMedium as Word2VecModel
-            elif model_type == "large":
+            elif name == "large":
                 logger.info("📦 大規模モデルを読み込み中...")
                 from w2v_model_large import Word2VecModelLarge as Word2VecModel
             else:  # full
@@ -60,7 +81,8 @@ def get_model_class():
             logger.error(f"❌ モデル読み込みエラー: {e}")
             logger.info("📦 軽量版モデルにフォールバック...")
             from w2v_model_light import Word2VecModelLight as Word2VecModel
-    return Word2VecModel
+        model_classes[name] = Word2VecModel
+    return model_classes[name]
 
 # ログ設定
 logging.basicConfig(
@@ -68,53 +90,194 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
-# グローバル変数
-w2v_model = None
+# モデルレジストリ（MODEL_TYPE を既定モデルとし、MODELS で追加のモデルを同時に提供する）
+registry = ModelRegistry(model_type)
+EXTRA_MODELS = [
+    name.strip() for name in os.getenv("MODELS", "").split(",")
+    if name.strip() and name.strip() != model_type
+]
+# モデル管理API（再読み込み）の認証トークン（未設定の場合は管理APIを無効化）
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# レスポンスキャッシュ（seed指定リクエストのみ対象）
+response_cache = LRUCache(int(os.getenv("RESPONSE_CACHE_SIZE", 1000)))
+RESPONSE_CACHE_MAX_AGE = int(os.getenv("RESPONSE_CACHE_MAX_AGE", 3600))
+
+# 共有キャッシュ（L2: ワーカー・コンテナ間で候補リストとレスポンスを共有、REDIS_URL 未設定時は無効）
+REDIS_URL = os.getenv("REDIS_URL", "")
+shared_cache: Optional[SharedCache] = None
+if REDIS_URL:
+    shared_cache = SharedCache(
+        RedisClient(REDIS_URL, timeout=float(os.getenv("REDIS_TIMEOUT_MS", 100)) / 1000),
+        prefix=os.getenv("SHARED_CACHE_PREFIX", "w2v:"),
+        ttl=float(os.getenv("SHARED_CACHE_TTL", 86400)),
+        retry_interval=float(os.getenv("SHARED_CACHE_RETRY_SECONDS", 5))
+    )
+
+# アドミッション制御（同時実行数・待ち行列・クライアントごとの流量制限）
+admission = AdmissionController(
+    max_concurrent=int(os.getenv("ADMISSION_MAX_CONCURRENT", 4)),
+    max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", 32)),
+    max_wait_seconds=float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", 5.0)),
+    client_rate=float(os.getenv("RATE_LIMIT_PER_SECOND", 0)),
+    client_burst=float(os.getenv("RATE_LIMIT_BURST", 0))
+)
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "false").lower() == "true"
+
+# メトリクス（/metrics で出力）
+REQUEST_SECONDS = REGISTRY.histogram(
+    "w2v_http_request_seconds", "HTTPリクエスト処理時間（秒）", ["endpoint", "method", "status"]
+)
+ASSOCIATION_SECONDS = REGISTRY.histogram(
+    "w2v_association_seconds", "連想語生成にかかった時間（秒、キャッシュヒットを除く）", ["generation"]
+)
+
+
+def collect_cache_metrics():
+    """キャッシュ統計をメトリクスとして出力（既定モデル以外のキャッシュ名には :モデル名 を付ける）"""
+    caches = {"responses": response_cache.stats()}
+    for name, model in registry.models.items():
+        if model.is_loaded():
+            suffix = "" if name == registry.default else f":{name}"
+            caches.update({cache + suffix: stats for cache, stats in model.get_cache_stats().items()})
+    return cache_metrics(caches)
+
+
+REGISTRY.register_collector(collect_cache_metrics)
+
+
+def collect_admission_metrics():
+    """アドミッション制御の状態をメトリクスとして出力"""
+    stats = admission.stats()
+    return [
+        ("w2v_admission_active", "gauge", "処理中のリクエスト数", [({}, stats["active"])]),
+        ("w2v_admission_waiting", "gauge", "待ち行列のリクエスト数", [({}, stats["waiting"])]),
+        ("w2v_admission_admitted_total", "counter", "受け付けたリクエスト数", [({}, stats["admitted"])]),
+        (
+            "w2v_admission_rejected_total", "counter", "拒否したリクエスト数",
+            [({"reason": reason}, count) for reason, count in stats["rejected"].items()]
+        ),
+    ]
+
+
+REGISTRY.register_collector(collect_admission_metrics)
+
+
+def collect_model_metrics():
+    """モデルごとのメモリ使用量と入れ替え回数をメトリクスとして出力"""
+    samples = []
+    for name, model in registry.models.items():
+        for component, usage in model.memory_usage().items():
+            for kind in ("resident", "mapped"):
+                labels = {"model": name, "component": component, "kind": kind}
+                samples.append((labels, usage[f"{kind}_bytes"]))
+    return [
+        ("w2v_model_memory_bytes", "gauge", "モデルの構成要素ごとのメモリ使用量（バイト）", samples),
+        ("w2v_model_swaps_total", "counter", "モデルの版を入れ替えた回数", [({}, registry.swap_count)]),
+    ]
+
+
+REGISTRY.register_collector(collect_model_metrics)
+
+
+def collect_shared_cache_metrics():
+    """共有キャッシュの統計をメトリクスとして出力"""
+    if shared_cache is None:
+        return []
+    stats = shared_cache.stats()
+    return [
+        (
+            "w2v_shared_cache_lookups_total", "counter", "共有キャッシュの参照数（skipped: 使用停止中）",
+            [({"result": result}, stats[key]) for result, key in (("hit", "hits"), ("miss", "misses"), ("skipped", "skipped"))]
+        ),
+        ("w2v_shared_cache_errors_total", "counter", "共有キャッシュとの通信エラー数", [({}, stats["errors"])]),
+        ("w2v_shared_cache_invalid_total", "counter", "変換できずミスとして扱った値の数", [({}, stats["invalid"])]),
+        ("w2v_shared_cache_dropped_writes_total", "counter", "書き込み待ちが多いため捨てた書き込み数", [({}, stats["dropped_writes"])]),
+        ("w2v_shared_cache_available", "gauge", "共有キャッシュを使用中か（1: 使用中, 0: 使用停止中）", [({}, int(stats["available"]))]),
+    ]
+
+
+REGISTRY.register_collector(collect_shared_cache_metrics)
+
+
+# ウォームアップ設定（準備完了の前にホットキーワードの候補を計算し、行列のページを読み込む）
+WARMUP_KEYWORDS = [w.strip() for w in os.getenv("WARMUP_KEYWORDS", "").split(",") if w.strip()]
+WARMUP_TOUCH_MATRIX = os.getenv("WARMUP_TOUCH_MATRIX", "false").lower() == "true"
+
+def create_model(name: str, model_path: Optional[str] = None):
+    """
+    モデルを作成（読み込みは prepare_model で行う）
+    
+    派生ファイルのパスの環境変数は、既定モデルをモデルファイル指定なしで作成する場合のみ使用する。
+    """
+    ModelClass = get_model_class(name)
+    w2v_model = ModelClass(model_path, path_overrides=name == registry.default and not model_path)
+    w2v_model.shared_cache = shared_cache
+    return w2v_model
+
+
+async def prepare_model(model) -> bool:
+    """モデルのダウンロード・読み込み・ウォームアップ（バックグラウンドで実行）"""
+    logger.info(f"📁 モデル '{model.name}' (版 {model.version}) の準備を開始...")
+    success = await model.load_model()
+    
+    if not success:
+        logger.error("❌ モデルの準備に失敗しました")
+        logger.error("可能な原因:")
+        logger.error("- S3からのダウンロードに失敗")
+        logger.error("- ネットワーク接続の問題")
+        logger.error("- ファイルの破損または不正な形式")
+        logger.error("- メモリ不足")
+        return False
+    
+    logger.info("✅ モデルの準備が完了しました")
+    model_info = model.get_model_info()
+    logger.info(f"📊 語彙数: {model_info['vocabulary_size']:,}")
+    logger.info(f"📏 ベクトル次元: {model_info['vector_dimension']}")
+    if model.is_shared():
+        logger.info("🔗 ベクトル行列はmmapで共有されています")
+    
+    if WARMUP_KEYWORDS or WARMUP_TOUCH_MATRIX:
+        logger.info(f"🔥 ウォームアップ中... (キーワード: {len(WARMUP_KEYWORDS)}語)")
+        try:
+            await model.warm_up(WARMUP_KEYWORDS, touch_matrix=WARMUP_TOUCH_MATRIX)
+        except Exception as e:
+            # ウォームアップの失敗はリクエスト処理に影響しないため準備完了とする
+            logger.warning(f"⚠️  ウォームアップに失敗しました: {e}")
+    
+    model.set_phase("ready")
+    logger.info(f"🎯 モデル '{model.name}' (版 {model.version}) が利用可能になりました")
+    return True
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    """アプリケーションライフサイクル管理"""
-    global w2v_model
+    """
+    アプリケーションライフサイクル管理
     
+    モデルの準備はバックグラウンドで行い、ポートはすぐに待ち受けを開始する。
+    準備状況は /api/v1/health/ready で確認できる。
+    """
     # 起動時処理
     logger.info("🚀 Word Association API 起動中...")
+    if shared_cache is not None:
+        logger.info(f"🗄️  共有キャッシュ: {shared_cache.client.host}:{shared_cache.client.port}")
     
-    try:
-        # モデルクラスを取得
-        ModelClass = get_model_class()
-        
-        # モデル初期化
-        w2v_model = ModelClass()
-        
-        # モデル読み込み
-        logger.info("📁 モデルファイルの準備を開始...")
-        success = await w2v_model.load_model()
-        
-        if not success:
-            logger.error("❌ モデルの準備に失敗しました")
-            logger.error("可能な原因:")
-            logger.error("- S3からのダウンロードに失敗")
-            logger.error("- ネットワーク接続の問題")
-            logger.error("- ファイルの破損または不正な形式")
-            logger.error("- メモリ不足")
-            raise RuntimeError("モデルの初期化に失敗しました")
-        
-        logger.info("✅ モデルの準備が完了しました")
-        model_info = w2v_model.get_model_info()
-        logger.info(f"📊 語彙数: {model_info['vocabulary_size']:,}")
-        logger.info(f"📏 ベクトル次元: {model_info['vector_dimension']}")
-        logger.info("🎯 APIが利用可能になりました")
-        
-    except Exception as e:
-        logger.error(f"❌ 起動エラー: {e}")
-        logger.error("APIサーバーの起動に失敗しました。ログを確認してください。")
-        raise
+    # モデル初期化と準備開始（既定モデルと追加のモデル）
+    registry.load(model_type, create_model(model_type), prepare_model)
+    for name in EXTRA_MODELS:
+        if name not in MODEL_TYPES:
+            logger.warning(f"⚠️  不明なモデル名のため無視します: {name}")
+            continue
+        registry.load(name, create_model(name), prepare_model)
     
     yield
     
     # 終了時処理
     logger.info("⏹️  Word Association API 終了中...")
+    await registry.shutdown()
+    if shared_cache is not None:
+        await shared_cache.close()
 
 
 # FastAPIアプリケーション初期化
@@ -150,6 +313,41 @@ app.add_middleware(
 )
 
 
+# ルート関数 -> パステンプレート（メトリクスのラベル用）
+route_paths: Dict[Any, str] = {}
+
+
+def route_path(request: Request) -> str:
+    """リクエストに対応するルートのパステンプレートを取得（未定義パスは unmatched）"""
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    if endpoint not in route_paths:
+        route_paths[endpoint] = next(
+            (route.path for route in app.routes if getattr(route, "endpoint", None) is endpoint),
+            "unmatched"
+        )
+    return route_paths[endpoint]
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """エンドポイント別のリクエスト処理時間を記録"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - started,
+            endpoint=route_path(request),
+            method=request.method,
+            status=str(status)
+        )
+
+
 # 例外ハンドラー
 @app.exception_handler(ValueError)
 async def value_error_handler(request: Request, exc: ValueError):
@@ -175,6 +373,32 @@ async def runtime_error_handler(request: Request, exc: RuntimeError):
     )
 
 
+@app.exception_handler(AdmissionRejected)
+async def admission_rejected_handler(request: Request, exc: AdmissionRejected):
+    """過負荷・流量制限による拒否（429 + Retry-After）"""
+    logger.warning(f"リクエストを拒否 ({exc.reason}): {exc}")
+    return JSONResponse(
+        status_code=429,
+        headers={"Retry-After": exc.retry_after_header},
+        content=ErrorResponse(
+            error_code=ErrorCodeEnum.RATE_LIMIT_EXCEEDED,
+            message=str(exc)
+        ).dict()
+    )
+
+
+@app.exception_handler(UnknownModel)
+async def unknown_model_handler(request: Request, exc: UnknownModel):
+    """登録されていないモデル名の指定"""
+    return JSONResponse(
+        status_code=404,
+        content=ErrorResponse(
+            error_code=ErrorCodeEnum.MODEL_NOT_FOUND,
+            message=str(exc)
+        ).dict()
+    )
+
+
 @app.exception_handler(Exception)
 async def general_exception_handler(request: Request, exc: Exception):
     """一般例外ハンドラー"""
@@ -188,11 +412,27 @@ async def general_exception_handler(request: Request, exc: Exception):
     )
 
 
+def request_client_id(request: Request) -> str:
+    """リクエスト元のクライアント識別子"""
+    return client_identifier(
+        request.headers,
+        request.client.host if request.client else None,
+        TRUST_PROXY_HEADERS
+    )
+
+
+async def admission_slot(request: Request):
+    """処理枠を確保する依存関係（混雑時は429で即座に拒否）"""
+    async with admission.slot(request_client_id(request)):
+        yield
+
+
 # API エンドポイント
 @app.post(
     "/api/v1/associate",
     response_model=AssociationResponse,
     summary="連想語取得",
+    dependencies=[Depends(admission_slot)],
     description="""
     指定されたキーワードから世代数に応じて連想される言葉を取得します
     
@@ -204,60 +444,445 @@ async def general_exception_handler(request: Request, exc: Exception):
     - 世代数2 → 6個の連想語
     - 世代数3 → 6個 + (6×3) = 24個の連想語  
     - 世代数4 → 6個 + (6×3) + (18×3) = 78個の連想語
+    
+    **複数キーワード:**
+    - `positive` に加える語、`negative` に差し引く語を指定すると、キーワードと合わせた1つのクエリベクトル
+      （例: 犬 + 公園、王 + 女 - 男）から第2世代を取得します
+    - 第2世代の `parent_word` はクエリの表記（例: `犬 + 公園`）になります
+    
+    **重複の除外:**
+    - `unique: true` の場合、既に木に現れた語は候補から除外され、各語は高々1回だけ展開されます
+    - 既出のため展開を省いた語の数は `saved_expansions` として返されます
+    
+    **モデルの指定:**
+    - `model` に登録済みのモデル名（`/api/v1/models` で確認）を指定すると、既定モデル以外で取得します
     """,
     responses={
         400: {"model": ErrorResponse, "description": "リクエストエラー"},
-        404: {"model": ErrorResponse, "description": "キーワードが見つからない"},
+        404: {"model": ErrorResponse, "description": "キーワード・モデルが見つからない"},
+        429: {"model": ErrorResponse, "description": "混雑・流量制限による拒否"},
         500: {"model": ErrorResponse, "description": "サーバーエラー"},
         503: {"model": ErrorResponse, "description": "サービス利用不可"}
     },
     tags=["Association"]
 )
-async def get_associated_words(request: AssociationRequest) -> AssociationResponse:
+async def get_associated_words(request: AssociationRequest) -> FastJSONResponse:
     """連想語取得エンドポイント"""
-    global w2v_model
+    return FastJSONResponse(await build_association_response(request))
+
+
+@app.get(
+    "/api/v1/associate",
+    response_model=AssociationResponse,
+    summary="連想語取得（キャッシュ可能なGET版）",
+    dependencies=[Depends(admission_slot)],
+    description="""
+    POST版と同じ連想語をクエリパラメータで取得します
+    
+    **キャッシュ:**
+    - `seed` を指定した場合、結果は再現可能なため `Cache-Control: public` と `ETag` を付与します
+    - `If-None-Match` が一致する場合は `304 Not Modified` を返します
+    - `seed` 未指定の場合は毎回結果が変わるため `Cache-Control: no-store` となります
+    """,
+    responses={
+        304: {"description": "キャッシュ済みの結果から変更なし"},
+        404: {"model": ErrorResponse, "description": "キーワードが見つからない"},
+        429: {"model": ErrorResponse, "description": "混雑・流量制限による拒否"},
+        500: {"model": ErrorResponse, "description": "サーバーエラー"},
+        503: {"model": ErrorResponse, "description": "サービス利用不可"}
+    },
+    tags=["Association"]
+)
+async def get_associated_words_cacheable(
+    http_request: Request,
+    keyword: str = Query(..., min_length=1, max_length=100, description="連想語を取得したいキーワード"),
+    generation: int = Query(..., ge=2, le=5, description="世代数（2以上5以下）"),
+    threshold: float = Query(0.5, ge=0.0, le=1.0, description="類似度の閾値"),
+    seed: Optional[int] = Query(None, ge=0, description="乱数シード"),
+    unique: bool = Query(False, description="既に木に現れた語を候補から除外する"),
+    positive: List[str] = Query([], max_length=10, description="キーワードに加える語（複数指定可）"),
+    negative: List[str] = Query([], max_length=10, description="差し引く語（複数指定可）"),
+    model: Optional[str] = Query(None, max_length=50, description="使用するモデル名（省略時は既定モデル）")
+) -> Response:
+    """連想語取得エンドポイント（GET版）"""
+    request = AssociationRequest(
+        keyword=keyword,
+        generation=generation,
+        threshold=threshold,
+        seed=seed,
+        unique=unique,
+        positive=positive,
+        negative=negative,
+        model=model
+    )
+    response = await build_association_response(request)
+    
+    body = json_dumps(response)
+    if seed is None:
+        return Response(
+            content=body,
+            media_type="application/json",
+            headers={"Cache-Control": "no-store"}
+        )
+    
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={RESPONSE_CACHE_MAX_AGE}"
+    }
+    if http_request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def response_cache_key(request: AssociationRequest, w2v_model) -> Optional[tuple]:
+    """
+    レスポンスキャッシュのキー（seed未指定の場合は結果が変わるためNone）
+    
+    モデルの内容と検索設定から決まる名前空間を含むため、入れ替えでモデルが変わると別のキーになり、
+    同じモデルを動かす他のワーカー・コンテナとは共有キャッシュで同じキーになる。
+    """
+    if request.seed is None:
+        return None
+    return (
+        w2v_model.cache_namespace,
+        request.keyword, request.generation, request.threshold, request.seed, request.unique,
+        tuple(request.positive), tuple(request.negative)
+    )
+
+
+def shared_response_key(cache_key: tuple) -> str:
+    """共有キャッシュでのレスポンスのキー"""
+    return "r:" + hashlib.sha256(repr(cache_key).encode("utf-8")).hexdigest()[:32]
+
+
+async def get_cached_responses(cache_keys: List[Optional[tuple]]) -> List[Optional[Dict[str, Any]]]:
+    """キャッシュ済みのレスポンスをまとめて取得（プロセス内 → 共有キャッシュの順、キーがNoneの要素はNone）"""
+    responses = [response_cache.get(key) if key is not None else None for key in cache_keys]
+    if shared_cache is not None:
+        missing = [i for i, key in enumerate(cache_keys) if key is not None and responses[i] is None]
+        values = await shared_cache.get_many([shared_response_key(cache_keys[i]) for i in missing])
+        for i, value in zip(missing, values):
+            if value is not None:
+                responses[i] = shared_cache.decode(shared_response_key(cache_keys[i]), value, decode_response)
+                if responses[i] is not None:
+                    response_cache.put(cache_keys[i], responses[i])
+    return responses
+
+
+def put_cached_response(cache_key: tuple, response: Dict[str, Any]) -> None:
+    """レスポンスをキャッシュに格納（共有キャッシュへはバックグラウンドで書き込む）"""
+    response_cache.put(cache_key, response)
+    if shared_cache is not None:
+        shared_cache.put(shared_response_key(cache_key), encode_response(response))
+
+
+def find_missing_keyword(request: AssociationRequest, w2v_model) -> Optional[str]:
+    """モデルに存在しないクエリの語（全て存在する場合はNone）"""
+    for word in request.query_words():
+        if not w2v_model.contains_word(word):
+            return word
+    return None
+
+
+def make_association_response(
+    request: AssociationRequest,
+    generations: List[Dict[str, Any]],
+    stats: Optional[Dict[str, int]] = None
+) -> Dict[str, Any]:
+    """
+    世代リスト（Generation と同じ形の辞書）から連想語レスポンスを作成
+    
+    AssociationResponse と同じ形の辞書を返す。値はエンジンが生成した検証済みのものなので、
+    pydanticモデルを経由せずに FastJSONResponse でそのままJSONにする。
+    """
+    return {
+        "status": StatusEnum.SUCCESS.value,
+        "keyword": request.keyword,
+        "generation": request.generation,
+        "generations": generations,
+        # 総数計算
+        "total_count": sum(gen["count"] for gen in generations),
+        "saved_expansions": stats.get("saved_expansions") if stats else None
+    }
+
+
+async def build_association_response(request: AssociationRequest) -> Dict[str, Any]:
+    """
+    連想語レスポンス（AssociationResponse と同じ形の辞書）を生成
+    
+    seed 指定時は結果が再現可能なため、キーワード・世代数・閾値・シードを
+    キーとしてレスポンスキャッシュから返す。
+    処理中に指定モデルの入れ替えがあっても、開始時の版で最後まで処理する。
+    """
+    async with registry.lease(request.model) as w2v_model:
+        # モデル可用性チェック
+        if not w2v_model.is_loaded():
+            raise HTTPException(
+                status_code=503,
+                detail="モデルが利用できません"
+            )
+        
+        # キーワード存在チェック
+        missing = find_missing_keyword(request, w2v_model)
+        if missing is not None:
+            raise HTTPException(
+                status_code=404,
+                detail=f"キーワード '{missing}' がモデルに存在しません"
+            )
+        
+        cache_key = response_cache_key(request, w2v_model)
+        if cache_key is not None:
+            cached = (await get_cached_responses([cache_key]))[0]
+            if cached is not None:
+                return cached
+        
+        try:
+            # 世代別連想語取得
+            logger.info(f"連想語取得開始 - キーワード: {request.keyword}, 世代数: {request.generation}")
+            started = time.perf_counter()
+            stats: Dict[str, int] = {}
+            
+            generations = (await w2v_model.get_generation_payloads([request], stats=[stats]))[0]
+            
+            response = make_association_response(request, generations, stats)
+            ASSOCIATION_SECONDS.observe(time.perf_counter() - started, generation=str(request.generation))
+            logger.info(f"連想語取得完了 - 総数: {response['total_count']}")
+            
+            if cache_key is not None:
+                put_cached_response(cache_key, response)
+            
+            return response
+            
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            logger.error(f"連想語取得エラー: {e}")
+            raise HTTPException(status_code=500, detail="連想語取得に失敗しました")
+
+
+@app.post(
+    "/api/v1/associate/stream",
+    summary="連想語ストリーミング取得",
+    dependencies=[Depends(admission_slot)],
+    description="""
+    連想語を世代ごとに計算された順にストリーミングで返します
+    
+    **形式:**
+    - 既定: NDJSON（`application/x-ndjson`）、1行1イベント
+    - `Accept: text/event-stream` の場合: Server-Sent Events
+    
+    **イベント:**
+    - `start`: キーワードと世代数
+    - `generation`: 親単語ごとの世代（`Generation` と同じ内容）
+    - `end`: 全世代の結果総数（`unique` 指定時は `saved_expansions` を含む）
+    
+    クライアントが切断した場合、残りの世代の展開は中止されます。
+    """,
+    responses={
+        200: {
+            "description": "世代ごとのイベントストリーム",
+            "content": {"application/x-ndjson": {}, "text/event-stream": {}}
+        },
+        404: {"model": ErrorResponse, "description": "キーワードが見つからない"},
+        429: {"model": ErrorResponse, "description": "混雑・流量制限による拒否"},
+        503: {"model": ErrorResponse, "description": "サービス利用不可"}
+    },
+    tags=["Association"]
+)
+async def stream_associated_words(request: AssociationRequest, http_request: Request) -> StreamingResponse:
+    """連想語ストリーミング取得エンドポイント"""
+    w2v_model = registry.get(request.model)
     
     # モデル可用性チェック
-    if not w2v_model or not w2v_model.is_loaded():
+    if not w2v_model.is_loaded():
         raise HTTPException(
             status_code=503,
             detail="モデルが利用できません"
         )
     
     # キーワード存在チェック
-    if not w2v_model.contains_word(request.keyword):
+    missing = find_missing_keyword(request, w2v_model)
+    if missing is not None:
         raise HTTPException(
             status_code=404,
-            detail=f"キーワード '{request.keyword}' がモデルに存在しません"
+            detail=f"キーワード '{missing}' がモデルに存在しません"
         )
     
-    try:
-        # 世代別連想語取得
-        logger.info(f"連想語取得開始 - キーワード: {request.keyword}, 世代数: {request.generation}")
-        
-        generations = await w2v_model.get_generations(
-            keyword=request.keyword,
-            generation=request.generation,
-            threshold=request.threshold
+    use_sse = "text/event-stream" in http_request.headers.get("accept", "")
+    
+    def encode(event: str, data: Dict[str, Any]) -> bytes:
+        if use_sse:
+            return b"event: " + event.encode("utf-8") + b"\ndata: " + json_dumps(data) + b"\n\n"
+        return json_dumps({"type": event, **data}) + b"\n"
+    
+    async def events():
+        # ストリームの途中で入れ替えがあっても、終了まで同じ版を使う
+        async with registry.lease(request.model) as w2v_model:
+            cache_key = response_cache_key(request, w2v_model)
+            cached = (await get_cached_responses([cache_key]))[0]
+            
+            yield encode("start", {"keyword": request.keyword, "generation": request.generation})
+            
+            if cached is not None:
+                generations = cached["generations"]
+                stats = {"saved_expansions": cached["saved_expansions"]}
+                for gen in generations:
+                    yield encode("generation", gen)
+            else:
+                generations = []
+                stats: Dict[str, int] = {}
+                async for level in w2v_model.iter_generation_nodes([request], stats=[stats]):
+                    # 切断されたクライアントのために残りの世代を計算しない
+                    if await http_request.is_disconnected():
+                        logger.info(f"クライアント切断のため展開を中止 - キーワード: {request.keyword}")
+                        return
+                    for node in level[0]:
+                        gen = w2v_model.generation_payload(node)
+                        generations.append(gen)
+                        yield encode("generation", gen)
+                
+                if cache_key is not None:
+                    put_cached_response(cache_key, make_association_response(request, generations, stats))
+            
+            end = {"total_count": sum(gen["count"] for gen in generations)}
+            if request.unique:
+                end["saved_expansions"] = stats.get("saved_expansions")
+            yield encode("end", end)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream" if use_sse else "application/x-ndjson",
+        headers={"Cache-Control": "no-store"}
+    )
+
+
+@app.post(
+    "/api/v1/associate/batch",
+    response_model=AssociationBatchResponse,
+    summary="連想語一括取得",
+    description="""
+    複数のキーワードの連想語を1回のリクエストで取得します（最大100件）
+    
+    全キーワードの同じ世代をまとめて1回のベクトル演算で展開するため、
+    キーワードごとにリクエストするよりも大幅に高速です。
+    キーワードが存在しないなどの個別の失敗は、該当要素の `error` として返されます。
+    """,
+    responses={
+        429: {"model": ErrorResponse, "description": "混雑・流量制限による拒否"},
+        500: {"model": ErrorResponse, "description": "サーバーエラー"},
+        503: {"model": ErrorResponse, "description": "サービス利用不可"}
+    },
+    tags=["Association"]
+)
+async def get_associated_words_batch(
+    request: AssociationBatchRequest,
+    http_request: Request
+) -> FastJSONResponse:
+    """連想語一括取得エンドポイント"""
+    # モデル可用性チェック
+    if not registry.get().is_loaded():
+        raise HTTPException(
+            status_code=503,
+            detail="モデルが利用できません"
         )
+    
+    async with AsyncExitStack() as stack:
+        # 要素が指定したモデルを貸し出す（一括取得の途中で入れ替えがあっても同じ版で処理する）
+        leased: Dict[str, Any] = {}
+        for item in request.requests:
+            name = item.model or registry.default
+            if name not in leased:
+                try:
+                    leased[name] = await stack.enter_async_context(registry.lease(name))
+                except UnknownModel:
+                    leased[name] = None
         
-        # 総数計算
-        total_count = sum(gen.count for gen in generations)
+        # AssociationBatchItem と同じ形の辞書（成功時の結果はエンジンが生成した検証済みの値）
+        items: List[Optional[Dict[str, Any]]] = [None] * len(request.requests)
+        # キャッシュを確認する要素（位置, モデル名, キャッシュキー）
+        lookups: List[tuple] = []
         
-        logger.info(f"連想語取得完了 - 総数: {total_count}")
+        for index, item in enumerate(request.requests):
+            name = item.model or registry.default
+            w2v_model = leased[name]
+            
+            # モデル・キーワード存在チェック
+            error = None
+            if w2v_model is None:
+                error = ErrorResponse(
+                    error_code=ErrorCodeEnum.MODEL_NOT_FOUND,
+                    message=f"モデル '{name}' は登録されていません"
+                )
+            elif not w2v_model.is_loaded():
+                error = ErrorResponse(
+                    error_code=ErrorCodeEnum.MODEL_LOAD_ERROR,
+                    message="モデルが利用できません"
+                )
+            else:
+                missing = find_missing_keyword(item, w2v_model)
+                if missing is not None:
+                    error = ErrorResponse(
+                        error_code=ErrorCodeEnum.KEYWORD_NOT_FOUND,
+                        message=f"キーワード '{missing}' がモデルに存在しません"
+                    )
+            if error is not None:
+                items[index] = AssociationBatchItem(
+                    index=index,
+                    status=StatusEnum.ERROR,
+                    error=error
+                ).model_dump(mode="json")
+                continue
+            
+            lookups.append((index, name, response_cache_key(item, w2v_model)))
         
-        return AssociationResponse(
-            keyword=request.keyword,
-            generation=request.generation,
-            generations=generations,
-            total_count=total_count
-        )
+        # モデル名 -> 計算が必要な要素の位置
+        pending: Dict[str, List[int]] = {}
+        cached_list = await get_cached_responses([cache_key for _, _, cache_key in lookups])
+        for (index, name, _), cached in zip(lookups, cached_list):
+            if cached is not None:
+                items[index] = batch_success_item(index, cached)
+            else:
+                pending.setdefault(name, []).append(index)
         
-    except ValueError as e:
-        raise HTTPException(status_code=400, detail=str(e))
-    except Exception as e:
-        logger.error(f"連想語取得エラー: {e}")
-        raise HTTPException(status_code=500, detail="連想語取得に失敗しました")
+        pending_count = sum(len(indices) for indices in pending.values())
+        if pending_count:
+            logger.info(f"連想語一括取得開始 - 件数: {pending_count}")
+            # 計算が必要な件数分を流量制限のコストとして処理枠を確保
+            async with admission.slot(request_client_id(http_request), cost=pending_count):
+                for name, indices in pending.items():
+                    w2v_model = leased[name]
+                    stats_list: List[Dict[str, int]] = [{} for _ in indices]
+                    try:
+                        generations_list = await w2v_model.get_generation_payloads(
+                            [request.requests[index] for index in indices],
+                            stats=stats_list
+                        )
+                    except Exception as e:
+                        logger.error(f"連想語一括取得エラー: {e}")
+                        raise HTTPException(status_code=500, detail="連想語取得に失敗しました")
+                    
+                    for index, generations, stats in zip(indices, generations_list, stats_list):
+                        item = request.requests[index]
+                        response = make_association_response(item, generations, stats)
+                        cache_key = response_cache_key(item, w2v_model)
+                        if cache_key is not None:
+                            put_cached_response(cache_key, response)
+                        items[index] = batch_success_item(index, response)
+    
+    error_count = sum(1 for item in items if item["status"] == StatusEnum.ERROR.value)
+    return FastJSONResponse({
+        "status": StatusEnum.SUCCESS.value,
+        "results": items,
+        "success_count": len(items) - error_count,
+        "error_count": error_count
+    })
+
+
+def batch_success_item(index: int, response: Dict[str, Any]) -> Dict[str, Any]:
+    """一括取得の成功要素（AssociationBatchItem と同じ形の辞書）"""
+    return {"index": index, "status": StatusEnum.SUCCESS.value, "result": response, "error": None}
 
 
 @app.get(
@@ -266,15 +891,18 @@ async def get_associated_words(request: AssociationRequest) -> AssociationRespon
     summary="モデル情報取得",
     description="使用中のWord2Vecモデルの情報を取得します",
     responses={
+        404: {"model": ErrorResponse, "description": "モデルが登録されていない"},
         500: {"model": ErrorResponse, "description": "サーバーエラー"}
     },
     tags=["Model"]
 )
-async def get_model_info() -> ModelInfoResponse:
+async def get_model_info(
+    model: Optional[str] = Query(None, max_length=50, description="モデル名（省略時は既定モデル）")
+) -> ModelInfoResponse:
     """モデル情報取得エンドポイント"""
-    global w2v_model
+    w2v_model = registry.get(model)
     
-    if not w2v_model or not w2v_model.is_loaded():
+    if not w2v_model.is_loaded():
         raise HTTPException(
             status_code=503,
             detail="モデルが利用できません"
@@ -289,6 +917,167 @@ async def get_model_info() -> ModelInfoResponse:
         raise HTTPException(status_code=500, detail="モデル情報の取得に失敗しました")
 
 
+def model_status(name: str, w2v_model) -> Dict[str, Any]:
+    """登録済みモデルの状態（ModelStatus と同じ形の辞書）"""
+    pending = registry.pending.get(name)
+    return {
+        **w2v_model.get_load_status(),
+        "name": name,
+        "default": name == registry.default,
+        "version": w2v_model.version,
+        "model_type": w2v_model.MODEL_TYPE,
+        "vocabulary_size": len(w2v_model.model.key_to_index) if w2v_model.is_loaded() else None,
+        "active_requests": registry.active_requests(w2v_model),
+        "draining": registry.draining(name),
+        "memory": w2v_model.memory_usage(),
+        "next": {"version": pending.version, **pending.get_load_status()} if pending else None
+    }
+
+
+@app.get(
+    "/api/v1/models",
+    response_model=ModelListResponse,
+    summary="モデル一覧取得",
+    description="""
+    登録済みモデルの版・起動状態・処理中のリクエスト数・メモリ使用量を取得します
+    
+    連想語取得の `model` に指定すると、既定モデル以外のモデルを使用できます。
+    再読み込み中のモデルは、準備中の新しい版の状態を `next` として返します。
+    """,
+    tags=["Model"]
+)
+async def list_models() -> ModelListResponse:
+    """モデル一覧取得エンドポイント"""
+    return ModelListResponse(
+        default_model=registry.default,
+        models=[model_status(name, registry.get(name)) for name in registry.names()]
+    )
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    """管理APIの認証（ADMIN_TOKEN 未設定の場合は管理API自体を無効とする）"""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="管理APIは無効です（ADMIN_TOKEN が未設定）")
+    if not hmac.compare_digest((x_admin_token or "").encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="管理トークンが正しくありません")
+
+
+@app.post(
+    "/api/v1/models/{name}/reload",
+    response_model=ModelReloadResponse,
+    status_code=202,
+    summary="モデル再読み込み（無停止入れ替え）",
+    dependencies=[Depends(require_admin)],
+    description="""
+    モデルの新しい版をバックグラウンドで読み込み、ウォームアップ完了後に入れ替えます
+    
+    - 準備中も現在の版でリクエストを処理し、入れ替え後のリクエストから新しい版を使用します
+    - 入れ替え前に始まったリクエストは古い版で完了し、その後古い版のメモリを解放します
+    - 準備に失敗した場合は現在の版を使い続けます
+    - 未登録のモデル名（light / medium / large / full）を指定すると新たに登録します
+    - `X-Admin-Token` ヘッダーに環境変数 `ADMIN_TOKEN` の値が必要です
+    """,
+    responses={
+        400: {"model": ErrorResponse, "description": "モデルファイルが存在しない"},
+        401: {"description": "管理トークンが正しくない"},
+        403: {"description": "管理APIが無効"},
+        404: {"model": ErrorResponse, "description": "登録できないモデル名"},
+        409: {"description": "既に準備中"}
+    },
+    tags=["Model"]
+)
+async def reload_model(name: str, request: Optional[ModelReloadRequest] = None) -> ModelReloadResponse:
+    """モデル再読み込みエンドポイント"""
+    if name not in MODEL_TYPES:
+        raise UnknownModel(f"モデル '{name}' は登録できません（{' / '.join(MODEL_TYPES)}）")
+    if registry.is_loading(name):
+        raise HTTPException(status_code=409, detail=f"モデル '{name}' は準備中です")
+    
+    model_path = request.model_path if request else None
+    if model_path and not Path(model_path).exists():
+        raise HTTPException(status_code=400, detail=f"モデルファイルが存在しません: {model_path}")
+    
+    w2v_model = create_model(name, model_path)
+    registry.load(name, w2v_model, prepare_model)
+    logger.info(f"🔁 モデル '{name}' の版 {w2v_model.version} の準備を開始しました")
+    return ModelReloadResponse(
+        name=name,
+        version=w2v_model.version,
+        message="新しい版の準備を開始しました"
+    )
+
+
+@app.get(
+    "/api/v1/vocab/suggest",
+    response_model=VocabSuggestResponse,
+    summary="キーワード候補取得",
+    description="""
+    指定した文字列で始まる語彙を出現頻度順に返します
+    
+    候補の語は括弧を除いた表記で、そのまま連想語取得のキーワードに指定できます。
+    """,
+    responses={
+        404: {"model": ErrorResponse, "description": "モデルが登録されていない"},
+        503: {"model": ErrorResponse, "description": "サービス利用不可"}
+    },
+    tags=["Model"]
+)
+async def suggest_vocabulary(
+    prefix: str = Query(..., min_length=1, max_length=100, description="前方一致させる文字列"),
+    limit: int = Query(10, ge=1, le=50, description="最大件数"),
+    model: Optional[str] = Query(None, max_length=50, description="モデル名（省略時は既定モデル）")
+) -> VocabSuggestResponse:
+    """キーワード候補取得エンドポイント"""
+    w2v_model = registry.get(model)
+    
+    if not w2v_model.is_loaded():
+        raise HTTPException(
+            status_code=503,
+            detail="モデルが利用できません"
+        )
+    
+    return VocabSuggestResponse(
+        prefix=prefix,
+        suggestions=[
+            {"word": word, "rank": rank}
+            for word, rank in w2v_model.suggest_words(prefix, limit)
+        ]
+    )
+
+
+@app.get(
+    "/api/v1/cache/stats",
+    response_model=CacheStatsResponse,
+    summary="キャッシュ統計取得",
+    description="連想語候補キャッシュとレスポンスキャッシュのヒット/ミス/追い出し数、同一検索の相乗り数、共有キャッシュの統計を取得します",
+    responses={
+        404: {"model": ErrorResponse, "description": "モデルが登録されていない"},
+        503: {"model": ErrorResponse, "description": "サービス利用不可"}
+    },
+    tags=["Model"]
+)
+async def get_cache_stats(
+    model: Optional[str] = Query(None, max_length=50, description="モデル名（省略時は既定モデル）")
+) -> CacheStatsResponse:
+    """キャッシュ統計取得エンドポイント"""
+    w2v_model = registry.get(model)
+    
+    if not w2v_model.is_loaded():
+        raise HTTPException(
+            status_code=503,
+            detail="モデルが利用できません"
+        )
+    
+    return CacheStatsResponse(
+        caches={
+            **w2v_model.get_cache_stats(),
+            "responses": response_cache.stats()
+        },
+        coalescing=w2v_model.get_coalescing_stats(),
+        shared=shared_cache.stats() if shared_cache is not None else None
+    )
+
+
 # ルートエンドポイント
 @app.get("/", include_in_schema=False)
 async def root():
@@ -301,16 +1090,57 @@ async def root():
     }
 
 
+def load_status() -> Dict[str, Any]:
+    """既定モデルの起動状態"""
+    w2v_model = registry.models.get(registry.default)
+    if not w2v_model:
+        return {"phase": "starting", "progress": None}
+    return w2v_model.get_load_status()
+
+
+def is_ready() -> bool:
+    """既定モデルがリクエストを受け付けられるか"""
+    w2v_model = registry.models.get(registry.default)
+    return bool(w2v_model and w2v_model.is_ready())
+
+
 # ヘルスチェックエンドポイント（Heroku用）
 @app.get("/api/v1/health", include_in_schema=False)
 async def health_check():
-    """ヘルスチェックエンドポイント"""
-    if not w2v_model or not w2v_model.is_loaded():
+    """ヘルスチェックエンドポイント（準備完了で200）"""
+    if not is_ready():
         return JSONResponse(
             status_code=503,
-            content={"status": "unhealthy", "message": "モデルが読み込まれていません"}
+            content={"status": "unhealthy", "message": "モデルが読み込まれていません", **load_status()}
         )
-    return {"status": "healthy", "message": "API is running"}
+    return {"status": "healthy", "message": "API is running", **load_status()}
+
+
+# 生存確認（プロセスが応答し、モデルの準備に失敗していなければ200）
+@app.get("/api/v1/health/live", include_in_schema=False)
+async def liveness_check():
+    """生存確認エンドポイント"""
+    status = load_status()
+    if status["phase"] == "failed":
+        return JSONResponse(status_code=503, content={"status": "failed", **status})
+    return {"status": "alive", **status}
+
+
+# 準備完了確認（モデル読み込みとウォームアップが終わるまでは503、フェーズと進捗率を返す）
+@app.get("/api/v1/health/ready", include_in_schema=False)
+async def readiness_check():
+    """準備完了確認エンドポイント"""
+    status = load_status()
+    if not is_ready():
+        return JSONResponse(status_code=503, content={"status": "not_ready", **status})
+    return {"status": "ready", **status}
+
+
+# メトリクスエンドポイント（Prometheus）
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheusテキスト形式のメトリクス"""
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
 
 
 # 開発サーバー起動
@@ -318,15 +1148,24 @@ if __name__ == "__main__":
     # Cloud Run, Heroku, その他のプラットフォーム対応
     port = int(os.getenv("PORT", os.getenv("API_PORT", 8080)))
     host = os.getenv("API_HOST", "0.0.0.0")
+    workers = int(os.getenv("WORKERS", 1))
     
     logger.info(f"🌐 サーバー起動: http://{host}:{port}")
     logger.info(f"📚 ドキュメント: http://{host}:{port}/docs")
     logger.info(f"🎯 モデルタイプ: {os.getenv('MODEL_TYPE', 'light')}")
     
+    if workers > 1:
+        # 複数ワーカー: 親プロセスでネイティブキャッシュを用意し、
+        # 各ワーカーは同じファイルを読み取り専用mmapで参照する（行列はワーカー数分複製されない）
+        logger.info(f"👥 ワーカー数: {workers}（モデル行列を共有）")
+        if not asyncio.run(get_model_class()().prepare_native_cache()):
+            raise SystemExit("共有モデルキャッシュの準備に失敗しました")
+    
     uvicorn.run(
         "main:app",
         host=host,
         port=port,
+        workers=workers,
         reload=False,  # 本番モード
         log_level="info"
     )
\ No newline at end of file
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+合成Word2Vecモデル生成スクリプト
+S3の実モデルなしで読み込み・検索を計測できるよう、乱数シードから決定的に
+word2vec形式（バイナリ/テキスト）のモデルを生成する
+
+ベクトルはクラスタ中心の周りに分布させるため、同じクラスタの語同士は
+類似度が高くなり、閾値によるフィルタリングも実モデルに近い挙動になる。
+
+実行方法:
+    python make_synthetic_model.py --vocab-size 100000 --dim 200 --output models/synthetic.bin
+    python make_synthetic_model.py --vocab-size 10000 --format text --output models/synthetic.txt
+"""
+
+import argparse
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# 語彙の先頭に置く語（APIテスト・ベンチマークのキーワード用）
+DEFAULT_KEYWORDS = ["犬", "猫", "東京", "音楽", "科学"]
+# 一度に生成する行数（巨大な語彙でもメモリ使用量を抑える）
+CHUNK_ROWS = 65536
+
+
+def synthetic_words(vocab_size: int, keywords: List[str], entity_ratio: float) -> List[str]:
+    """語彙を生成（entity_vector と同様に一部の語を [..] で囲む）"""
+    words = list(dict.fromkeys(keywords))[:vocab_size]
+    entity_every = int(1 / entity_ratio) if entity_ratio > 0 else 0
+    for i in range(len(words), vocab_size):
+        word = f"語{i}"
+        if entity_every and i % entity_every == 0:
+            word = f"[{word}]"
+        words.append(word)
+    return words
+
+
+def generate_model(
+    output: str,
+    vocab_size: int,
+    dim: int = 200,
+    seed: int = 0,
+    binary: Optional[bool] = None,
+    clusters: int = 0,
+    noise: float = 0.6,
+    keywords: List[str] = DEFAULT_KEYWORDS,
+    entity_ratio: float = 0.1
+) -> str:
+    """
+    合成モデルを生成してファイルに書き出す
+
+    同じ引数からは常に同じファイルが生成される。
+    binary 未指定時は拡張子 .bin ならバイナリ形式、それ以外はテキスト形式。
+    clusters 未指定（0）時は語彙数の平方根をクラスタ数とする。
+    """
+    path = Path(output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if binary is None:
+        binary = path.suffix == ".bin"
+    clusters = clusters or max(1, int(np.sqrt(vocab_size)))
+
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    words = synthetic_words(vocab_size, keywords, entity_ratio)
+
+    # テキスト形式の1行分（語を除く）の書式
+    text_format = " ".join(["%.6f"] * dim)
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(f"{vocab_size} {dim}\n".encode("utf-8"))
+        for start in range(0, vocab_size, CHUNK_ROWS):
+            end = min(start + CHUNK_ROWS, vocab_size)
+            assignment = rng.integers(0, clusters, size=end - start)
+            vectors = centers[assignment] + noise * rng.standard_normal((end - start, dim), dtype=np.float32)
+            vectors = vectors.astype(np.float32)
+
+            for word, vector in zip(words[start:end], vectors):
+                if binary:
+                    f.write(word.encode("utf-8") + b" " + vector.tobytes())
+                else:
+                    f.write(f"{word} {text_format % tuple(vector)}\n".encode("utf-8"))
+    tmp.replace(path)
+    return str(path)
+
+
+def main() -> int:
+    """メイン処理"""
+    parser = argparse.ArgumentParser(description="合成Word2Vecモデル生成")
+    parser.add_argument("--vocab-size", type=int, default=100000, help="語彙数")
+    parser.add_argument("--dim", type=int, default=200, help="ベクトル次元")
+    parser.add_argument("--seed", type=int, default=0, help="乱数シード")
+    parser.add_argument("--format", choices=["binary", "text"], help="出力形式（省略時は拡張子から判定）")
+    parser.add_argument("--clusters", type=int, default=0, help="クラスタ数（0: 語彙数の平方根）")
+    parser.add_argument("--noise", type=float, default=0.6, help="クラスタ中心からのばらつき")
+    parser.add_argument("--keywords", nargs="*", default=DEFAULT_KEYWORDS, help="語彙の先頭に置く語")
+    parser.add_argument("--output", default="models/synthetic.bin", help="出力ファイル")
+    args = parser.parse_args()
+
+    binary = None if args.format is None else args.format == "binary"
+    logger.info(f"🧪 合成モデル生成中: 語彙数 {args.vocab_size:,}, 次元 {args.dim}")
+    started = time.perf_counter()
+
+    output = generate_model(
+        args.output,
+        args.vocab_size,
+        dim=args.dim,
+        seed=args.seed,
+        binary=binary,
+        clusters=args.clusters,
+        noise=args.noise,
+        keywords=args.keywords
+    )
+
+    size_mb = Path(output).stat().st_size / 1024**2
+    logger.info(f"✅ 生成完了: {output} ({size_mb:.1f}MB, {time.perf_counter() - started:.1f}秒)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+モデルレジストリ
+名前付きで複数のモデルを保持し、新しい版をバックグラウンドで準備してから無停止で入れ替える
+"""
+
+import asyncio
+import gc
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class UnknownModel(LookupError):
+    """登録されていないモデル名"""
+
+
+class ModelRegistry:
+    """
+    名前付きモデルのレジストリ
+
+    名前ごとに公開中の版を1つ持つ。再読み込みでは新しい版を別に読み込み・ウォームアップし、
+    準備完了後に公開中の版を1回の代入で差し替える。以降のリクエストは新しい版を使い、
+    処理中のリクエストは貸し出された古い版のまま完了する。古い版は貸し出しが
+    なくなった時点で解放する（イベントループ上でのみ操作するためロックは不要）。
+    """
+
+    def __init__(self, default: str):
+        self.default = default
+        # 名前 -> 公開中の版
+        self.models: Dict[str, Any] = {}
+        # 名前 -> 準備中の新しい版
+        self.pending: Dict[str, Any] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # id(モデル) -> 貸し出し中のリクエスト数
+        self.leases: Dict[int, int] = {}
+        # id(モデル) -> 貸し出しの終了を待って解放する古い版
+        self.retired: Dict[int, Any] = {}
+        self.swap_count = 0
+
+    def names(self) -> List[str]:
+        """登録済みのモデル名（既定モデルが先頭）"""
+        return sorted(self.models, key=lambda name: name != self.default)
+
+    def get(self, name: Optional[str] = None) -> Any:
+        """公開中の版を取得（名前省略時は既定モデル）"""
+        name = name or self.default
+        model = self.models.get(name)
+        if model is None:
+            raise UnknownModel(f"モデル '{name}' は登録されていません")
+        return model
+
+    def is_loading(self, name: str) -> bool:
+        """指定した名前の版を準備中かチェック"""
+        task = self.tasks.get(name)
+        return task is not None and not task.done()
+
+    def load(self, name: str, model: Any, prepare: Callable[[Any], Awaitable[bool]]) -> bool:
+        """
+        モデルをバックグラウンドで準備し、完了後に name の版として公開
+
+        初回はすぐに登録して起動状態を確認できるようにし、2回目以降は準備完了まで
+        現在の版で処理を続ける。既に準備中の場合は何もせずFalseを返す。
+        """
+        if self.is_loading(name):
+            return False
+        current = self.models.get(name)
+        model.name = name
+        model.version = current.version + 1 if current is not None else 1
+        if current is None:
+            self.models[name] = model
+        else:
+            self.pending[name] = model
+        self.tasks[name] = asyncio.create_task(self._prepare(name, model, current, prepare))
+        return True
+
+    async def _prepare(
+        self,
+        name: str,
+        model: Any,
+        current: Optional[Any],
+        prepare: Callable[[Any], Awaitable[bool]]
+    ) -> None:
+        """新しい版を準備して公開中の版と入れ替える"""
+        try:
+            ready = await prepare(model)
+        except Exception as e:
+            logger.error(f"❌ モデル '{name}' の版 {model.version} の準備中にエラーが発生しました: {e}")
+            ready = False
+        finally:
+            self.pending.pop(name, None)
+
+        if current is None:
+            return
+        if not ready:
+            logger.error(f"❌ モデル '{name}' の版 {model.version} の準備に失敗したため、版 {current.version} を継続します")
+            self._release(model)
+            return
+
+        self.models[name] = model
+        self.swap_count += 1
+        logger.info(f"🔄 モデル '{name}' を版 {current.version} から版 {model.version} に入れ替えました")
+        self._retire(current)
+
+    @asynccontextmanager
+    async def lease(self, name: Optional[str] = None) -> AsyncIterator[Any]:
+        """公開中の版を貸し出す（貸し出し中は入れ替え後も解放されない）"""
+        model = self.get(name)
+        key = id(model)
+        self.leases[key] = self.leases.get(key, 0) + 1
+        try:
+            yield model
+        finally:
+            self.leases[key] -= 1
+            if self.leases[key] == 0:
+                del self.leases[key]
+                retired = self.retired.pop(key, None)
+                if retired is not None:
+                    self._release(retired)
+
+    def active_requests(self, model: Any) -> int:
+        """モデルを貸し出し中のリクエスト数"""
+        return self.leases.get(id(model), 0)
+
+    def _retire(self, model: Any) -> None:
+        """入れ替えた古い版を、処理中のリクエストがなくなり次第解放する"""
+        active = self.active_requests(model)
+        if active == 0:
+            self._release(model)
+            return
+        logger.info(f"⏳ 処理中のリクエスト {active} 件の完了後に版 {model.version} を解放します")
+        self.retired[id(model)] = model
+
+    def _release(self, model: Any) -> None:
+        """モデルを閉じてメモリを解放"""
+        model.close()
+        gc.collect()
+        logger.info(f"🧹 モデル '{model.name}' の版 {model.version} を解放しました")
+
+    def draining(self, name: str) -> int:
+        """解放待ちの古い版の数"""
+        return sum(1 for model in self.retired.values() if model.name == name)
+
+    async def shutdown(self) -> None:
+        """準備中のタスクを中止"""
+        for task in self.tasks.values():
+            if not task.done():
+                task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
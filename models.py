@@ -3,8 +3,8 @@ Pydantic models for Word Association API
 swagger.yamlの定義に基づくデータモデル
 """
 
-from typing import List, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from pydantic import BaseModel, ConfigDict, Field
 from enum import Enum
 
 
@@ -22,6 +22,7 @@ class ErrorCodeEnum(str, Enum):
     INTERNAL_ERROR = "INTERNAL_ERROR"
     MODEL_LOAD_ERROR = "MODEL_LOAD_ERROR"
     RATE_LIMIT_EXCEEDED = "RATE_LIMIT_EXCEEDED"
+    MODEL_NOT_FOUND = "MODEL_NOT_FOUND"
 
 
 class AssociationRequest(BaseModel):
@@ -47,6 +48,50 @@ class AssociationRequest(BaseModel):
         description="類似度の閾値",
         example=0.7
     )
+    seed: Optional[int] = Field(
+        default=None,
+        ge=0,
+        description="乱数シード（指定すると同じ条件で常に同じ結果を返す）",
+        example=42
+    )
+    unique: bool = Field(
+        default=False,
+        description="既に木に現れた語を候補から除外し、各語を高々1回だけ展開する",
+        example=False
+    )
+    positive: List[str] = Field(
+        default_factory=list,
+        max_length=10,
+        description="キーワードに加える語（各語のベクトルを足し合わせた方向から第2世代を取得）",
+        example=["公園"]
+    )
+    negative: List[str] = Field(
+        default_factory=list,
+        max_length=10,
+        description="差し引く語（類推: 王 + 女 - 男）",
+        example=[]
+    )
+    model: Optional[str] = Field(
+        default=None,
+        max_length=50,
+        description="使用するモデル名（省略時は既定モデル）",
+        example="light"
+    )
+    
+    def query_words(self) -> List[str]:
+        """クエリに含まれる全ての語（キーワード・加える語・差し引く語）"""
+        return [self.keyword, *self.positive, *self.negative]
+    
+    def query_label(self) -> str:
+        """第2世代の親として表示するクエリの表記（単一キーワードの場合はキーワード）"""
+        label = " + ".join([self.keyword, *self.positive])
+        if self.negative:
+            label += " - " + " - ".join(self.negative)
+        return label
+    
+    def is_combined(self) -> bool:
+        """複数の語を組み合わせたクエリか"""
+        return bool(self.positive or self.negative)
 
 
 class AssociationResult(BaseModel):
@@ -116,6 +161,11 @@ class AssociationResponse(BaseModel):
         description="全世代の結果総数",
         example=6
     )
+    saved_expansions: Optional[int] = Field(
+        default=None,
+        description="unique指定時、既出のため展開を省いた語の数（指定しなければ選ばれ再展開されていた語）",
+        example=4
+    )
 
 
 class ModelInfo(BaseModel):
@@ -135,6 +185,26 @@ class ModelInfo(BaseModel):
         description="モデルタイプ",
         example="word2vec"
     )
+    index_type: Optional[str] = Field(
+        default=None,
+        description="類似度検索インデックスの種別（exact / quantized / ivf）",
+        example="exact"
+    )
+    vector_dtype: Optional[str] = Field(
+        default=None,
+        description="検索に使用するベクトルの格納形式",
+        example="float32"
+    )
+    index_memory_bytes: Optional[int] = Field(
+        default=None,
+        description="検索インデックスが保持する行列のバイト数",
+        example=812379200
+    )
+    ranking_recall: Optional[float] = Field(
+        default=None,
+        description="量子化時の厳密検索に対する recall@k（計測した場合のみ）",
+        example=0.97
+    )
 
 
 class ModelInfoResponse(BaseModel):
@@ -149,6 +219,313 @@ class ModelInfoResponse(BaseModel):
     )
 
 
+class CacheStats(BaseModel):
+    """キャッシュ統計モデル"""
+    size: int = Field(
+        ...,
+        ge=0,
+        description="現在のエントリ数",
+        example=1200
+    )
+    maxsize: int = Field(
+        ...,
+        ge=0,
+        description="最大エントリ数",
+        example=10000
+    )
+    hits: int = Field(
+        ...,
+        ge=0,
+        description="ヒット数",
+        example=5400
+    )
+    misses: int = Field(
+        ...,
+        ge=0,
+        description="ミス数",
+        example=1200
+    )
+    evictions: int = Field(
+        ...,
+        ge=0,
+        description="追い出し数",
+        example=0
+    )
+    hit_rate: float = Field(
+        ...,
+        ge=0.0,
+        le=1.0,
+        description="ヒット率",
+        example=0.82
+    )
+
+
+class CoalescingStats(BaseModel):
+    """検索の相乗り（シングルフライト）統計モデル"""
+    lookups: int = Field(
+        ...,
+        ge=0,
+        description="キャッシュになく候補検索を要求された単語数",
+        example=9800
+    )
+    coalesced: int = Field(
+        ...,
+        ge=0,
+        description="実行中の同一検索に相乗りして計算を省いた単語数",
+        example=1500
+    )
+    in_flight: int = Field(
+        ...,
+        ge=0,
+        description="現在実行中の検索の単語数",
+        example=3
+    )
+
+
+class SharedCacheStats(BaseModel):
+    """共有キャッシュ統計モデル"""
+    available: bool = Field(
+        ...,
+        description="使用中か（通信エラー後の一定時間は使用を停止し、キャッシュなしとして動作）"
+    )
+    hits: int = Field(
+        ...,
+        ge=0,
+        description="ヒット数",
+        example=800
+    )
+    misses: int = Field(
+        ...,
+        ge=0,
+        description="ミス数",
+        example=200
+    )
+    skipped: int = Field(
+        ...,
+        ge=0,
+        description="使用停止中のため参照しなかった数",
+        example=0
+    )
+    errors: int = Field(
+        ...,
+        ge=0,
+        description="通信エラー数",
+        example=0
+    )
+    invalid: int = Field(
+        ...,
+        ge=0,
+        description="変換できずミスとして扱った値の数",
+        example=0
+    )
+    pending_writes: int = Field(
+        ...,
+        ge=0,
+        description="書き込み待ちの件数",
+        example=0
+    )
+    dropped_writes: int = Field(
+        ...,
+        ge=0,
+        description="書き込み待ちが多いため捨てた書き込み数",
+        example=0
+    )
+    hit_rate: float = Field(
+        ...,
+        ge=0.0,
+        le=1.0,
+        description="ヒット率",
+        example=0.8
+    )
+
+
+class CacheStatsResponse(BaseModel):
+    """キャッシュ統計レスポンスモデル"""
+    status: StatusEnum = Field(
+        default=StatusEnum.SUCCESS,
+        description="レスポンスステータス"
+    )
+    caches: Dict[str, CacheStats] = Field(
+        ...,
+        description="キャッシュ名ごとの統計"
+    )
+    coalescing: Optional[CoalescingStats] = Field(
+        None,
+        description="同時に実行された同一検索の相乗り統計"
+    )
+    shared: Optional[SharedCacheStats] = Field(
+        None,
+        description="共有キャッシュ（L2）の統計（REDIS_URL 未設定時はNone）"
+    )
+
+
+class VocabSuggestion(BaseModel):
+    """キーワード候補モデル"""
+    word: str = Field(
+        ...,
+        description="候補の語（括弧除去後の表記、そのままキーワードに指定可能）",
+        example="犬"
+    )
+    rank: int = Field(
+        ...,
+        ge=0,
+        description="語彙内の出現頻度順位（0が最頻出）",
+        example=1520
+    )
+
+
+class VocabSuggestResponse(BaseModel):
+    """キーワード候補レスポンスモデル"""
+    status: StatusEnum = Field(
+        default=StatusEnum.SUCCESS,
+        description="レスポンスステータス"
+    )
+    prefix: str = Field(
+        ...,
+        description="入力された前方一致文字列",
+        example="犬"
+    )
+    suggestions: List[VocabSuggestion] = Field(
+        ...,
+        description="前方一致する語（出現頻度順）"
+    )
+
+
+class MemoryUsage(BaseModel):
+    """メモリ使用量モデル"""
+    resident_bytes: int = Field(
+        ...,
+        ge=0,
+        description="プロセスのヒープ上のバイト数",
+        example=40000000
+    )
+    mapped_bytes: int = Field(
+        ...,
+        ge=0,
+        description="ファイルmmapのバイト数（ページキャッシュ上でワーカー間で共有）",
+        example=0
+    )
+
+
+class ModelLoadStatus(BaseModel):
+    """モデルの起動状態モデル"""
+    version: int = Field(
+        ...,
+        ge=1,
+        description="版（再読み込みのたびに増える）",
+        example=1
+    )
+    phase: str = Field(
+        ...,
+        description="起動状態（downloading / loading / indexing / warming / ready / failed など）",
+        example="ready"
+    )
+    progress: Optional[float] = Field(
+        default=None,
+        description="現在のフェーズの進捗率（0.0-1.0）",
+        example=1.0
+    )
+    error: Optional[str] = Field(
+        default=None,
+        description="準備に失敗した場合のエラー"
+    )
+
+
+class ModelStatus(ModelLoadStatus):
+    """登録済みモデルの状態モデル"""
+    name: str = Field(
+        ...,
+        description="モデル名",
+        example="light"
+    )
+    default: bool = Field(
+        ...,
+        description="既定モデルか"
+    )
+    model_type: str = Field(
+        ...,
+        description="モデルタイプ",
+        example="word2vec-light"
+    )
+    vocabulary_size: Optional[int] = Field(
+        default=None,
+        description="語彙数（読み込み済みの場合）",
+        example=50000
+    )
+    active_requests: int = Field(
+        ...,
+        ge=0,
+        description="この版で処理中のリクエスト数"
+    )
+    draining: int = Field(
+        ...,
+        ge=0,
+        description="処理中のリクエストの完了を待って解放する古い版の数"
+    )
+    memory: Dict[str, MemoryUsage] = Field(
+        default_factory=dict,
+        description="構成要素（vectors / index / neighbor_table / vocabulary）ごとのメモリ使用量"
+    )
+    next: Optional[ModelLoadStatus] = Field(
+        default=None,
+        description="準備中の新しい版（再読み込み中のみ）"
+    )
+
+
+class ModelListResponse(BaseModel):
+    """登録済みモデル一覧レスポンスモデル"""
+    status: StatusEnum = Field(
+        default=StatusEnum.SUCCESS,
+        description="レスポンスステータス"
+    )
+    default_model: str = Field(
+        ...,
+        description="既定モデル名",
+        example="light"
+    )
+    models: List[ModelStatus] = Field(
+        ...,
+        description="登録済みモデル（既定モデルが先頭）"
+    )
+
+
+class ModelReloadRequest(BaseModel):
+    """モデル再読み込みリクエストモデル"""
+    # model_path は pydantic の予約名前空間（model_）と重なるが、フィールド名として使う
+    model_config = ConfigDict(protected_namespaces=())
+    
+    model_path: Optional[str] = Field(
+        default=None,
+        max_length=500,
+        description="読み込むモデルファイル（省略時は現在と同じ設定で読み直す。派生ファイルはモデルファイルの隣を使用）",
+        example="models/entity_vector_v2.kv"
+    )
+
+
+class ModelReloadResponse(BaseModel):
+    """モデル再読み込みレスポンスモデル"""
+    status: StatusEnum = Field(
+        default=StatusEnum.SUCCESS,
+        description="レスポンスステータス"
+    )
+    name: str = Field(
+        ...,
+        description="モデル名",
+        example="light"
+    )
+    version: int = Field(
+        ...,
+        ge=1,
+        description="準備を開始した版",
+        example=2
+    )
+    message: str = Field(
+        ...,
+        description="メッセージ",
+        example="新しい版の準備を開始しました"
+    )
+
+
 class ErrorResponse(BaseModel):
     """エラーレスポンスモデル"""
     status: StatusEnum = Field(
@@ -163,4 +540,60 @@ class ErrorResponse(BaseModel):
         ...,
         description="エラーメッセージ",
         example="指定されたキーワードがモデルに存在しません"
-    )
\ No newline at end of file
+    )
+
+
+class AssociationBatchRequest(BaseModel):
+    """連想語一括取得リクエストモデル"""
+    requests: List[AssociationRequest] = Field(
+        ...,
+        min_length=1,
+        max_length=100,
+        description="連想語取得リクエストのリスト（最大100件）"
+    )
+
+
+class AssociationBatchItem(BaseModel):
+    """連想語一括取得の個別結果モデル"""
+    index: int = Field(
+        ...,
+        ge=0,
+        description="リクエストリスト内の位置",
+        example=0
+    )
+    status: StatusEnum = Field(
+        ...,
+        description="個別結果のステータス"
+    )
+    result: Optional[AssociationResponse] = Field(
+        default=None,
+        description="成功時の連想語レスポンス"
+    )
+    error: Optional[ErrorResponse] = Field(
+        default=None,
+        description="失敗時のエラー"
+    )
+
+
+class AssociationBatchResponse(BaseModel):
+    """連想語一括取得レスポンスモデル"""
+    status: StatusEnum = Field(
+        default=StatusEnum.SUCCESS,
+        description="レスポンスステータス"
+    )
+    results: List[AssociationBatchItem] = Field(
+        ...,
+        description="リクエスト順の個別結果"
+    )
+    success_count: int = Field(
+        ...,
+        ge=0,
+        description="成功件数",
+        example=2
+    )
+    error_count: int = Field(
+        ...,
+        ge=0,
+        description="失敗件数",
+        example=0
+    )
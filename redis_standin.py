@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Redis互換のローカルスタンドイン
+共有キャッシュの動作確認用に、キャッシュが使うコマンドだけを実装したインメモリのRESPサーバー
+
+使用例:
+    python redis_standin.py --port 6380
+    REDIS_URL=redis://localhost:6380 python main.py
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class RedisStandIn:
+    """インメモリのキー・値ストア（有効期限付き）とRESPの応答"""
+
+    def __init__(self, password: Optional[str] = None):
+        self.password = password
+        # キー -> (値, 有効期限のmonotonic時刻 or None)
+        self.data: Dict[bytes, Tuple[bytes, Optional[float]]] = {}
+        self.commands = 0
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.data.get(key)
+        if entry is None:
+            return None
+        value, expires = entry
+        if expires is not None and time.monotonic() >= expires:
+            del self.data[key]
+            return None
+        return value
+
+    def execute(self, args: List[bytes], session: Dict[str, Any]) -> bytes:
+        """1つのコマンドを実行してRESPの応答を返す"""
+        self.commands += 1
+        name = args[0].upper().decode("ascii", "replace")
+        if self.password and not session.get("authenticated") and name not in ("AUTH", "PING", "QUIT"):
+            return b"-NOAUTH Authentication required.\r\n"
+
+        if name == "PING":
+            return b"+PONG\r\n"
+        if name == "AUTH":
+            if self.password and args[-1].decode("utf-8") != self.password:
+                return b"-WRONGPASS invalid username-password pair\r\n"
+            session["authenticated"] = True
+            return b"+OK\r\n"
+        if name in ("SELECT", "QUIT"):
+            return b"+OK\r\n"
+        if name == "GET":
+            return bulk(self._get(args[1]))
+        if name == "MGET":
+            values = [self._get(key) for key in args[1:]]
+            return b"*%d\r\n" % len(values) + b"".join(bulk(value) for value in values)
+        if name == "SET":
+            expires = None
+            options = [arg.upper() for arg in args[3:]]
+            for option, value in zip(options, args[4:]):
+                if option == b"PX":
+                    expires = time.monotonic() + int(value) / 1000
+                elif option == b"EX":
+                    expires = time.monotonic() + int(value)
+            self.data[args[1]] = (args[2], expires)
+            return b"+OK\r\n"
+        if name == "DEL":
+            return b":%d\r\n" % sum(1 for key in args[1:] if self.data.pop(key, None) is not None)
+        if name == "DBSIZE":
+            return b":%d\r\n" % len(self.data)
+        if name in ("FLUSHDB", "FLUSHALL"):
+            self.data.clear()
+            return b"+OK\r\n"
+        return b"-ERR unknown command '%s'\r\n" % args[0]
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """1接続分のコマンドを処理"""
+        session: Dict[str, Any] = {}
+        try:
+            while True:
+                args = await read_command(reader)
+                if args is None:
+                    break
+                if not args:
+                    continue
+                writer.write(self.execute(args, session))
+                await writer.drain()
+                if args[0].upper() == b"QUIT":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 6379) -> asyncio.AbstractServer:
+        """サーバーを起動（port=0 の場合は空いているポートを使用）"""
+        return await asyncio.start_server(self.handle, host, port)
+
+
+def bulk(value: Optional[bytes]) -> bytes:
+    """バルク文字列の応答"""
+    if value is None:
+        return b"$-1\r\n"
+    return b"$%d\r\n%s\r\n" % (len(value), value)
+
+
+async def read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    """RESPの配列形式のコマンドを1つ読み込む（接続終了時はNone）"""
+    line = await reader.readline()
+    if not line:
+        return None
+    if not line.startswith(b"*"):
+        # インラインコマンド（redis-cli や telnet からの入力）
+        return line.strip().split()
+    args = []
+    for _ in range(int(line[1:-2])):
+        length = int((await reader.readline())[1:-2])
+        args.append((await reader.readexactly(length + 2))[:-2])
+    return args
+
+
+async def serve(host: str, port: int, password: Optional[str]) -> None:
+    server = await RedisStandIn(password).start(host, port)
+    address = server.sockets[0].getsockname()
+    print(f"🧪 Redisスタンドインを起動しました: redis://{address[0]}:{address[1]}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="共有キャッシュ確認用のRedis互換スタンドイン")
+    parser.add_argument("--host", default="127.0.0.1", help="待ち受けアドレス")
+    parser.add_argument("--port", type=int, default=6379, help="待ち受けポート")
+    parser.add_argument("--password", default=None, help="AUTHで要求するパスワード")
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.password))
+    except KeyboardInterrupt:
+        print("\n⏹️  停止しました")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+"""
+共有キャッシュ（L2）
+Redisプロトコル（RESP2）の最小限の非同期クライアントと、値のバイナリ形式への変換
+
+プロセス内のLRUキャッシュ（L1）で外れた場合に参照し、ワーカー・コンテナ間で
+計算結果を共有する。Redisに接続できない・応答が遅い間は一定時間使用を止め、
+キャッシュなしとして動作を続ける。
+"""
+
+import asyncio
+import json
+import logging
+import ssl
+import struct
+import time
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+import numpy as np
+
+from fast_json import dumps as json_dumps
+
+logger = logging.getLogger(__name__)
+
+# 値の形式を変えた場合はキーの版を上げる（古い形式の値を読まないようにする）
+KEY_VERSION = "v1"
+
+
+class RedisError(Exception):
+    """Redisのエラー応答"""
+
+
+# 壊れた値・別の形式の値を変換した場合に発生する例外
+DECODE_ERRORS = (zlib.error, struct.error, ValueError, TypeError)
+
+
+def encode_command(*args: Any) -> bytes:
+    """コマンドをRESPの配列に変換"""
+    parts = [b"*%d\r\n" % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode("utf-8")
+        elif not isinstance(arg, bytes):
+            arg = str(arg).encode("ascii")
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    """RESPの応答を1つ読み込む（エラー応答は RedisError として返す）"""
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise ConnectionError("Redisとの接続が切断されました")
+    kind, body = line[:1], line[1:-2]
+    if kind == b"+":
+        return body.decode("utf-8")
+    if kind == b"-":
+        return RedisError(body.decode("utf-8"))
+    if kind == b":":
+        return int(body)
+    if kind == b"$":
+        length = int(body)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(body)
+        if length < 0:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise ConnectionError(f"不正なRedisの応答: {line[:50]!r}")
+
+
+class RedisClient:
+    """
+    Redisプロトコルの最小限の非同期クライアント
+
+    1本の接続でコマンドを順に送受信する（複数コマンドはまとめて送ってから応答を読む）。
+    通信エラーやタイムアウトの後は応答の対応がずれるため接続を閉じ、次回に接続し直す。
+    URLは redis://[ユーザー名:パスワード@]ホスト[:ポート][/DB番号]（rediss:// はTLS）。
+    """
+
+    def __init__(self, url: str, timeout: float = 0.1):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "rediss"):
+            raise ValueError(f"未対応のURLです: {url}")
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.ssl = ssl.create_default_context() if parsed.scheme == "rediss" else None
+        self.timeout = timeout
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+        self._lock = asyncio.Lock()
+
+    async def _connect(self) -> None:
+        """接続して認証・DB選択を行う"""
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.ssl)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        for reply in await self._send(setup):
+            if isinstance(reply, RedisError):
+                raise reply
+
+    async def _send(self, commands: Sequence[Tuple[Any, ...]]) -> List[Any]:
+        """コマンドをまとめて送信し、応答を順に読み込む"""
+        if not commands:
+            return []
+        self.writer.write(b"".join(encode_command(*command) for command in commands))
+        await self.writer.drain()
+        return [await read_reply(self.reader) for _ in commands]
+
+    async def pipeline(self, commands: Sequence[Tuple[Any, ...]]) -> List[Any]:
+        """
+        複数のコマンドを実行して応答のリストを返す
+
+        コマンド単位のエラー応答はリスト内の RedisError として返す。
+        接続・タイムアウトのエラーは例外を送出する。
+        """
+        # 前のコマンドの完了待ちを含めて timeout 秒で打ち切る
+        return await asyncio.wait_for(self._pipeline(commands), self.timeout)
+
+    async def _pipeline(self, commands: Sequence[Tuple[Any, ...]]) -> List[Any]:
+        async with self._lock:
+            try:
+                if self.writer is None:
+                    await self._connect()
+                return await self._send(commands)
+            except BaseException:
+                await self.close()
+                raise
+
+    async def execute(self, *args: Any) -> Any:
+        """1つのコマンドを実行（エラー応答は RedisError を送出）"""
+        reply = (await self.pipeline([args]))[0]
+        if isinstance(reply, RedisError):
+            raise reply
+        return reply
+
+    async def close(self) -> None:
+        """接続を閉じる"""
+        writer, self.reader, self.writer = self.writer, None, None
+        if writer is not None:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+
+class SharedCache:
+    """
+    共有キャッシュ（L2）
+
+    読み込みはリクエストの処理中に待つが、書き込みはバックグラウンドで行い応答を遅らせない。
+    通信に失敗した場合は retry_interval 秒間使用を止め、その間はキャッシュなし（全てミス）として扱う。
+    書き込み待ちが max_pending_writes 件を超えた分は捨てる。
+    """
+
+    def __init__(
+        self,
+        client: RedisClient,
+        prefix: str = "w2v:",
+        ttl: float = 86400,
+        retry_interval: float = 5.0,
+        max_pending_writes: int = 1000
+    ):
+        self.client = client
+        self.prefix = f"{prefix}{KEY_VERSION}:"
+        self.ttl_ms = int(ttl * 1000)
+        self.retry_interval = retry_interval
+        self.max_pending_writes = max_pending_writes
+        self.disabled_until = 0.0
+        self.writes: set = set()
+        self.pending_writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.errors = 0
+        self.invalid = 0
+        self.dropped_writes = 0
+
+    def available(self) -> bool:
+        """使用を止めていないか"""
+        return time.monotonic() >= self.disabled_until
+
+    def _fail(self, operation: str, error: BaseException) -> None:
+        """通信エラーを記録して一定時間使用を止める"""
+        self.errors += 1
+        if self.available():
+            logger.warning(
+                f"共有キャッシュを{self.retry_interval:g}秒間使用しません（{operation}に失敗: {error!r}）"
+            )
+        self.disabled_until = time.monotonic() + self.retry_interval
+
+    async def get_many(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """値をまとめて取得（存在しない・使用できない場合はNone）"""
+        if not keys:
+            return []
+        if not self.available():
+            self.skipped += len(keys)
+            return [None] * len(keys)
+        try:
+            values = await self.client.execute("MGET", *[self.prefix + key for key in keys])
+        except (OSError, asyncio.TimeoutError, ConnectionError, RedisError, asyncio.IncompleteReadError) as e:
+            self._fail("読み込み", e)
+            return [None] * len(keys)
+        hits = sum(1 for value in values if value is not None)
+        self.hits += hits
+        self.misses += len(keys) - hits
+        return values
+
+    async def get(self, key: str) -> Optional[bytes]:
+        """値を取得（存在しない・使用できない場合はNone）"""
+        return (await self.get_many([key]))[0]
+
+    def decode(self, key: str, value: bytes, decoder: Callable[[bytes], Any]) -> Optional[Any]:
+        """
+        取得した値を変換（変換できない値はミスとして扱いNone）
+
+        壊れた値や別の用途で書かれた値でリクエストを失敗させないようにする。
+        """
+        try:
+            return decoder(value)
+        except DECODE_ERRORS as e:
+            self.invalid += 1
+            self.hits -= 1
+            self.misses += 1
+            logger.warning(f"共有キャッシュの値を変換できないため無視します（{key}: {e!r}）")
+            return None
+
+    def put_many(self, items: Dict[str, bytes]) -> None:
+        """値をバックグラウンドでまとめて書き込む（有効期限 ttl）"""
+        if not items or not self.available():
+            return
+        if self.pending_writes + len(items) > self.max_pending_writes:
+            self.dropped_writes += len(items)
+            return
+        self.pending_writes += len(items)
+        task = asyncio.ensure_future(self._write(items))
+        self.writes.add(task)
+        task.add_done_callback(self.writes.discard)
+
+    def put(self, key: str, value: bytes) -> None:
+        """値をバックグラウンドで書き込む"""
+        self.put_many({key: value})
+
+    async def _write(self, items: Dict[str, bytes]) -> None:
+        try:
+            await self.client.pipeline([
+                ("SET", self.prefix + key, value, "PX", self.ttl_ms) for key, value in items.items()
+            ])
+        except (OSError, asyncio.TimeoutError, ConnectionError, asyncio.IncompleteReadError) as e:
+            self._fail("書き込み", e)
+        finally:
+            self.pending_writes -= len(items)
+
+    async def close(self) -> None:
+        """書き込み待ちを完了させて接続を閉じる"""
+        if self.writes:
+            await asyncio.gather(*self.writes, return_exceptions=True)
+        await self.client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """統計情報を取得"""
+        lookups = self.hits + self.misses
+        return {
+            "available": self.available(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "pending_writes": self.pending_writes,
+            "dropped_writes": self.dropped_writes,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+
+def encode_candidates(candidates: Tuple[np.ndarray, np.ndarray]) -> bytes:
+    """候補（語彙インデックス, 類似度）をバイト列に変換（件数 + int32 + float32、1件8バイト）"""
+    indices, scores = candidates
+    return (
+        struct.pack("<I", len(indices))
+        + np.asarray(indices, dtype="<i4").tobytes()
+        + np.asarray(scores, dtype="<f4").tobytes()
+    )
+
+
+def decode_candidates(data: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """encode_candidates の逆変換（形式が合わない場合は ValueError）"""
+    (count,) = struct.unpack_from("<I", data)
+    if len(data) != 4 + 8 * count:
+        raise ValueError(f"候補の長さが一致しません: {len(data)}バイト")
+    indices = np.frombuffer(data, dtype="<i4", count=count, offset=4).astype(np.int64)
+    scores = np.frombuffer(data, dtype="<f4", count=count, offset=4 + 4 * count).astype(np.float32)
+    return indices, scores
+
+
+def encode_response(response: Dict[str, Any]) -> bytes:
+    """レスポンスの辞書を圧縮したJSONのバイト列に変換"""
+    return zlib.compress(json_dumps(response), 1)
+
+
+def decode_response(data: bytes) -> Dict[str, Any]:
+    """encode_response の逆変換（形式が合わない場合は ValueError）"""
+    response = json.loads(zlib.decompress(data))
+    if not isinstance(response, dict):
+        raise ValueError(f"レスポンスの形式が不正です: {type(response).__name__}")
+    return response
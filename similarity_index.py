@@ -0,0 +1,651 @@
+"""
+類似度検索インデックス
+コサイン類似度の上位k件検索（厳密検索 / 量子化検索 / IVF近似検索）
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# 類似度計算で一度に確保するブロックの要素数上限（float32で約64MB）
+SIMILARITY_BLOCK_ELEMENTS = 16 * 1024 * 1024
+
+
+def vector_fingerprint(vectors: np.ndarray, norms: np.ndarray) -> str:
+    """
+    ベクトル行列の指紋（行列の形と先頭・中央・末尾の行から計算）
+
+    正規化済みの行を半精度に丸めて使うため、同じモデルをテキスト形式から読んでも
+    ネイティブキャッシュ形式（正規化済み）から読んでも同じ値になる。
+    """
+    digest = hashlib.sha1(repr(vectors.shape).encode("ascii"))
+    for row in (0, len(vectors) // 2, len(vectors) - 1):
+        unit = np.asarray(vectors[row], dtype=np.float32) / np.float32(norms[row])
+        digest.update(unit.astype("<f2").tobytes())
+    return digest.hexdigest()[:16]
+
+
+def _empty_result(n_queries: int) -> Tuple[np.ndarray, np.ndarray]:
+    """空の検索結果"""
+    return (
+        np.empty((n_queries, 0), dtype=np.int64),
+        np.empty((n_queries, 0), dtype=np.float32)
+    )
+
+
+def _sort_desc(indices: np.ndarray, scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """行ごとに類似度降順へ並べ替え"""
+    order = np.argsort(-scores, axis=1, kind="stable")
+    return (
+        np.take_along_axis(indices, order, axis=1),
+        np.take_along_axis(scores, order, axis=1)
+    )
+
+
+def _blockwise_topk(
+    score_block,
+    n_rows: int,
+    n_queries: int,
+    k: int,
+    exclude: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    語彙方向のブロックごとに類似度を計算し、上位k件を逐次マージ
+
+    Args:
+        score_block: (start, end) を受け取り (クエリ数, end-start) の類似度を返す関数
+        n_rows: 語彙数
+        exclude: クエリごとに除外する語彙インデックス（-1は除外なし）
+    """
+    rows = np.arange(n_queries)
+    best_indices = np.zeros((n_queries, 0), dtype=np.int64)
+    best_scores = np.zeros((n_queries, 0), dtype=np.float32)
+
+    # 類似度ブロック（クエリ数×ブロック幅）のサイズを抑える
+    block_size = max(k + 1, SIMILARITY_BLOCK_ELEMENTS // n_queries)
+
+    for start in range(0, n_rows, block_size):
+        end = min(start + block_size, n_rows)
+        sims = score_block(start, end)
+
+        # クエリ単語自身は除外
+        if exclude is not None:
+            in_block = (exclude >= start) & (exclude < end)
+            sims[rows[in_block], exclude[in_block] - start] = -np.inf
+
+        width = end - start
+        if width > k:
+            part = np.argpartition(sims, width - k, axis=1)[:, width - k:]
+        else:
+            part = np.broadcast_to(np.arange(width), (n_queries, width))
+        part_scores = np.take_along_axis(sims, part, axis=1)
+
+        # これまでの上位k件とマージ
+        merged_indices = np.concatenate([best_indices, part + start], axis=1)
+        merged_scores = np.concatenate([best_scores, part_scores], axis=1)
+        if merged_scores.shape[1] > k:
+            keep = np.argpartition(merged_scores, merged_scores.shape[1] - k, axis=1)
+            keep = keep[:, merged_scores.shape[1] - k:]
+            merged_indices = np.take_along_axis(merged_indices, keep, axis=1)
+            merged_scores = np.take_along_axis(merged_scores, keep, axis=1)
+        best_indices, best_scores = merged_indices, merged_scores
+
+    return _sort_desc(best_indices, best_scores)
+
+
+class ExactIndex:
+    """
+    厳密検索インデックス（全語彙の総当たり）
+
+    クエリ行列を語彙方向のブロックごとに埋め込み行列と掛け合わせ、
+    ブロック単位の上位k件を逐次マージする。埋め込み行列の走査は
+    クエリ数に関係なく1回で済む。
+    """
+
+    kind = "exact"
+
+    def __init__(self, vectors: np.ndarray, norms: np.ndarray):
+        self.vectors = vectors
+        self.norms = norms
+
+    @property
+    def nbytes(self) -> int:
+        """検索対象の行列のバイト数"""
+        return self.vectors.nbytes
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        正規化済みクエリ群のコサイン類似度上位k件を検索
+
+        Args:
+            queries: 正規化済みクエリベクトル (クエリ数, 次元)
+            k: 取得件数
+            exclude: クエリごとに除外する語彙インデックス（-1は除外なし）
+
+        Returns:
+            (語彙インデックス, 類似度) いずれも形状 (クエリ数, k)、類似度降順
+        """
+        # float64のクエリは積の計算で行列全体をfloat64へ変換させるため、float32に揃える
+        queries = np.asarray(queries, dtype=np.float32)
+        vocab_size = len(self.vectors)
+        n_queries = len(queries)
+        k = min(k, vocab_size - (0 if exclude is None else 1))
+
+        if n_queries == 0 or k <= 0:
+            return _empty_result(n_queries)
+
+        def score_block(start: int, end: int) -> np.ndarray:
+            sims = queries @ self.vectors[start:end].T
+            sims /= self.norms[start:end]
+            return sims
+
+        return _blockwise_topk(score_block, vocab_size, n_queries, k, exclude)
+
+
+class QuantizedIndex:
+    """
+    量子化ベクトルによる総当たり検索インデックス
+
+    正規化済みベクトルを float16、または行ごとのスケール付き int8 で保持し、
+    走査はこのコンパクトな行列上で行う（ブロックごとにfloat32へ展開して積を取る）。
+    rescore > 0 の場合は上位 rescore 件を元のfloat32ベクトルで再採点する。
+    元の行列がネイティブキャッシュのmmapであれば、再採点で触れる行だけが読み込まれる。
+    """
+
+    kind = "quantized"
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        scales: Optional[np.ndarray],
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        rescore: int = 0
+    ):
+        self.codes = codes
+        self.scales = scales
+        self.vectors = vectors
+        self.norms = norms
+        self.rescore = rescore
+
+    @property
+    def dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def nbytes(self) -> int:
+        """検索対象の行列（コード＋スケール）のバイト数"""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        dtype: str = "int8",
+        rescore: int = 0
+    ) -> "QuantizedIndex":
+        """ベクトル行列を量子化してインデックスを構築"""
+        if dtype not in ("float16", "int8"):
+            raise ValueError(f"未対応の量子化形式です: {dtype}")
+
+        vocab_size, dim = vectors.shape
+        codes = np.empty((vocab_size, dim), dtype=np.dtype(dtype))
+        scales = np.empty(vocab_size, dtype=np.float32) if dtype == "int8" else None
+
+        block_rows = max(1, SIMILARITY_BLOCK_ELEMENTS // dim)
+        for start in range(0, vocab_size, block_rows):
+            end = min(start + block_rows, vocab_size)
+            block = vectors[start:end] / norms[start:end, None]
+            if dtype == "int8":
+                # 行ごとの最大絶対値を127に割り当てる
+                row_scale = np.abs(block).max(axis=1) / 127.0
+                row_scale[row_scale == 0] = 1.0
+                codes[start:end] = np.rint(block / row_scale[:, None])
+                scales[start:end] = row_scale
+            else:
+                codes[start:end] = block
+
+        return cls(codes, scales, vectors, norms, rescore)
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """正規化済みクエリ群の上位k件を検索（戻り値は ExactIndex.search と同じ）"""
+        queries = np.asarray(queries, dtype=np.float32)
+        vocab_size = len(self.codes)
+        n_queries = len(queries)
+        k = min(k, vocab_size - (0 if exclude is None else 1))
+
+        if n_queries == 0 or k <= 0:
+            return _empty_result(n_queries)
+
+        def score_block(start: int, end: int) -> np.ndarray:
+            sims = queries @ self.codes[start:end].astype(np.float32).T
+            if self.scales is not None:
+                sims *= self.scales[start:end]
+            return sims
+
+        scan_k = min(max(k, self.rescore), vocab_size - (0 if exclude is None else 1))
+        indices, scores = _blockwise_topk(score_block, vocab_size, n_queries, scan_k, exclude)
+
+        if self.rescore <= 0:
+            return indices, scores
+
+        # 上位候補を元の精度で再採点
+        exact_scores = np.einsum("qkd,qd->qk", self.vectors[indices], queries)
+        exact_scores = (exact_scores / self.norms[indices]).astype(np.float32)
+        indices, exact_scores = _sort_desc(indices, exact_scores)
+        return indices[:, :k], exact_scores[:, :k]
+
+
+class IVFIndex:
+    """
+    IVF（転置ファイル）近似検索インデックス
+
+    語彙ベクトルを球面k-meansで nlist 個のリストに分割し、検索時は
+    クエリに近い nprobe 個のリストに属する語だけを厳密に採点する。
+    nprobe を増やすほど再現率が上がり、速度は下がる。
+    候補がk件に満たないクエリは厳密検索にフォールバックする。
+    """
+
+    kind = "ivf"
+
+    def __init__(
+        self,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        centroids: np.ndarray,
+        order: np.ndarray,
+        offsets: np.ndarray,
+        nprobe: int = 16
+    ):
+        self.vectors = vectors
+        self.norms = norms
+        self.centroids = centroids
+        self.order = order
+        self.offsets = offsets
+        self.nprobe = max(1, min(nprobe, len(centroids)))
+        self.exact = ExactIndex(vectors, norms)
+
+    @property
+    def nlist(self) -> int:
+        return len(self.centroids)
+
+    @property
+    def nbytes(self) -> int:
+        """検索対象の行列とリスト構造のバイト数"""
+        return self.vectors.nbytes + self.centroids.nbytes + self.order.nbytes + self.offsets.nbytes
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        nlist: int = 0,
+        nprobe: int = 16,
+        n_iter: int = 10,
+        seed: int = 0
+    ) -> "IVFIndex":
+        """
+        球面k-meansでインデックスを構築
+
+        Args:
+            nlist: リスト数（0の場合は sqrt(語彙数)）
+            n_iter: k-meansの反復回数
+        """
+        rng = np.random.default_rng(seed)
+        vocab_size = len(vectors)
+        nlist = min(nlist or int(np.sqrt(vocab_size)), vocab_size)
+
+        # 学習はサンプルで行う（1リストあたり約40点）
+        sample_size = min(vocab_size, max(nlist * 40, 10000))
+        sample_ids = np.sort(rng.choice(vocab_size, sample_size, replace=False))
+        sample = vectors[sample_ids] / norms[sample_ids, None]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+
+        for _ in range(n_iter):
+            assign = cls._assign(sample, centroids)
+            membership = sparse.csr_matrix(
+                (np.ones(sample_size, dtype=np.float32), (assign, np.arange(sample_size))),
+                shape=(nlist, sample_size)
+            )
+            sums = np.asarray(membership @ sample)
+
+            # 空リストはランダムなサンプル点で再初期化
+            empty = np.asarray(membership.sum(axis=1)).ravel() == 0
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = sums / np.linalg.norm(sums, axis=1, keepdims=True)
+
+        # 全語彙をリストへ割り当て
+        assign = np.empty(vocab_size, dtype=np.int64)
+        block_rows = max(1, SIMILARITY_BLOCK_ELEMENTS // nlist)
+        for start in range(0, vocab_size, block_rows):
+            end = min(start + block_rows, vocab_size)
+            block = vectors[start:end] / norms[start:end, None]
+            assign[start:end] = cls._assign(block, centroids)
+
+        order = np.argsort(assign, kind="stable").astype(np.int32)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=nlist))])
+
+        return cls(vectors, norms, centroids.astype(np.float32), order, offsets, nprobe)
+
+    @staticmethod
+    def _assign(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+        """各点を最も近いセントロイドへ割り当て"""
+        assign = np.empty(len(points), dtype=np.int64)
+        block_rows = max(1, SIMILARITY_BLOCK_ELEMENTS // len(centroids))
+        for start in range(0, len(points), block_rows):
+            end = min(start + block_rows, len(points))
+            assign[start:end] = np.argmax(points[start:end] @ centroids.T, axis=1)
+        return assign
+
+    def save(self, path: str) -> None:
+        """インデックスをモデルの指紋とともにファイルに保存"""
+        output = Path(path)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        # 複数ワーカーが同時に構築しても読み込み側が書きかけのファイルを見ないよう
+        # プロセスごとの一時ファイルに書いてから置き換える
+        tmp = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                centroids=self.centroids,
+                order=self.order,
+                offsets=self.offsets,
+                vocab_size=np.array(len(self.vectors)),
+                fingerprint=np.array(vector_fingerprint(self.vectors, self.norms))
+            )
+        os.replace(tmp, output)
+
+    @classmethod
+    def load(
+        cls,
+        path: str,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+        nprobe: int = 16
+    ) -> "IVFIndex":
+        """保存済みインデックスを読み込み（別のモデルから構築したものは ValueError）"""
+        with np.load(path) as data:
+            if int(data["vocab_size"]) != len(vectors):
+                raise ValueError(f"インデックスの語彙数がモデルと一致しません: {path}")
+            if "fingerprint" not in data or str(data["fingerprint"]) != vector_fingerprint(vectors, norms):
+                raise ValueError(f"インデックスの構築元のモデルが一致しません: {path}")
+            return cls(
+                vectors, norms,
+                data["centroids"], data["order"], data["offsets"],
+                nprobe
+            )
+
+    def search(
+        self,
+        queries: np.ndarray,
+        k: int,
+        exclude: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """正規化済みクエリ群の近似上位k件を検索（戻り値は ExactIndex.search と同じ）"""
+        queries = np.asarray(queries, dtype=np.float32)
+        n_queries = len(queries)
+        k = min(k, len(self.vectors) - (0 if exclude is None else 1))
+
+        if n_queries == 0 or k <= 0:
+            return _empty_result(n_queries)
+
+        centroid_scores = queries @ self.centroids.T
+        probes = np.argpartition(-centroid_scores, self.nprobe - 1, axis=1)[:, :self.nprobe]
+
+        result_indices = np.zeros((n_queries, k), dtype=np.int64)
+        result_scores = np.zeros((n_queries, k), dtype=np.float32)
+        fallback = []
+
+        for i, query in enumerate(queries):
+            candidates = np.concatenate([
+                self.order[self.offsets[c]:self.offsets[c + 1]] for c in probes[i]
+            ])
+            if exclude is not None:
+                candidates = candidates[candidates != exclude[i]]
+
+            if len(candidates) < k:
+                fallback.append(i)
+                continue
+
+            scores = (self.vectors[candidates] @ query) / self.norms[candidates]
+            if len(candidates) > k:
+                top = np.argpartition(scores, len(candidates) - k)[len(candidates) - k:]
+            else:
+                top = np.arange(k)
+            result_indices[i] = candidates[top]
+            result_scores[i] = scores[top]
+
+        # 候補不足のクエリは厳密検索
+        if fallback:
+            rows = np.array(fallback)
+            exact_indices, exact_scores = self.exact.search(
+                queries[rows], k, None if exclude is None else exclude[rows]
+            )
+            result_indices[rows] = exact_indices
+            result_scores[rows] = exact_scores
+
+        return _sort_desc(result_indices, result_scores)
+
+
+def build_index(
+    kind: str,
+    vectors: np.ndarray,
+    norms: np.ndarray,
+    index_path: Optional[str] = None,
+    nlist: int = 0,
+    nprobe: int = 16,
+    dtype: str = "float32",
+    rescore: int = 0
+):
+    """
+    設定に応じた検索インデックスを構築
+
+    IVFは index_path に同じモデルから構築した保存済みインデックスがあれば読み込み、
+    なければ（または別のモデルのものであれば）構築して保存する。dtype が float16 / int8 の場合は
+    量子化行列で総当たり検索する。失敗した場合は厳密検索にフォールバック。
+    """
+    if kind == "ivf":
+        if dtype != "float32":
+            logger.warning("IVFインデックスは量子化に未対応のため、float32で検索します")
+        try:
+            if index_path and Path(index_path).exists():
+                try:
+                    logger.info(f"IVFインデックスを読み込み: {index_path}")
+                    return IVFIndex.load(index_path, vectors, norms, nprobe)
+                except Exception as e:
+                    logger.warning(f"保存済みIVFインデックスを使用できないため再構築します: {e}")
+
+            logger.info(f"IVFインデックスを構築中 (語彙数: {len(vectors):,})")
+            index = IVFIndex.build(vectors, norms, nlist=nlist, nprobe=nprobe)
+            logger.info(f"IVFインデックス構築完了 - リスト数: {index.nlist}, nprobe: {index.nprobe}")
+            if index_path:
+                index.save(index_path)
+            return index
+
+        except Exception as e:
+            logger.warning(f"IVFインデックスの準備に失敗、厳密検索を使用します: {e}")
+
+    elif kind != "exact":
+        logger.warning(f"未知のインデックス種別 '{kind}'、厳密検索を使用します")
+
+    elif dtype != "float32":
+        try:
+            index = QuantizedIndex.build(vectors, norms, dtype=dtype, rescore=rescore)
+            saved = 1 - index.nbytes / vectors.nbytes
+            logger.info(
+                f"量子化インデックス構築完了 - {dtype}: {index.nbytes / 1024**2:,.1f}MB "
+                f"(float32: {vectors.nbytes / 1024**2:,.1f}MB, {saved * 100:.0f}%削減, 再採点: {rescore}件)"
+            )
+            return index
+        except Exception as e:
+            logger.warning(f"量子化インデックスの構築に失敗、厳密検索を使用します: {e}")
+
+    return ExactIndex(vectors, norms)
+
+
+def measure_ranking_drift(
+    index,
+    vectors: np.ndarray,
+    norms: np.ndarray,
+    sample_size: int = 100,
+    k: int = 24,
+    seed: int = 0
+) -> Dict[str, float]:
+    """
+    厳密検索と比較した順位のずれを計測
+
+    ランダムに選んだ語をクエリとして両方のインデックスで上位k件を取り、
+    一致率（recall@k）と順位ごとの類似度の平均絶対誤差を返す。
+    """
+    rng = np.random.default_rng(seed)
+    sample_size = min(sample_size, len(vectors))
+    ids = rng.choice(len(vectors), sample_size, replace=False)
+    queries = vectors[ids] / norms[ids, None]
+
+    exact_indices, exact_scores = ExactIndex(vectors, norms).search(queries, k, exclude=ids)
+    approx_indices, approx_scores = index.search(queries, k, exclude=ids)
+
+    recall = np.mean([
+        len(np.intersect1d(a, e)) / max(len(e), 1)
+        for a, e in zip(approx_indices, exact_indices)
+    ])
+    return {
+        "recall_at_k": float(recall),
+        "mean_score_error": float(np.abs(approx_scores - exact_scores).mean()),
+        "k": k,
+        "sample_size": sample_size
+    }
+
+
+class NeighborTable:
+    """
+    事前計算済み近傍テーブル
+
+    全語彙の上位K件（語彙インデックス int32 / 類似度 float16）を
+    mmap可能な .npy ファイルとして保持し、語彙インデックスから O(1) で引く。
+    構築元のモデルの指紋を .fingerprint ファイルに記録し、別のモデルでは使用しない。
+    """
+
+    def __init__(self, indices: np.ndarray, scores: np.ndarray):
+        self.indices = indices
+        self.scores = scores
+
+    @property
+    def k(self) -> int:
+        return self.indices.shape[1]
+
+    @staticmethod
+    def paths(path: str) -> Tuple[str, str]:
+        """テーブルを構成するファイルパス"""
+        return f"{path}.indices.npy", f"{path}.scores.npy"
+
+    @staticmethod
+    def fingerprint_path(path: str) -> str:
+        """構築元のモデルの指紋を記録するファイルパス"""
+        return f"{path}.fingerprint"
+
+    @classmethod
+    def exists(cls, path: str) -> bool:
+        return all(Path(p).exists() for p in cls.paths(path))
+
+    @classmethod
+    def load(cls, path: str, vectors: np.ndarray, norms: np.ndarray) -> "NeighborTable":
+        """テーブルを読み取り専用mmapで読み込み（別のモデルから構築したものは ValueError）"""
+        indices_path, scores_path = cls.paths(path)
+        indices = np.load(indices_path, mmap_mode="r")
+        scores = np.load(scores_path, mmap_mode="r")
+        if len(indices) != len(vectors) or indices.shape != scores.shape:
+            raise ValueError(f"近傍テーブルの語彙数がモデルと一致しません: {path}")
+        fingerprint_path = Path(cls.fingerprint_path(path))
+        if (
+            not fingerprint_path.exists()
+            or fingerprint_path.read_text(encoding="ascii").strip() != vector_fingerprint(vectors, norms)
+        ):
+            raise ValueError(f"近傍テーブルの構築元のモデルが一致しません: {path}")
+        return cls(indices, scores)
+
+    def lookup(self, query_indices: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """語彙インデックス群の上位k件を取得（k はテーブルのK以下）"""
+        return (
+            self.indices[query_indices, :k].astype(np.int64),
+            self.scores[query_indices, :k].astype(np.float32)
+        )
+
+
+def build_neighbor_table(
+    index,
+    vectors: np.ndarray,
+    norms: np.ndarray,
+    path: str,
+    k: int = 32,
+    chunk_size: int = 1024,
+    workers: int = 4,
+    progress=None
+) -> NeighborTable:
+    """
+    全語彙の上位K件を計算して近傍テーブルを書き出し
+
+    語彙をチャンクに分割し、スレッドで並列に検索する（BLASはGILを解放する）。
+    結果は open_memmap で直接ファイルへ書き込むため、全体をメモリに保持しない。
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    vocab_size = len(vectors)
+    k = min(k, vocab_size - 1)
+    indices_path, scores_path = NeighborTable.paths(path)
+    Path(indices_path).parent.mkdir(parents=True, exist_ok=True)
+
+    out_indices = np.lib.format.open_memmap(
+        indices_path + ".tmp", mode="w+", dtype=np.int32, shape=(vocab_size, k)
+    )
+    out_scores = np.lib.format.open_memmap(
+        scores_path + ".tmp", mode="w+", dtype=np.float16, shape=(vocab_size, k)
+    )
+
+    def compute(start: int) -> int:
+        end = min(start + chunk_size, vocab_size)
+        ids = np.arange(start, end)
+        queries = vectors[start:end] / norms[start:end, None]
+        top_indices, top_scores = index.search(queries, k, exclude=ids)
+        out_indices[start:end] = top_indices
+        out_scores[start:end] = top_scores
+        return end - start
+
+    done = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for count in executor.map(compute, range(0, vocab_size, chunk_size)):
+            done += count
+            if progress:
+                progress(done, vocab_size)
+
+    out_indices.flush()
+    out_scores.flush()
+    del out_indices, out_scores
+
+    # 指紋を先に置き換え、両ファイルが揃った時点で完成とする
+    # （置き換えの途中で読み込んだ場合は指紋が一致せず使用されない）
+    fingerprint_path = NeighborTable.fingerprint_path(path)
+    Path(fingerprint_path + ".tmp").write_text(vector_fingerprint(vectors, norms), encoding="ascii")
+    Path(fingerprint_path + ".tmp").replace(fingerprint_path)
+    Path(indices_path + ".tmp").replace(indices_path)
+    Path(scores_path + ".tmp").replace(scores_path)
+
+    return NeighborTable.load(path, vectors, norms)
@@ -133,6 +133,42 @@ class APITester:
             print(f"❌ 世代数3取得エラー: {e}")
             return False
     
+    async def test_unique_mode(self) -> bool:
+        """unique指定時に語が重複しないことのテスト（括弧付きのキーワードを含む）"""
+        print("\n🧹 unique指定テスト...")
+        
+        success = True
+        for keyword in ["犬", "[日本]"]:
+            request_data = {"keyword": keyword, "generation": 3, "threshold": 0.0, "seed": 0, "unique": True}
+            try:
+                response = await self.client.post(
+                    f"{self.base_url}/api/v1/associate",
+                    json=request_data
+                )
+                if response.status_code == 404:
+                    print(f"   ⏭️  {keyword}: モデルに存在しないためスキップ")
+                    continue
+                if response.status_code != 200:
+                    print(f"   ❌ {keyword}: 予期しないステータス ({response.status_code})")
+                    success = False
+                    continue
+                
+                data = response.json()
+                words = [r['word'] for gen in data['generations'] for r in gen['results']]
+                # 入力キーワード自身（括弧除去後の表記）も既出の語として扱われる
+                cleaned = keyword.replace('[', '').replace(']', '')
+                if cleaned in words or len(words) != len(set(words)):
+                    print(f"   ❌ {keyword}: 既出の語が再び現れました")
+                    success = False
+                else:
+                    print(f"   ✅ {keyword}: {len(words)}語に重複なし（省いた展開: {data.get('saved_expansions')}件）")
+                    
+            except Exception as e:
+                print(f"   ❌ {keyword}: 例外発生 ({e})")
+                success = False
+        
+        return success
+    
     async def test_error_cases(self) -> bool:
         """エラーケーステスト"""
         print("\n⚠️  エラーケーステスト...")
@@ -181,44 +217,32 @@ class APITester:
         return success_count == len(test_cases)
     
     async def test_performance(self) -> bool:
-        """パフォーマンステスト"""
+        """パフォーマンステスト（詳細な計測は bench_api.py を使用）"""
         print("\n⚡ パフォーマンステスト...")
         
-        import time
-        
-        request_data = {
-            "keyword": "犬",
-            "generation": 3,
-            "threshold": 0.5
-        }
+        from bench_api import run_benchmark
         
         try:
-            # 複数回実行して平均時間を測定
-            times = []
-            
-            for i in range(3):
-                start_time = time.time()
-                
-                response = await self.client.post(
-                    f"{self.base_url}/api/v1/associate",
-                    json=request_data
-                )
-                
-                end_time = time.time()
-                duration = end_time - start_time
-                times.append(duration)
-                
-                if response.status_code == 200:
-                    print(f"   試行{i+1}: {duration:.2f}秒")
-                else:
-                    print(f"   ❌ 試行{i+1}: 失敗 ({response.status_code})")
-                    return False
+            result = await run_benchmark(
+                url=self.base_url,
+                concurrency=[4],
+                total_requests=40,
+                warmup=4,
+                mix_options={
+                    "generations": {2: 0.5, 3: 0.5},
+                    "thresholds": [0.5],
+                    "hot_keywords": ["犬"],
+                    "hot_ratio": 1.0
+                }
+            )
+            run = result["runs"][0]
             
-            avg_time = sum(times) / len(times)
-            print(f"   平均レスポンス時間: {avg_time:.2f}秒")
+            if run["errors"]:
+                print(f"   ❌ エラー発生: {run['statuses']}")
+                return False
             
-            # 3秒以内なら成功とみなす
-            return avg_time < 3.0
+            # p95が3秒以内なら成功とみなす
+            return run["latency"]["p95_ms"] < 3000
             
         except Exception as e:
             print(f"❌ パフォーマンステストエラー: {e}")
@@ -233,6 +257,7 @@ class APITester:
             ("モデル情報取得", self.test_model_info),
             ("世代数2連想語取得", self.test_association_generation_2),
             ("世代数3連想語取得", self.test_association_generation_3),
+            ("unique指定", self.test_unique_mode),
             ("エラーケース", self.test_error_cases),
             ("パフォーマンス", self.test_performance)
         ]
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+共有キャッシュ テストスクリプト
+ローカルのRedisスタンドイン（redis_standin.py）に対して、RESPクライアント・値の変換・
+Redisが使えない場合の縮退動作を確認する（Redis本体は不要）
+
+使用例:
+    python test_shared_cache.py
+    python test_shared_cache.py --url redis://localhost:6379/15  # 実際のRedisで確認
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from typing import Optional
+
+import numpy as np
+
+from redis_standin import RedisStandIn
+from shared_cache import (
+    RedisClient,
+    SharedCache,
+    decode_candidates,
+    decode_response,
+    encode_candidates,
+    encode_response
+)
+
+
+class SharedCacheTester:
+    """共有キャッシュテスタークラス"""
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url
+        self.server = None
+
+    async def start(self) -> str:
+        """スタンドインを起動してURLを返す（URL指定時はそのまま使用）"""
+        if self.url:
+            return self.url
+        self.server = await RedisStandIn(password="secret").start("127.0.0.1", 0)
+        port = self.server.sockets[0].getsockname()[1]
+        return f"redis://:secret@127.0.0.1:{port}/1"
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+
+    async def test_round_trip(self, url: str) -> bool:
+        """読み書き・一括取得・壊れた値・有効期限のテスト"""
+        print("🔁 読み書きテスト...")
+        cache = SharedCache(RedisClient(url, timeout=1.0), prefix="w2v-test:", ttl=0.2)
+        try:
+            if await cache.client.execute("PING") != "PONG":
+                print("❌ PINGの応答が不正です")
+                return False
+
+            cache.put_many({"a": b"1", "b": "日本語".encode("utf-8")})
+            await asyncio.gather(*cache.writes)
+            values = await cache.get_many(["a", "b", "missing"])
+            if values != [b"1", "日本語".encode("utf-8"), None]:
+                print(f"❌ 取得結果が不正です: {values}")
+                return False
+
+            # 壊れた値・別の形式の値はミスとして扱う
+            cache.put_many({"candidates": b"\x05\x00\x00\x00broken", "response": b"not zlib"})
+            await asyncio.gather(*cache.writes)
+            candidates, response = await cache.get_many(["candidates", "response"])
+            if (
+                cache.decode("candidates", candidates, decode_candidates) is not None
+                or cache.decode("response", response, decode_response) is not None
+                or cache.invalid != 2
+            ):
+                print(f"❌ 壊れた値の扱いが不正です: {cache.stats()}")
+                return False
+
+            await asyncio.sleep(0.3)
+            if await cache.get("a") is not None:
+                print("❌ 有効期限切れの値が返りました")
+                return False
+
+            print(f"✅ 読み書き成功 - {cache.stats()}")
+            return True
+        finally:
+            await cache.close()
+
+    def test_encoding(self) -> bool:
+        """値のバイナリ変換テスト"""
+        print("\n📦 値の変換テスト...")
+        indices = np.array([3, 1, 4, 1, 5], dtype=np.int64)
+        scores = np.array([0.9, 0.8, 0.7, 0.6, 0.5], dtype=np.float32)
+        data = encode_candidates((indices, scores))
+        decoded_indices, decoded_scores = decode_candidates(data)
+        if (
+            len(data) != 4 + 8 * len(indices)
+            or decoded_indices.dtype != np.int64
+            or not np.array_equal(decoded_indices, indices)
+            or not np.array_equal(decoded_scores, scores)
+        ):
+            print("❌ 候補の変換結果が一致しません")
+            return False
+
+        response = {"status": "success", "keyword": "犬", "generations": [], "total_count": 0}
+        if decode_response(encode_response(response)) != response:
+            print("❌ レスポンスの変換結果が一致しません")
+            return False
+
+        print(f"✅ 変換成功 - 候補5件: {len(data)}バイト")
+        return True
+
+    async def test_unavailable(self) -> bool:
+        """接続できない・応答しない場合の縮退テスト"""
+        print("\n🚧 縮退動作テスト...")
+
+        # 応答を返さないサーバー（タイムアウト）
+        async def silent(reader, writer):
+            await reader.read()
+            writer.close()
+
+        server = await asyncio.start_server(silent, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        cache = SharedCache(RedisClient(f"redis://127.0.0.1:{port}", timeout=0.05), retry_interval=0.5)
+        try:
+            started = time.perf_counter()
+            first = await cache.get_many(["a", "b"])
+            second = await cache.get("a")
+            elapsed = time.perf_counter() - started
+            stats = cache.stats()
+            if first != [None, None] or second is not None or stats["errors"] != 1 or stats["skipped"] != 1:
+                print(f"❌ 縮退時の結果が不正です: {stats}")
+                return False
+            if elapsed > 0.5:
+                print(f"❌ 縮退時の応答が遅すぎます: {elapsed:.2f}秒")
+                return False
+            cache.put("a", b"1")
+            if cache.writes:
+                print("❌ 使用停止中に書き込みが行われました")
+                return False
+        finally:
+            server.close()
+            await server.wait_closed()
+            await cache.close()
+
+        # 接続できないポート（使用停止後に再試行する）
+        cache = SharedCache(RedisClient(f"redis://127.0.0.1:{port}", timeout=0.5), retry_interval=0.1)
+        try:
+            await cache.get("a")
+            if cache.available():
+                print("❌ 接続失敗後も使用中のままです")
+                return False
+            await asyncio.sleep(0.15)
+            if not cache.available():
+                print("❌ 再試行の間隔を過ぎても使用停止のままです")
+                return False
+        finally:
+            await cache.close()
+
+        print(f"✅ 縮退動作成功 - 応答なし: {elapsed * 1000:.0f}ms で打ち切り")
+        return True
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="共有キャッシュのテスト")
+    parser.add_argument("--url", default=None, help="テストに使うRedisのURL（省略時はスタンドインを起動）")
+    args = parser.parse_args()
+
+    print("🧪 共有キャッシュ テスト開始")
+    print("=" * 50)
+
+    tester = SharedCacheTester(args.url)
+    url = await tester.start()
+    try:
+        results = [
+            await tester.test_round_trip(url),
+            tester.test_encoding(),
+            await tester.test_unavailable()
+        ]
+    finally:
+        await tester.stop()
+
+    print("\n" + "=" * 50)
+    print(f"📊 テスト結果: {sum(results)}/{len(results)} 成功")
+    if not all(results):
+        sys.exit(1)
+    print("🎉 全てのテストが成功しました！")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
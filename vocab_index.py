@@ -0,0 +1,85 @@
+"""
+語彙の前方一致索引
+括弧を除いた表記を辞書順に並べた配列を二分探索し、前方一致する語を出現頻度順に返す
+"""
+
+import bisect
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 前方一致の上限として使う最大のコードポイント
+_MAX_CHAR = chr(0x10FFFF)
+# 頻出語だけの索引に含める語数（前方一致が広い場合はまずこちらから探す）。
+# 頻出語の索引もさらに 1/16 の語数の索引を持ち、MIN_HEAD_SIZE 語まで段階的に絞り込む
+HEAD_SIZE = 65536
+MIN_HEAD_SIZE = 256
+
+
+class PrefixIndex:
+    """
+    前方一致索引
+
+    表記は辞書順に並べた文字列のリスト、順位（語彙インデックス、小さいほど高頻度）は
+    int32配列で保持する。語彙は頻度順に並んでいるため、順位の小さい語ほど頻出語となる。
+
+    一致範囲が広い場合は、上位 HEAD_SIZE 語だけの索引で limit 件見つかればそれが
+    そのまま答えになる（それ以外の語の順位は必ず HEAD_SIZE 以上のため）。
+    見つからない場合のみ一致範囲全体から上位を選ぶ。頻出語の索引は段階的に
+    小さくなるため、一致範囲が広い前方一致ほど小さな索引で答えが決まる。
+    """
+
+    def __init__(self, words: List[str], ranks: np.ndarray, head: Optional["PrefixIndex"] = None):
+        self.words = words
+        self.ranks = ranks
+        self.head = head
+
+    @classmethod
+    def build(
+        cls,
+        index_to_key: Sequence[str],
+        clean: Callable[[str], str] = lambda word: word,
+        head_size: int = HEAD_SIZE
+    ) -> "PrefixIndex":
+        """語彙（頻度順）から索引を作成（同じ表記になる語は最も頻度の高い語にまとめる）"""
+        first_rank = {}
+        for rank, key in enumerate(index_to_key):
+            word = clean(key)
+            if word and word not in first_rank:
+                first_rank[word] = rank
+
+        words = sorted(first_rank)
+        ranks = np.fromiter((first_rank[w] for w in words), dtype=np.int32, count=len(words))
+        del first_rank
+
+        head = None
+        if head_size >= MIN_HEAD_SIZE and len(words) > head_size:
+            head = cls.build(index_to_key[:head_size], clean, head_size=head_size // 16)
+        return cls(words, ranks, head)
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def _range(self, prefix: str) -> Tuple[int, int]:
+        """前方一致する語の範囲 [lo, hi)"""
+        lo = bisect.bisect_left(self.words, prefix)
+        hi = bisect.bisect_left(self.words, prefix + _MAX_CHAR, lo)
+        return lo, hi
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """前方一致する語を頻度順に最大 limit 件返す [(表記, 順位), ...]"""
+        if limit <= 0:
+            return []
+        lo, hi = self._range(prefix)
+        if hi - lo > limit and self.head is not None:
+            suggestions = self.head.suggest(prefix, limit)
+            if len(suggestions) == limit:
+                return suggestions
+
+        ranks = self.ranks[lo:hi]
+        if len(ranks) > limit:
+            top = np.argpartition(ranks, limit - 1)[:limit]
+        else:
+            top = np.arange(len(ranks))
+        top = top[np.argsort(ranks[top], kind="stable")]
+        return [(self.words[lo + i], int(ranks[i])) for i in top]
@@ -4,33 +4,270 @@ Word2Vec モデル管理クラス
 """
 
 import os
+import sys
 import logging
 from pathlib import Path
-from typing import List, Tuple, Optional, Dict, Any
+from typing import List, Tuple, Optional, Dict, Any, AsyncIterator
 import numpy as np
 from gensim.models import KeyedVectors
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
-import aiohttp
 import hashlib
 from datetime import datetime, timedelta
 import random
+import time
 
-from models import AssociationResult, Generation
+from cache import LRUCache
+from downloader import RangeDownloader
+from metrics import REGISTRY
+from models import AssociationRequest, AssociationResult, Generation
+from shared_cache import SharedCache, decode_candidates, encode_candidates
+from similarity_index import (
+    SIMILARITY_BLOCK_ELEMENTS,
+    NeighborTable,
+    build_index,
+    measure_ranking_drift,
+    vector_fingerprint
+)
+from vocab_index import PrefixIndex
 
 logger = logging.getLogger(__name__)
 
+# メトリクス（/metrics で出力）
+EXECUTOR_QUEUE_SECONDS = REGISTRY.histogram(
+    "w2v_executor_queue_seconds", "スレッドプールでの実行待ち時間（秒）", ["operation"]
+)
+EXECUTOR_RUN_SECONDS = REGISTRY.histogram(
+    "w2v_executor_run_seconds", "スレッドプールでの実行時間（秒）", ["operation"]
+)
+SIMILARITY_SEARCH_SECONDS = REGISTRY.histogram(
+    "w2v_similarity_search_seconds", "類似度上位k件検索1回あたりの時間（秒）", ["source"]
+)
+SIMILARITY_SEARCH_QUERIES = REGISTRY.counter(
+    "w2v_similarity_search_queries_total", "類似度検索したクエリ単語数", ["source"]
+)
+GENERATION_LEVEL_SECONDS = REGISTRY.histogram(
+    "w2v_generation_level_seconds", "1世代分の展開にかかった時間（秒）", ["generation"]
+)
+EXPANSIONS_TOTAL = REGISTRY.counter(
+    "w2v_expansions_total", "展開した親単語数", ["generation"]
+)
+GENERATED_WORDS_TOTAL = REGISTRY.counter(
+    "w2v_generated_words_total", "生成した連想語数", ["generation"]
+)
+SAVED_EXPANSIONS_TOTAL = REGISTRY.counter(
+    "w2v_saved_expansions_total", "unique指定時に既出のため展開を省いた語の数", ["generation"]
+)
+COALESCED_LOOKUPS = REGISTRY.counter(
+    "w2v_coalesced_lookups_total", "実行中の同一検索に相乗りした単語数"
+)
+MODEL_LOAD_SECONDS = REGISTRY.gauge(
+    "w2v_model_load_seconds", "モデル読み込みにかかった時間（秒）", ["model_type"]
+)
+
+
+def load_word2vec_file(path: str, limit: Optional[int] = None) -> KeyedVectors:
+    """
+    word2vec形式（バイナリ/テキスト）またはGensim独自形式のモデルを読み込み
+    
+    limit を指定するとファイル先頭（頻度順）の limit 語だけを読み込む。
+    """
+    try:
+        # バイナリ形式を試行
+        if path.endswith('.bin'):
+            return KeyedVectors.load_word2vec_format(path, binary=True, limit=limit)
+        # テキスト形式を試行
+        else:
+            return KeyedVectors.load_word2vec_format(path, binary=False, limit=limit)
+    except Exception as e:
+        logger.warning(f"Word2Vec形式での読み込み失敗: {e}")
+        # Gensim独自形式を試行
+        model = KeyedVectors.load(path)
+        if limit and len(model.key_to_index) > limit:
+            model = truncate_vocabulary(model, limit)
+        return model
+
+
+def truncate_vocabulary(model: KeyedVectors, limit: int) -> KeyedVectors:
+    """語彙を先頭（頻度順）の limit 語に切り詰めたモデルを作成"""
+    truncated = KeyedVectors(model.vector_size, dtype=np.float32)
+    truncated.add_vectors(
+        model.index_to_key[:limit],
+        np.array(model.vectors[:limit], dtype=np.float32)
+    )
+    return truncated
+
+
+def save_native_format(model: KeyedVectors, output_path: str) -> None:
+    """
+    モデルをネイティブキャッシュ形式で保存
+    
+    語彙とメタデータは output_path に、正規化済みfloat32ベクトル行列は
+    output_path + ".vectors.npy" に書き出す。読み込み時は行列をmmapするため
+    パース不要で、ページは必要になった時点で読み込まれる。
+    モデルのベクトルはその場で正規化される（コサイン類似度は不変）。
+    """
+    output = Path(output_path)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    # 複数プロセスが同時に変換しても壊れないようプロセスごとの一時ファイルに書く
+    tmp = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+    
+    model.vectors = np.ascontiguousarray(model.vectors, dtype=np.float32)
+    model.unit_normalize_all()
+    model.save(str(tmp), separately=["vectors"])
+    
+    # 行列ファイルを先に配置し、本体ファイルの存在を変換完了の目印にする
+    os.replace(f"{tmp}.vectors.npy", f"{output}.vectors.npy")
+    os.replace(tmp, output)
+
+
+def file_read_progress(path: str) -> Optional[float]:
+    """
+    プロセスが開いているファイルの読み込み位置から進捗率を推定
+    
+    Linux の /proc/self/fdinfo を参照する。取得できない環境やファイルを開いていない
+    場合（mmap読み込みなど）はNone。
+    """
+    try:
+        target = os.path.realpath(path)
+        size = os.path.getsize(target)
+        for fd in os.listdir("/proc/self/fd"):
+            try:
+                if os.readlink(f"/proc/self/fd/{fd}") != target:
+                    continue
+                with open(f"/proc/self/fdinfo/{fd}") as f:
+                    for line in f:
+                        if line.startswith("pos:"):
+                            return min(1.0, int(line.split()[1]) / size) if size else None
+            except OSError:
+                continue
+    except OSError:
+        return None
+    return None
+
+
+# 候補がない親の展開結果
+_EMPTY_INDICES = np.empty(0, dtype=np.int64)
+_EMPTY_SCORES = np.empty(0, dtype=np.float32)
+
+
+def _array_attributes(obj: Any) -> List[np.ndarray]:
+    """オブジェクト（辞書の場合は値）が保持する配列（入れ子のインデックスが持つ配列を含む）"""
+    values = obj.values() if isinstance(obj, dict) else vars(obj).values()
+    arrays = []
+    for value in values:
+        if isinstance(value, np.ndarray):
+            arrays.append(value)
+        elif hasattr(value, "nbytes") and hasattr(value, "__dict__"):
+            arrays.extend(_array_attributes(value))
+    return arrays
+
+
+class GenerationNode:
+    """
+    展開結果の1ノード（1つの親単語から選ばれた連想語）
+    
+    語彙インデックスと類似度の配列のまま保持し、文字列への変換は出力時に行う。
+    parent は語彙インデックス（第2世代の組み合わせクエリではクエリの表記）。
+    """
+    
+    __slots__ = ("generation_number", "parent", "indices", "scores")
+    
+    def __init__(self, generation_number: int, parent: Any, indices: np.ndarray, scores: np.ndarray):
+        self.generation_number = generation_number
+        self.parent = parent
+        self.indices = indices
+        self.scores = scores
+
 
 class Word2VecModel:
     """Word2Vecモデル管理クラス"""
     
-    def __init__(self, model_path: Optional[str] = None):
+    # 派生ファイル（ネイティブキャッシュ・インデックス・近傍テーブル）の名前
+    MODEL_NAME = "entity_vector"
+    # モデルタイプ表記
+    MODEL_TYPE = "word2vec"
+    # 語彙数の上限（頻度順の先頭から使用、Noneは全語彙）
+    VOCAB_LIMIT: Optional[int] = None
+    # ランダム性を確保するため、指定数の何倍の候補を取得するか
+    CANDIDATE_MULTIPLIER = 4
+    
+    def __init__(self, model_path: Optional[str] = None, path_overrides: bool = True):
+        """
+        path_overrides が False の場合、派生ファイルのパスに環境変数
+        （MODEL_CACHE_PATH / ANN_INDEX_PATH / NEIGHBOR_TABLE_PATH）を使わず、
+        モデルファイルの隣（未指定時は models/{MODEL_NAME}.*）に置く。
+        """
         self.model = None
         self.model_path = model_path
+        self.downloader = None
         self.executor = ThreadPoolExecutor(max_workers=2)
+        
+        # モデルレジストリでの名前と版（入れ替えのたびに増える）
+        self.name = self.MODEL_NAME
+        self.version = 0
+        
+        # 起動状態（starting / downloading / loading / indexing / loaded / warming / ready / failed / closed）
+        self.phase = "starting"
+        self.phase_started = time.monotonic()
+        self.started = self.phase_started
+        self.load_error: Optional[str] = None
+        self.warmup_progress = 0.0
         self.models_dir = Path("models")
         self.models_dir.mkdir(exist_ok=True)
         
+        # 派生ファイル（ネイティブキャッシュ・インデックス・近傍テーブル）のパス
+        artifact_base = f"models/{self.MODEL_NAME}"
+        if model_path and not path_overrides:
+            artifact_base = str(Path(model_path).with_suffix(""))
+        
+        def setting(name: str, default: str) -> str:
+            # 空の値は未指定として扱う
+            return (os.getenv(name) if path_overrides else None) or default
+        
+        # ネイティブキャッシュ形式（正規化済みfloat32行列をmmapで読み込む）
+        self.cache_path = setting("MODEL_CACHE_PATH", f"{artifact_base}.kv")
+        self.auto_convert = os.getenv("MODEL_CACHE_AUTO_CONVERT", "false").lower() == "true"
+        
+        # 類似度検索インデックス（exact: 厳密検索, ivf: 近似検索）
+        self.index = None
+        self.index_type = os.getenv("ANN_INDEX", "exact")
+        self.index_path = setting("ANN_INDEX_PATH", f"{artifact_base}.ivf.npz")
+        self.ivf_nlist = int(os.getenv("IVF_NLIST", 0))  # 0: sqrt(語彙数)
+        self.ivf_nprobe = int(os.getenv("IVF_NPROBE", 16))
+        
+        # ベクトル格納形式（float32 / float16 / int8）と全精度で再採点する上位件数
+        self.vector_dtype = os.getenv("VECTOR_DTYPE", "float32")
+        self.rescore = int(os.getenv("QUANTIZED_RESCORE", 0))
+        # 量子化時、起動時に厳密検索との順位ずれを計測するサンプル数（0で計測しない。通常は build_tiers.py で事前に計測）
+        self.drift_sample = int(os.getenv("QUANTIZATION_DRIFT_SAMPLE", 0))
+        self.ranking_drift = None
+        
+        # 事前計算済み近傍テーブル（build_neighbors.py で生成、存在すれば使用）
+        self.neighbor_table = None
+        self.neighbor_table_path = setting("NEIGHBOR_TABLE_PATH", f"{artifact_base}.neighbors")
+        
+        # 候補リストのLRUキャッシュ（閾値フィルタ・ランダム選択前の生の候補を保持）
+        self.neighbor_cache = LRUCache(int(os.getenv("NEIGHBOR_CACHE_SIZE", 10000)))
+        # ワーカー・コンテナ間で共有するキャッシュ（L2、REDIS_URL 設定時に main で設定）と、
+        # 同じ内容・検索設定のモデル同士で共通になるキーの名前空間（読み込み時に計算）
+        self.shared_cache: Optional[SharedCache] = None
+        self.cache_namespace = ""
+        
+        # 括弧除去後の表記 -> 語彙インデックス（"[犬]" しかない語彙で "犬" を引けるようにする）
+        self.aliases: Dict[str, int] = {}
+        # 括弧付きの語 -> 同じ表記で引かれる語彙インデックス（"[犬]" と "犬" が両方ある場合など）
+        self.redirects: Dict[int, int] = {}
+        # 括弧除去後の表記の前方一致索引（キーワード候補の提示用）
+        self.prefix_index: Optional[PrefixIndex] = None
+        # 語彙まわり（語彙表・別名索引・前方一致索引）のおおよそのメモリ使用量（読み込み時に計測）
+        self.vocabulary_bytes = 0
+        
+        # 実行中の候補検索（(語彙インデックス, 候補数) -> 検索タスク）。同じ検索は1回だけ実行して結果を共有する
+        self.inflight: Dict[Tuple[int, int], asyncio.Future] = {}
+        self.lookup_count = 0
+        self.coalesced_count = 0
+        
         # S3設定（環境変数から読み込み）
         bucket_name = os.getenv("S3_BUCKET", "my-w2v-models-2024")
         aws_region = os.getenv("AWS_REGION", "ap-northeast-1")
@@ -45,11 +282,13 @@ class Word2VecModel:
                     "s3_key": "models/entity_vector/entity_vector.model.bin",
                     "local_path": "models/entity_vector.model.bin",
                     "size": 800000000,
-                    "sha256": None
+                    "sha256": os.getenv("MODEL_SHA256") or None
                 }
             },
             "download": {
-                "chunk_size": 8192,
+                "chunk_size": 1024 * 1024,
+                "connections": int(os.getenv("DOWNLOAD_CONNECTIONS", 8)),
+                "segment_size": int(os.getenv("DOWNLOAD_SEGMENT_MB", 16)) * 1024 * 1024,
                 "max_retries": 3,
                 "timeout_seconds": 300
             }
@@ -58,6 +297,8 @@ class Word2VecModel:
     def _find_model_path(self) -> str:
         """モデルファイルパスを自動検出"""
         possible_paths = [
+            self.cache_path,
+            "models/entity_vector.kv",
             "models/entity_vector.model.bin",
             "entity_vector/entity_vector.model.bin",
             "entity_vector/entity_vector.model.txt", 
@@ -72,63 +313,326 @@ class Word2VecModel:
         
         return None
     
+    async def _ensure_model_file(self) -> bool:
+        """モデルファイルのパスを確定（ローカルにない場合はS3からダウンロード）"""
+        # モデルパスが指定されていない場合は自動検出
+        if not self.model_path:
+            self.model_path = self._find_model_path()
+        
+        # ローカルにモデルが存在しない場合はS3からダウンロード
+        if not self.model_path or not Path(self.model_path).exists():
+            logger.info("ローカルにモデルが見つかりません。S3からダウンロードします...")
+            self.set_phase("downloading")
+            if not await self._download_model_from_s3():
+                logger.error("S3からのモデルダウンロードに失敗しました")
+                return False
+            
+            # ダウンロード後のパスを設定
+            self.model_path = "models/entity_vector.model.bin"
+        
+        return True
+    
+    async def prepare_native_cache(self) -> bool:
+        """
+        ネイティブキャッシュ形式を用意（複数ワーカー起動前に親プロセスで1回実行）
+        
+        各ワーカーは同じキャッシュファイルを読み取り専用でmmapするため、
+        ベクトル行列はOSのページキャッシュ上で全ワーカーに共有される。
+        """
+        try:
+            if Path(self.cache_path).exists():
+                problem = await self._run_in_executor("check_native_cache", self._check_native_cache_sync)
+                if problem is None:
+                    logger.info(f"ネイティブキャッシュを使用: {self.cache_path}")
+                    return True
+                logger.warning(f"ネイティブキャッシュを作り直します（{problem}）: {self.cache_path}")
+            
+            if not await self._ensure_model_file():
+                return False
+            
+            logger.info(f"ネイティブキャッシュ形式に変換中: {self.model_path} -> {self.cache_path}")
+            await self._run_in_executor(
+                "convert_model",
+                lambda: save_native_format(
+                    load_word2vec_file(self.model_path, limit=self.VOCAB_LIMIT), self.cache_path
+                )
+            )
+            
+            problem = await self._run_in_executor("check_native_cache", self._check_native_cache_sync)
+            if problem is not None:
+                logger.error(f"ネイティブキャッシュをワーカー間で共有できません（{problem}）: {self.cache_path}")
+                return False
+            return True
+            
+        except Exception as e:
+            logger.error(f"ネイティブキャッシュ準備エラー: {e}")
+            return False
+    
+    def _check_native_cache_sync(self) -> Optional[str]:
+        """
+        ネイティブキャッシュがそのままmmapで共有できるかチェック（問題がなければNone）
+        
+        語彙数が VOCAB_LIMIT を超えていると各ワーカーが切り詰めた行列を個別に持つため共有されない。
+        """
+        model = KeyedVectors.load(self.cache_path, mmap='r')
+        if not isinstance(model.vectors, np.memmap):
+            return "ベクトル行列がmmapで読み込まれません"
+        vocab_size = len(model.key_to_index)
+        if self.VOCAB_LIMIT and vocab_size > self.VOCAB_LIMIT:
+            return f"語彙数 {vocab_size:,} が上限 {self.VOCAB_LIMIT:,} を超えています"
+        return None
+    
     async def load_model(self) -> bool:
         """非同期でモデルを読み込み（S3からダウンロード含む）"""
         try:
-            # モデルパスが指定されていない場合は自動検出
-            if not self.model_path:
-                self.model_path = self._find_model_path()
-            
-            # ローカルにモデルが存在しない場合はS3からダウンロード
-            if not self.model_path or not Path(self.model_path).exists():
-                logger.info("ローカルにモデルが見つかりません。S3からダウンロードします...")
-                if not await self._download_model_from_s3():
-                    logger.error("S3からのモデルダウンロードに失敗しました")
-                    return False
-                
-                # ダウンロード後のパスを設定
-                self.model_path = "models/entity_vector.model.bin"
+            if not await self._ensure_model_file():
+                self.set_phase("failed", "モデルファイルを用意できませんでした")
+                return False
             
             logger.info(f"モデル読み込み開始: {self.model_path}")
+            started = time.perf_counter()
             
             # CPUバウンドなタスクを別スレッドで実行
-            loop = asyncio.get_event_loop()
-            self.model = await loop.run_in_executor(
-                self.executor, 
-                self._load_model_sync
+            self.set_phase("loading")
+            model = await self._run_in_executor("load_model", self._load_model_sync)
+            self.set_phase("indexing")
+            self.index = await self._run_in_executor("build_index", self._build_index_sync, model)
+            self.neighbor_table = await self._run_in_executor(
+                "load_neighbor_table", self._load_neighbor_table_sync, model
+            )
+            self.aliases, self.redirects = await self._run_in_executor(
+                "build_aliases", self._build_aliases_sync, model
             )
+            self.prefix_index = await self._run_in_executor(
+                "build_prefix_index", PrefixIndex.build, model.index_to_key, self._clean_word
+            )
+            self.vocabulary_bytes = await self._run_in_executor(
+                "measure_vocabulary", self._measure_vocabulary_sync, model
+            )
+            self.cache_namespace = self._cache_namespace(model)
+            self.model = model
+            self.set_phase("loaded")
             
-            logger.info(f"モデル読み込み完了 - 語彙数: {len(self.model.key_to_index)}")
+            elapsed = time.perf_counter() - started
+            MODEL_LOAD_SECONDS.set(elapsed, model_type=self.MODEL_TYPE)
+            logger.info(f"モデル読み込み完了 - 語彙数: {len(self.model.key_to_index)} ({elapsed:.1f}秒)")
             return True
             
         except Exception as e:
             logger.error(f"モデル読み込みエラー: {e}")
+            self.set_phase("failed", str(e))
             return False
     
+    async def warm_up(self, keywords: List[str], touch_matrix: bool = True) -> None:
+        """
+        ウォームアップ（準備完了を宣言する前に実行）
+        
+        ベクトル行列（と近傍テーブル）の全ページを読み込み、指定されたホットキーワードの
+        候補を第2世代・第3世代以降の両方の候補数で事前に計算して候補キャッシュに載せる。
+        """
+        self.set_phase("warming")
+        started = time.perf_counter()
+        
+        if touch_matrix:
+            await self._run_in_executor("warm_up", self._touch_matrix_sync, 0.5 if keywords else 1.0)
+        
+        words = [w for w in dict.fromkeys(keywords) if self.contains_word(w)]
+        if len(words) < len(keywords):
+            missing = [w for w in keywords if not self.contains_word(w)]
+            logger.warning(f"ウォームアップ対象外（語彙にない）: {missing[:10]}")
+        
+        base = self.warmup_progress
+        chunk = 64
+        for start in range(0, len(words), chunk):
+            batch = words[start:start + chunk]
+            for topn in (6, 3):
+                await self._fetch_candidates(batch, topn * self.CANDIDATE_MULTIPLIER)
+            self.warmup_progress = base + (1.0 - base) * min(1.0, (start + chunk) / len(words))
+        
+        self.warmup_progress = 1.0
+        logger.info(f"ウォームアップ完了 - キーワード: {len(words)}語 ({time.perf_counter() - started:.1f}秒)")
+    
+    def _touch_matrix_sync(self, progress_span: float) -> None:
+        """行列の全ページを読み込む（mmapの初回アクセスによる遅延をなくす）"""
+        arrays = [self.model.vectors]
+        if self.neighbor_table is not None:
+            arrays.extend([self.neighbor_table.indices, self.neighbor_table.scores])
+        
+        total = sum(len(a) for a in arrays)
+        done = 0
+        for array in arrays:
+            block_rows = max(1, SIMILARITY_BLOCK_ELEMENTS // max(1, array[0].size))
+            for start in range(0, len(array), block_rows):
+                np.asarray(array[start:start + block_rows]).sum()
+                done += min(block_rows, len(array) - start)
+                self.warmup_progress = progress_span * done / total
+    
+    def set_phase(self, phase: str, error: Optional[str] = None) -> None:
+        """起動状態を更新"""
+        self.phase = phase
+        self.phase_started = time.monotonic()
+        if error is not None:
+            self.load_error = error
+    
+    def is_ready(self) -> bool:
+        """リクエストを受け付ける準備ができているかチェック（ウォームアップ完了後）"""
+        return self.phase == "ready" and self.is_loaded()
+    
+    def get_load_status(self) -> Dict[str, Any]:
+        """起動状態と現在のフェーズの進捗率（0.0-1.0、不明な場合はNone）"""
+        progress = None
+        if self.phase == "downloading" and self.downloader is not None:
+            progress = self.downloader.progress
+        elif self.phase == "loading" and self.model_path:
+            progress = file_read_progress(self.model_path)
+        elif self.phase == "warming":
+            progress = self.warmup_progress
+        elif self.phase in ("loaded", "ready"):
+            progress = 1.0
+        
+        now = time.monotonic()
+        return {
+            "phase": self.phase,
+            "progress": progress,
+            "phase_seconds": now - self.phase_started,
+            "elapsed_seconds": now - self.started,
+            "error": self.load_error
+        }
+    
     def _load_model_sync(self) -> KeyedVectors:
         """同期的にモデルを読み込み"""
-        try:
-            # バイナリ形式を試行
-            if self.model_path.endswith('.bin'):
-                return KeyedVectors.load_word2vec_format(
-                    self.model_path, 
-                    binary=True
+        # ネイティブキャッシュ形式はパースせずベクトル行列をmmap
+        if self.model_path.endswith('.kv'):
+            model = KeyedVectors.load(self.model_path, mmap='r')
+            if self.VOCAB_LIMIT and len(model.key_to_index) > self.VOCAB_LIMIT:
+                model = truncate_vocabulary(model, self.VOCAB_LIMIT)
+            return model
+        
+        model = load_word2vec_file(self.model_path, limit=self.VOCAB_LIMIT)
+        
+        if self.auto_convert and not Path(self.cache_path).exists():
+            logger.info(f"ネイティブキャッシュ形式に変換中: {self.cache_path}")
+            save_native_format(model, self.cache_path)
+        
+        return model
+    
+    def _build_index_sync(self, model: KeyedVectors):
+        """同期的に類似度検索インデックスを準備"""
+        model.fill_norms()
+        dtype = self.vector_dtype
+        if dtype != "float32" and not isinstance(model.vectors, np.memmap):
+            # float32行列がメモリに残るため、量子化するとかえって使用量が増える
+            logger.warning(
+                f"ネイティブキャッシュ形式（mmap）でないため量子化（{dtype}）は使用せず、float32で検索します"
+            )
+            dtype = "float32"
+        index = build_index(
+            self.index_type,
+            model.vectors,
+            model.norms,
+            index_path=self.index_path,
+            nlist=self.ivf_nlist,
+            nprobe=self.ivf_nprobe,
+            dtype=dtype,
+            rescore=self.rescore
+        )
+        
+        if index.kind == "quantized":
+            # 計測は全語彙の厳密検索でfloat32行列を全て読み込むため、既定では行わない
+            if self.drift_sample > 0:
+                self.ranking_drift = measure_ranking_drift(
+                    index, model.vectors, model.norms, sample_size=self.drift_sample
                 )
-            # テキスト形式を試行
-            else:
-                return KeyedVectors.load_word2vec_format(
-                    self.model_path, 
-                    binary=False
+                logger.info(
+                    f"量子化による順位ずれ - recall@{self.ranking_drift['k']}: "
+                    f"{self.ranking_drift['recall_at_k']:.3f}, "
+                    f"類似度誤差: {self.ranking_drift['mean_score_error']:.4f}"
                 )
+        
+        return index
+    
+    def _load_neighbor_table_sync(self, model: KeyedVectors) -> Optional[NeighborTable]:
+        """同期的に近傍テーブルを読み込み（存在しない・不整合の場合はNone）"""
+        if not NeighborTable.exists(self.neighbor_table_path):
+            return None
+        try:
+            table = NeighborTable.load(self.neighbor_table_path, model.vectors, model.norms)
+            logger.info(f"近傍テーブルを使用: {self.neighbor_table_path} (K={table.k})")
+            return table
         except Exception as e:
-            logger.warning(f"Word2Vec形式での読み込み失敗: {e}")
-            # Gensim独自形式を試行
-            return KeyedVectors.load(self.model_path)
+            logger.warning(f"近傍テーブルの読み込みに失敗、ベクトル検索を使用します: {e}")
+            return None
+    
+    def _build_aliases_sync(self, model: KeyedVectors) -> Tuple[Dict[str, int], Dict[int, int]]:
+        """
+        括弧除去後の表記から語彙インデックスへの別名索引を作成
+        
+        括弧を除いた表記が語彙にない場合のみ登録する（語彙に同じ語があればそちらを優先）。
+        複数の語が同じ表記になる場合は、語彙の先頭に近い（出現頻度の高い）語を採用する。
+        
+        あわせて、括弧付きの語から同じ表記で引かれる語（次世代で展開する語）への
+        転送表を返す（自身に解決される語は含まない。表記が空の語は -1）。
+        """
+        key_to_index = model.key_to_index
+        aliases: Dict[str, int] = {}
+        bracketed = []
+        for index, key in enumerate(model.index_to_key):
+            if "[" not in key and "]" not in key:
+                continue
+            cleaned = self._clean_word(key)
+            bracketed.append((index, cleaned))
+            if cleaned and cleaned not in key_to_index and cleaned not in aliases:
+                aliases[cleaned] = index
+        
+        redirects: Dict[int, int] = {}
+        for index, cleaned in bracketed:
+            target = key_to_index.get(cleaned, aliases.get(cleaned, -1)) if cleaned else -1
+            if target != index:
+                redirects[index] = target
+        logger.info(f"別名索引を作成しました: {len(aliases)}語")
+        return aliases, redirects
+    
+    def _measure_vocabulary_sync(self, model: KeyedVectors) -> int:
+        """
+        語彙表・別名索引・前方一致索引のおおよそのメモリ使用量（バイト）
+        
+        文字列は語彙表の分のみ数える（前方一致索引の表記の多くは語彙表の文字列と共有される）。
+        """
+        key_to_index = model.key_to_index
+        size = sys.getsizeof(key_to_index) + sys.getsizeof(model.index_to_key)
+        size += sum(sys.getsizeof(key) for key in model.index_to_key)
+        size += len(key_to_index) * sys.getsizeof(len(key_to_index))
+        size += sys.getsizeof(self.aliases) + sys.getsizeof(self.redirects)
+        prefix_index = self.prefix_index
+        while prefix_index is not None:
+            size += sys.getsizeof(prefix_index.words) + prefix_index.ranks.nbytes
+            prefix_index = prefix_index.head
+        return size
+    
+    def _cache_namespace(self, model: KeyedVectors) -> str:
+        """
+        共有キャッシュのキーの名前空間
+        
+        語彙・ベクトルの一部と検索設定から計算し、同じモデルファイル・設定で動く
+        ワーカー・コンテナ同士でだけ候補やレスポンスを共有する。
+        """
+        digest = hashlib.sha1()
+        digest.update(repr((
+            self.MODEL_TYPE, len(model.index_to_key), model.index_to_key[:16],
+            vector_fingerprint(model.vectors, model.norms),
+            self.index.kind, getattr(self.index, "dtype", None), getattr(self.index, "nprobe", None),
+            self.rescore, self.neighbor_table.k if self.neighbor_table is not None else None
+        )).encode("utf-8"))
+        return digest.hexdigest()[:16]
     
     def is_loaded(self) -> bool:
         """モデルが読み込まれているかチェック"""
         return self.model is not None
     
+    def is_shared(self) -> bool:
+        """ベクトル行列がファイルmmap（ワーカー間で共有可能）かチェック"""
+        return self.is_loaded() and isinstance(self.model.vectors, np.memmap)
+    
     def get_model_info(self) -> Dict[str, Any]:
         """モデル情報を取得"""
         if not self.is_loaded():
@@ -137,20 +641,87 @@ class Word2VecModel:
         return {
             "vocabulary_size": len(self.model.key_to_index),
             "vector_dimension": self.model.vector_size,
-            "model_type": "word2vec"
+            "model_type": self.MODEL_TYPE,
+            "index_type": self.index.kind,
+            "vector_dtype": getattr(self.index, "dtype", str(self.model.vectors.dtype)),
+            "index_memory_bytes": self.index.nbytes,
+            "ranking_recall": self.ranking_drift["recall_at_k"] if self.ranking_drift else None
         }
     
+    def get_cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        """キャッシュ統計を取得"""
+        return {
+            "neighbors": self.neighbor_cache.stats()
+        }
+    
+    def memory_usage(self) -> Dict[str, Dict[str, int]]:
+        """
+        構成要素ごとのメモリ使用量（バイト、未読み込みの場合は空）
+        
+        resident_bytes はプロセスのヒープ上のサイズ、mapped_bytes はファイルmmapのサイズ
+        （OSのページキャッシュ上にあり、ワーカー間で共有される）。
+        複数の構成要素が同じ配列を参照している場合は最初の1つだけに数える。
+        """
+        if not self.is_loaded():
+            return {}
+        
+        seen = set()
+        
+        def measure(arrays, resident_bytes: int = 0) -> Dict[str, int]:
+            usage = {"resident_bytes": resident_bytes, "mapped_bytes": 0}
+            for array in arrays:
+                if id(array) in seen:
+                    continue
+                seen.add(id(array))
+                usage["mapped_bytes" if isinstance(array, np.memmap) else "resident_bytes"] += array.nbytes
+            return usage
+        
+        table = self.neighbor_table
+        return {
+            "vectors": measure([self.model.vectors, self.model.norms]),
+            "index": measure(_array_attributes(self.index)),
+            "neighbor_table": measure([table.indices, table.scores] if table is not None else []),
+            "vocabulary": measure(_array_attributes(self.model.expandos), self.vocabulary_bytes)
+        }
+    
+    def close(self) -> None:
+        """読み込んだ行列・索引・キャッシュを破棄してスレッドプールを停止（以降は使用不可）"""
+        self.model = None
+        self.index = None
+        self.neighbor_table = None
+        self.aliases = {}
+        self.redirects = {}
+        self.prefix_index = None
+        self.vocabulary_bytes = 0
+        self.neighbor_cache.clear()
+        self.executor.shutdown(wait=False)
+        self.set_phase("closed")
+    
     def contains_word(self, word: str) -> bool:
         """単語がモデルに含まれているかチェック"""
+        return self.resolve_word(word) is not None
+    
+    def resolve_word(self, word: str) -> Optional[int]:
+        """単語（または括弧を除いた表記）の語彙インデックス（存在しない場合はNone）"""
         if not self.is_loaded():
-            return False
-        return word in self.model.key_to_index
+            return None
+        index = self.model.key_to_index.get(word)
+        if index is None:
+            index = self.aliases.get(word)
+        return index
+    
+    def suggest_words(self, prefix: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """前方一致する語を出現頻度順に取得 [(表記, 頻度順位), ...]"""
+        if not self.is_loaded() or self.prefix_index is None:
+            return []
+        return self.prefix_index.suggest(prefix, limit)
     
     async def get_similar_words(
         self, 
         word: str, 
         topn: int = 10, 
-        threshold: float = 0.0
+        threshold: float = 0.0,
+        rng: Optional[random.Random] = None
     ) -> List[AssociationResult]:
         """類似語を非同期で取得"""
         if not self.is_loaded():
@@ -159,168 +730,631 @@ class Word2VecModel:
         if not self.contains_word(word):
             return []
         
-        try:
-            # CPUバウンドなタスクを別スレッドで実行
-            loop = asyncio.get_event_loop()
-            similar_words = await loop.run_in_executor(
-                self.executor,
-                self._get_similar_words_sync,
-                word, topn, threshold
-            )
-            
-            return [
-                AssociationResult(word=w, similarity=float(s))
-                for w, s in similar_words
-            ]
-            
-        except Exception as e:
-            logger.error(f"類似語取得エラー - {word}: {e}")
+        results = await self.get_similar_words_batch([word], topn=topn, threshold=threshold, rng=rng)
+        return results[0]
+    
+    async def get_similar_words_batch(
+        self,
+        words: List[str],
+        topn: int = 10,
+        threshold: float = 0.0,
+        rng: Optional[random.Random] = None
+    ) -> List[List[AssociationResult]]:
+        """
+        複数単語の類似語を1回のベクトル演算でまとめて取得
+        
+        rng を指定すると候補からのランダム選択がその乱数生成器で行われる。
+        """
+        if not self.is_loaded():
+            raise RuntimeError("モデルが読み込まれていません")
+        
+        if not words:
             return []
+        
+        raw_candidates = await self._fetch_candidates(words, topn * self.CANDIDATE_MULTIPLIER)
+        return [
+            [
+                AssociationResult(word=w, similarity=s)
+                for w, s in self._select_candidates(raw_candidates.get(word), topn, threshold, rng)
+            ]
+            for word in words
+        ]
     
     def _clean_word(self, word: str) -> str:
         """単語から括弧を除去"""
         return word.replace('[', '').replace(']', '')
     
-    def _get_similar_words_sync(
-        self, 
-        word: str, 
-        topn: int, 
-        threshold: float
+    async def _fetch_candidates(
+        self,
+        words: List[str],
+        candidate_count: int
+    ) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        単語ごとの生の候補（語彙インデックス, 類似度）を非同期でまとめて取得
+        
+        単語は別名索引で語彙インデックスに解決し、同じ語を指す表記（"犬" と "[犬]"）は
+        1回だけ検索する。
+        """
+        targets: Dict[str, int] = {}
+        for word in dict.fromkeys(words):
+            index = self.resolve_word(word)
+            if index is not None:
+                targets[word] = index
+        
+        results = await self._fetch_index_candidates(list(targets.values()), candidate_count)
+        return {word: results[index] for word, index in targets.items() if index in results}
+    
+    async def _fetch_index_candidates(
+        self,
+        indices: List[int],
+        candidate_count: int
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        語彙インデックスごとの生の候補を非同期でまとめて取得
+        
+        キャッシュ済みの候補はスレッドプールを経由せずに返す。
+        同じ (語彙インデックス, 候補数) の検索が実行中であれば新たに検索せず、
+        その結果を待って共有する。検索タスクは呼び出し元のキャンセル（クライアント切断など）の
+        影響を受けず、相乗りしている他のリクエストには結果が届く。
+        """
+        results: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        jobs: Dict[int, asyncio.Future] = {}
+        missing = []
+        for index in dict.fromkeys(indices):
+            cached = self.neighbor_cache.get((index, candidate_count))
+            if cached is not None:
+                results[index] = cached
+                continue
+            self.lookup_count += 1
+            job = self.inflight.get((index, candidate_count))
+            if job is None:
+                missing.append(index)
+            else:
+                jobs[index] = job
+                self.coalesced_count += 1
+                COALESCED_LOOKUPS.inc()
+        
+        if missing:
+            job = asyncio.ensure_future(self._load_candidates(missing, candidate_count))
+            keys = [(index, candidate_count) for index in missing]
+            for key in keys:
+                self.inflight[key] = job
+            job.add_done_callback(lambda done: self._finish_inflight(keys, done))
+            jobs.update((index, job) for index in missing)
+        
+        for job in set(jobs.values()):
+            try:
+                result = await asyncio.shield(job)
+            except Exception as e:
+                logger.error(f"類似語取得エラー - {indices[:5]}: {e}")
+                continue
+            results.update(
+                (index, result[index]) for index, index_job in jobs.items()
+                if index_job is job and index in result
+            )
+        return results
+    
+    async def _load_candidates(
+        self,
+        indices: List[int],
+        candidate_count: int
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """
+        キャッシュにない候補を共有キャッシュから取得し、残りを計算
+        
+        近傍テーブルを使う場合は手元で引くほうが速いため共有キャッシュを使わない。
+        計算した候補は共有キャッシュへバックグラウンドで書き込む。
+        """
+        results: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        shared = self.shared_cache if self.neighbor_table is None else None
+        if shared is not None:
+            keys = [self._shared_neighbor_key(index, candidate_count) for index in indices]
+            for index, key, value in zip(indices, keys, await shared.get_many(keys)):
+                candidates = shared.decode(key, value, decode_candidates) if value is not None else None
+                if candidates is not None:
+                    results[index] = candidates
+                    self.neighbor_cache.put((index, candidate_count), candidates)
+            indices = [index for index in indices if index not in results]
+        
+        if indices:
+            # CPUバウンドなタスクを別スレッドで実行
+            computed = await self._run_in_executor(
+                "fetch_candidates",
+                self._fetch_candidates_sync,
+                indices, candidate_count
+            )
+            results.update(computed)
+            if shared is not None:
+                shared.put_many({
+                    self._shared_neighbor_key(index, candidate_count): encode_candidates(candidates)
+                    for index, candidates in computed.items()
+                })
+        return results
+    
+    def _shared_neighbor_key(self, index: int, candidate_count: int) -> str:
+        """共有キャッシュでの候補のキー"""
+        return f"n:{self.cache_namespace}:{index}:{candidate_count}"
+    
+    def _finish_inflight(self, keys: List[Tuple[int, int]], job: asyncio.Future) -> None:
+        """完了した検索タスクを実行中一覧から外す"""
+        for key in keys:
+            if self.inflight.get(key) is job:
+                del self.inflight[key]
+        # 待っている呼び出し元がいない場合も例外を取得済みにしておく
+        if not job.cancelled():
+            job.exception()
+    
+    def get_coalescing_stats(self) -> Dict[str, int]:
+        """検索の相乗り（シングルフライト）統計"""
+        return {
+            "lookups": self.lookup_count,
+            "coalesced": self.coalesced_count,
+            "in_flight": len(self.inflight)
+        }
+    
+    async def _run_in_executor(self, operation: str, func, *args):
+        """スレッドプールで関数を実行し、実行待ち時間と実行時間を記録"""
+        submitted = time.perf_counter()
+        
+        def timed():
+            started = time.perf_counter()
+            EXECUTOR_QUEUE_SECONDS.observe(started - submitted, operation=operation)
+            try:
+                return func(*args)
+            finally:
+                EXECUTOR_RUN_SECONDS.observe(time.perf_counter() - started, operation=operation)
+        
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(self.executor, timed)
+    
+    def _fetch_candidates_sync(
+        self,
+        indices: List[int],
+        candidate_count: int
+    ) -> Dict[int, Tuple[np.ndarray, np.ndarray]]:
+        """同期的に語彙インデックスごとの生の候補をまとめて計算（結果はキャッシュに格納）"""
+        raw_candidates = {}
+        top_indices, top_scores = self._most_similar_batch(
+            np.array(indices, dtype=np.int64), candidate_count
+        )
+        for index, row_indices, row_scores in zip(indices, top_indices, top_scores):
+            raw_candidates[index] = (row_indices, row_scores)
+            self.neighbor_cache.put((index, candidate_count), raw_candidates[index])
+        
+        return raw_candidates
+    
+    def _select_candidates(
+        self,
+        raw: Optional[Tuple[np.ndarray, np.ndarray]],
+        topn: int,
+        threshold: float,
+        rng: Optional[random.Random] = None
     ) -> List[Tuple[str, float]]:
-        """同期的に類似語を取得"""
+        """生の候補を閾値でフィルタリングし、指定数をランダムに選択"""
+        if raw is None:
+            return []
+        
+        # 閾値でフィルタリングと括弧除去
+        index_to_key = self.model.index_to_key
+        row_indices, row_scores = raw
+        filtered = [
+            (self._clean_word(index_to_key[i]), float(s))
+            for i, s in zip(row_indices, row_scores)
+            if s >= threshold
+        ]
+        
+        # フィルタリング後の候補から指定数をランダムに選択
+        if len(filtered) <= topn:
+            return filtered
+        return (rng or random).sample(filtered, topn)
+    
+    async def _fetch_combined_candidates(
+        self,
+        requests: List[AssociationRequest],
+        candidate_count: int
+    ) -> List[Optional[Tuple[np.ndarray, np.ndarray]]]:
+        """複数の語を組み合わせたクエリの生の候補を非同期でまとめて取得"""
+        queries = []
+        for request in requests:
+            positive = [self.resolve_word(w) for w in [request.keyword, *request.positive]]
+            negative = [self.resolve_word(w) for w in request.negative]
+            queries.append((tuple(positive), tuple(negative)))
+        
         try:
-            # より多くの候補を取得してランダム性を確保
-            candidate_multiplier = 4  # 指定数の4倍の候補を取得
-            similar = self.model.most_similar(word, topn=topn * candidate_multiplier)
-            
-            # 閾値でフィルタリングと括弧除去
-            filtered = [
-                (self._clean_word(w), s) for w, s in similar 
-                if s >= threshold
-            ]
-            
-            # フィルタリング後の候補から指定数をランダムに選択
-            if len(filtered) <= topn:
-                return filtered
+            return await self._run_in_executor(
+                "fetch_combined_candidates",
+                self._fetch_combined_candidates_sync,
+                queries, candidate_count
+            )
+        except Exception as e:
+            logger.error(f"組み合わせクエリの類似語取得エラー: {e}")
+            return [None] * len(requests)
+    
+    def _fetch_combined_candidates_sync(
+        self,
+        queries: List[Tuple[Tuple[int, ...], Tuple[int, ...]]],
+        candidate_count: int
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        同期的に組み合わせクエリの生の候補を取得
+        
+        加える語の単位ベクトルの和から差し引く語の単位ベクトルを引いて正規化し、
+        全クエリをまとめて1回の上位k件検索で処理する。入力した語自身は候補から除く。
+        """
+        results: List[Optional[Tuple[np.ndarray, np.ndarray]]] = [None] * len(queries)
+        missing = []
+        for i, query in enumerate(queries):
+            cached = self.neighbor_cache.get((query, candidate_count))
+            if cached is None:
+                missing.append(i)
             else:
-                return random.sample(filtered, topn)
+                results[i] = cached
+        
+        if missing:
+            started = time.perf_counter()
+            vectors = self.model.vectors
+            norms = self.model.norms
+            matrix = np.zeros((len(missing), vectors.shape[1]), dtype=np.float32)
+            for row, i in enumerate(missing):
+                positive, negative = queries[i]
+                matrix[row] += (vectors[list(positive)] / norms[list(positive), None]).sum(axis=0)
+                if negative:
+                    matrix[row] -= (vectors[list(negative)] / norms[list(negative), None]).sum(axis=0)
+            lengths = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix /= np.where(lengths > 0, lengths, 1.0)
             
-        except Exception as e:
-            logger.error(f"類似語計算エラー: {e}")
-            return []
+            # 入力した語を除いても candidate_count 件残るよう多めに検索
+            extra = max(len(p) + len(n) for p, n in (queries[i] for i in missing))
+            top_indices, top_scores = self.index.search(matrix, candidate_count + extra)
+            SIMILARITY_SEARCH_SECONDS.observe(time.perf_counter() - started, source=self.index.kind)
+            SIMILARITY_SEARCH_QUERIES.inc(len(missing), source=self.index.kind)
+            
+            for row, i in enumerate(missing):
+                inputs = list(set(queries[i][0]) | set(queries[i][1]))
+                keep = ~np.isin(top_indices[row], inputs)
+                results[i] = (
+                    top_indices[row][keep][:candidate_count],
+                    top_scores[row][keep][:candidate_count]
+                )
+                self.neighbor_cache.put((queries[i], candidate_count), results[i])
+        
+        return results
+    
+    def _most_similar_batch(
+        self,
+        indices: np.ndarray,
+        k: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        クエリ単語群のコサイン類似度上位k件を一括計算（クエリ単語自身は除外）
+        
+        近傍テーブルがあり k がテーブルのK以下なら、埋め込み行列に触れずに引く。
+        
+        Returns:
+            (語彙インデックス, 類似度) いずれも形状 (クエリ数, k)、類似度降順
+        """
+        started = time.perf_counter()
+        if self.neighbor_table is not None and k <= self.neighbor_table.k:
+            source = "neighbor_table"
+            result = self.neighbor_table.lookup(indices, k)
+        else:
+            source = self.index.kind
+            norms = self.model.norms
+            queries = self.model.vectors[indices] / norms[indices, None]
+            result = self.index.search(queries, k, exclude=indices)
+        
+        SIMILARITY_SEARCH_SECONDS.observe(time.perf_counter() - started, source=source)
+        SIMILARITY_SEARCH_QUERIES.inc(len(indices), source=source)
+        return result
     
     async def get_generations(
         self,
         keyword: str,
         generation: int,
-        threshold: float = 0.5
+        threshold: float = 0.5,
+        seed: Optional[int] = None,
+        unique: bool = False,
+        stats: Optional[Dict[str, int]] = None,
+        positive: Optional[List[str]] = None,
+        negative: Optional[List[str]] = None
     ) -> List[Generation]:
-        """世代数に応じた連想語を取得"""
-        if not self.contains_word(keyword):
-            raise ValueError(f"キーワード '{keyword}' がモデルに存在しません")
-        
-        generations = []
+        """
+        世代数に応じた連想語を取得
         
-        # 第2世代: 入力キーワードから6個取得
-        gen2_results = await self.get_similar_words(
-            keyword, 
-            topn=6, 
-            threshold=threshold
+        seed を指定すると木全体のランダム選択が再現可能になる。
+        unique・stats・positive・negative については iter_generations_batch を参照。
+        """
+        results = await self.get_generations_batch(
+            [
+                AssociationRequest(
+                    keyword=keyword,
+                    generation=generation,
+                    threshold=threshold,
+                    seed=seed,
+                    unique=unique,
+                    positive=positive or [],
+                    negative=negative or []
+                )
+            ],
+            stats=[stats] if stats is not None else None
         )
+        return results[0]
+    
+    async def iter_generations(
+        self,
+        keyword: str,
+        generation: int,
+        threshold: float = 0.5,
+        seed: Optional[int] = None,
+        unique: bool = False,
+        stats: Optional[Dict[str, int]] = None,
+        positive: Optional[List[str]] = None,
+        negative: Optional[List[str]] = None
+    ) -> AsyncIterator[Generation]:
+        """世代別連想語を計算された順に1つずつ返す（ストリーミング用）"""
+        request = AssociationRequest(
+            keyword=keyword,
+            generation=generation,
+            threshold=threshold,
+            seed=seed,
+            unique=unique,
+            positive=positive or [],
+            negative=negative or []
+        )
+        async for level in self.iter_generations_batch([request], stats=[stats] if stats is not None else None):
+            for gen in level[0]:
+                yield gen
+    
+    async def get_generations_batch(
+        self,
+        requests: List[AssociationRequest],
+        stats: Optional[List[Dict[str, int]]] = None
+    ) -> List[List[Generation]]:
+        """複数キーワードの世代別連想語をまとめて取得"""
+        results = [[] for _ in requests]
+        async for level in self.iter_generations_batch(requests, stats=stats):
+            for generations, new_generations in zip(results, level):
+                generations.extend(new_generations)
+        return results
+    
+    async def iter_generations_batch(
+        self,
+        requests: List[AssociationRequest],
+        stats: Optional[List[Dict[str, int]]] = None
+    ) -> AsyncIterator[List[List[Generation]]]:
+        """
+        複数キーワードの世代別連想語を世代ごとに Generation として返す
         
-        generations.append(Generation(
-            generation_number=2,
-            parent_word=keyword,
-            results=gen2_results,
-            count=len(gen2_results)
-        ))
+        展開の詳細は iter_generation_nodes を参照。
+        """
+        async for level in self.iter_generation_nodes(requests, stats=stats):
+            yield [[self.to_generation(node) for node in nodes] for nodes in level]
+    
+    async def get_generation_payloads(
+        self,
+        requests: List[AssociationRequest],
+        stats: Optional[List[Dict[str, int]]] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """複数キーワードの世代別連想語を Generation と同じ形の辞書としてまとめて取得（レスポンス出力用）"""
+        results = [[] for _ in requests]
+        async for level in self.iter_generation_nodes(requests, stats=stats):
+            for generations, nodes in zip(results, level):
+                generations.extend(self.generation_payload(node) for node in nodes)
+        return results
+    
+    def display_word(self, index: int) -> str:
+        """語彙インデックスを出力用の表記（括弧除去）に変換"""
+        return self._clean_word(self.model.index_to_key[index])
+    
+    def generation_payload(self, node: GenerationNode) -> Dict[str, Any]:
+        """
+        ノードを Generation と同じ形の辞書に変換
         
-        # 第3世代以降: 前世代の各単語から3個ずつ取得
-        current_gen_words = [r.word for r in gen2_results]
+        語の文字列はここで初めて作る。値はエンジンが生成したもので検証済みのため、
+        pydanticモデルを経由せずにそのままJSONへ変換できる。
+        """
+        index_to_key = self.model.index_to_key
+        clean = self._clean_word
+        parent = node.parent if isinstance(node.parent, str) else clean(index_to_key[node.parent])
+        return {
+            "generation_number": node.generation_number,
+            "parent_word": parent,
+            "results": [
+                {"word": clean(index_to_key[i]), "similarity": score}
+                for i, score in zip(node.indices.tolist(), node.scores.tolist())
+            ],
+            "count": len(node.indices)
+        }
+    
+    def to_generation(self, node: GenerationNode) -> Generation:
+        """ノードを Generation に変換（検証済みの値のため検証を省略）"""
+        payload = self.generation_payload(node)
+        payload["results"] = [AssociationResult.model_construct(**r) for r in payload["results"]]
+        return Generation.model_construct(**payload)
+    
+    async def iter_generation_nodes(
+        self,
+        requests: List[AssociationRequest],
+        stats: Optional[List[Dict[str, int]]] = None
+    ) -> AsyncIterator[List[List[GenerationNode]]]:
+        """
+        複数キーワードの世代別連想語を世代ごとに返す
+        
+        全キーワードの同じ世代の親単語をまとめ、世代ごとに1回のベクトル演算で展開する。
+        1世代分の展開が終わるたびに、キーワードごとの新しい GenerationNode リストを yield する。
+        呼び出し側が反復を止めると、それ以降の世代は計算されない。
+        
+        展開は語彙インデックスと類似度の配列のまま行い、語の文字列は作らない
+        （括弧付きの語は転送表で次世代に展開する語へ置き換える）。
+        
+        第2世代: 入力キーワードから6個取得
+        第3世代以降: 前世代の各単語から3個ずつ取得
+        
+        request.positive / request.negative を指定した木では、第2世代をキーワードと
+        加える語の和から差し引く語を引いたクエリベクトルから取得し、親はクエリの表記となる。
+        
+        request.unique が有効な木では、既に木に現れた語（入力キーワードを含む）を候補から
+        除外するため、各語は木の中で高々1回しか展開されない。stats を指定すると、
+        リクエストごとの辞書に既出のため展開を省いた語の数（saved_expansions）が書き込まれる。
+        """
+        for request in requests:
+            for word in request.query_words():
+                if not self.contains_word(word):
+                    raise ValueError(f"キーワード '{word}' がモデルに存在しません")
         
-        for gen_num in range(3, generation + 1):
-            next_gen_results = []
+        redirects = self.redirects
+        trees = [
+            {
+                "request": request,
+                "rng": random.Random(request.seed) if request.seed is not None else None,
+                # 組み合わせクエリの第2世代はクエリの表記を親とする
+                "parents": [
+                    request.query_label() if request.is_combined() else self.resolve_word(request.keyword)
+                ],
+                # unique 指定時に木に現れた語（既出判定用、次世代で展開する語彙インデックス）。
+                # 候補は括弧除去後の語と比較するため、クエリの語も転送表で同じ語に揃えて登録する
+                "seen": {
+                    redirects.get(index, index)
+                    for index in map(self.resolve_word, request.query_words())
+                } if request.unique else None,
+                "saved": 0
+            }
+            for request in requests
+        ]
+        max_generation = max((r.generation for r in requests), default=1)
+        
+        for gen_num in range(2, max_generation + 1):
+            topn = 6 if gen_num == 2 else 3
+            active = [
+                t for t in trees
+                if gen_num <= t["request"].generation and t["parents"]
+            ]
+            if not active:
+                break
             
-            # 前世代の各単語から連想語を取得
-            for parent_word in current_gen_words:
-                if self.contains_word(parent_word):
-                    similar = await self.get_similar_words(
-                        parent_word,
-                        topn=3,
-                        threshold=threshold
-                    )
+            # 全ての木の親単語をまとめて1回のベクトル演算で展開
+            level_started = time.perf_counter()
+            combined = [t for t in active if gen_num == 2 and t["request"].is_combined()]
+            combined_ids = {id(tree) for tree in combined}
+            expanded = sum(len(tree["parents"]) for tree in active)
+            raw_candidates: Dict[Any, Tuple[np.ndarray, np.ndarray]] = await self._fetch_index_candidates(
+                [p for tree in active if id(tree) not in combined_ids for p in tree["parents"]],
+                topn * self.CANDIDATE_MULTIPLIER
+            )
+            if combined:
+                # 組み合わせクエリは1つのクエリベクトルとしてまとめて検索
+                combined_candidates = await self._fetch_combined_candidates(
+                    [tree["request"] for tree in combined],
+                    topn * self.CANDIDATE_MULTIPLIER
+                )
+                for tree, raw in zip(combined, combined_candidates):
+                    if raw is not None:
+                        raw_candidates[tree["parents"][0]] = raw
+            
+            level = {id(tree): [] for tree in active}
+            saved_before = sum(tree["saved"] for tree in active)
+            for tree in active:
+                next_parents = []
+                request = tree["request"]
+                rng = tree["rng"] or random
+                seen = tree["seen"]
+                
+                for parent in tree["parents"]:
+                    raw = raw_candidates.get(parent)
+                    if raw is None:
+                        indices, scores = _EMPTY_INDICES, _EMPTY_SCORES
+                    else:
+                        # 閾値でフィルタリング
+                        keep = raw[1] >= request.threshold
+                        indices, scores = raw[0][keep], raw[1][keep]
+                    targets = [redirects.get(i, i) for i in indices.tolist()]
+                    
+                    positions = range(len(targets))
+                    if seen is not None:
+                        # 既出の語（括弧除去後に重複する語を含む）を除外
+                        fresh, fresh_targets = [], set()
+                        for position, target in enumerate(targets):
+                            if target not in seen and target not in fresh_targets:
+                                fresh.append(position)
+                                fresh_targets.add(target)
+                        if len(fresh) < len(targets) and gen_num < request.generation:
+                            tree["saved"] += self._count_skipped_expansions(targets, fresh, topn, rng)
+                        positions = fresh
+                    
+                    # フィルタリング後の候補から指定数をランダムに選択
+                    if len(positions) > topn:
+                        positions = [positions[i] for i in rng.sample(range(len(positions)), topn)]
+                    chosen = list(positions)
+                    if seen is not None:
+                        seen.update(targets[p] for p in chosen)
                     
-                    if similar:
-                        generations.append(Generation(
-                            generation_number=gen_num,
-                            parent_word=parent_word,
-                            results=similar,
-                            count=len(similar)
+                    # 第2世代は結果が空でも入力キーワードの世代として返す
+                    if chosen or gen_num == 2:
+                        level[id(tree)].append(GenerationNode(
+                            gen_num,
+                            request.query_label() if gen_num == 2 else parent,
+                            indices[chosen],
+                            scores[chosen]
                         ))
-                        
-                        # 次世代の親候補として追加
-                        next_gen_results.extend([r.word for r in similar])
+                    
+                    # 次世代の親候補として追加（表記が空の語は展開しない）
+                    next_parents.extend(targets[p] for p in chosen if targets[p] >= 0)
+                
+                # 次の世代の親単語を更新（なくなった木はここで終了）
+                tree["parents"] = next_parents
             
-            # 次の世代の親単語を更新
-            current_gen_words = next_gen_results
+            generation_label = str(gen_num)
+            GENERATION_LEVEL_SECONDS.observe(time.perf_counter() - level_started, generation=generation_label)
+            EXPANSIONS_TOTAL.inc(expanded, generation=generation_label)
+            GENERATED_WORDS_TOTAL.inc(
+                sum(len(node.indices) for nodes in level.values() for node in nodes), generation=generation_label
+            )
+            saved = sum(tree["saved"] for tree in active) - saved_before
+            if saved:
+                SAVED_EXPANSIONS_TOTAL.inc(saved, generation=generation_label)
+            if stats is not None:
+                for tree, tree_stats in zip(trees, stats):
+                    if tree["seen"] is not None:
+                        tree_stats["saved_expansions"] = tree["saved"]
             
-            # 親単語がなくなった場合は終了
-            if not current_gen_words:
-                break
+            yield [level.get(id(tree), []) for tree in trees]
+    
+    @staticmethod
+    def _count_skipped_expansions(targets: List[int], fresh: List[int], topn: int, rng) -> int:
+        """
+        unique を指定しなければ選ばれ、次世代で再び展開されていた既出の語の数
         
-        return generations
+        除外前の候補から同じ乱数状態で選んだ場合の結果と比べる（rng の状態は進めない）。
+        """
+        if len(targets) > topn:
+            shadow = random.Random()
+            shadow.setstate(rng.getstate())
+            would_choose = shadow.sample(range(len(targets)), topn)
+        else:
+            would_choose = range(len(targets))
+        fresh = set(fresh)
+        return sum(1 for p in would_choose if p not in fresh and targets[p] >= 0)
     
     async def _download_model_from_s3(self) -> bool:
-        """S3からモデルファイルをダウンロード"""
+        """S3からモデルファイルをダウンロード（並列Range取得・再開・SHA-256検証）"""
         model_info = self.s3_config["models"]["entity_vector.model.bin"]
-        url = model_info["url"]
-        local_path = Path(model_info["local_path"])
-        local_path.parent.mkdir(parents=True, exist_ok=True)
+        download_config = self.s3_config["download"]
         
-        max_retries = self.s3_config["download"]["max_retries"]
+        logger.info(f"S3からダウンロード開始: {model_info['url']}")
+        downloader = RangeDownloader(
+            url=model_info["url"],
+            path=model_info["local_path"],
+            sha256=model_info["sha256"],
+            connections=download_config["connections"],
+            segment_size=download_config["segment_size"],
+            chunk_size=download_config["chunk_size"],
+            max_retries=download_config["max_retries"],
+            timeout_seconds=download_config["timeout_seconds"]
+        )
+        self.downloader = downloader
         
-        for attempt in range(max_retries):
-            try:
-                logger.info(f"S3からダウンロード開始 (試行 {attempt + 1}/{max_retries}): {url}")
-                
-                async with aiohttp.ClientSession(
-                    timeout=aiohttp.ClientTimeout(
-                        total=self.s3_config["download"]["timeout_seconds"]
-                    )
-                ) as session:
-                    async with session.get(url) as response:
-                        response.raise_for_status()
-                        
-                        # サイズ検証
-                        content_length = int(response.headers.get('content-length', 0))
-                        expected_size = model_info.get("size")
-                        if expected_size and content_length != expected_size:
-                            logger.warning(f"ファイルサイズが期待値と異なります: {content_length} vs {expected_size}")
-                        
-                        # ストリーミングダウンロード
-                        with open(local_path, 'wb') as f:
-                            downloaded = 0
-                            chunk_size = self.s3_config["download"]["chunk_size"]
-                            
-                            async for chunk in response.content.iter_chunked(chunk_size):
-                                f.write(chunk)
-                                downloaded += len(chunk)
-                                
-                                # プログレス表示（10MB毎）
-                                if downloaded % (1024 * 1024 * 10) == 0:
-                                    if content_length > 0:
-                                        progress = (downloaded / content_length) * 100
-                                        logger.info(f"ダウンロード進捗: {progress:.1f}% ({downloaded:,} / {content_length:,} bytes)")
-                        
-                        logger.info(f"✓ モデルファイルのダウンロード完了: {local_path}")
-                        return True
-                        
-            except Exception as e:
-                logger.warning(f"ダウンロード試行 {attempt + 1}/{max_retries} 失敗: {e}")
-                if attempt < max_retries - 1:
-                    await asyncio.sleep(2 ** attempt)  # 指数バックオフ
-                    if local_path.exists():
-                        local_path.unlink()  # 不完全なファイルを削除
+        if await downloader.download():
+            return True
         
         logger.error(f"✗ S3からのダウンロードに失敗しました（全試行終了）")
         return False
@@ -0,0 +1,14 @@
+"""
+Word2Vec モデル管理クラス（大規模）
+頻度上位500,000語に語彙を絞ったモデルで連想語を取得
+"""
+
+from w2v_model import Word2VecModel
+
+
+class Word2VecModelLarge(Word2VecModel):
+    """Word2Vecモデル管理クラス（大規模: 上位500,000語）"""
+    
+    MODEL_NAME = "entity_vector.large"
+    MODEL_TYPE = "word2vec-large"
+    VOCAB_LIMIT = 500000
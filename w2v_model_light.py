@@ -0,0 +1,14 @@
+"""
+Word2Vec モデル管理クラス（軽量版）
+頻度上位50,000語に語彙を絞ったモデルで連想語を取得
+"""
+
+from w2v_model import Word2VecModel
+
+
+class Word2VecModelLight(Word2VecModel):
+    """Word2Vecモデル管理クラス（軽量版: 上位50,000語）"""
+    
+    MODEL_NAME = "entity_vector.light"
+    MODEL_TYPE = "word2vec-light"
+    VOCAB_LIMIT = 50000
@@ -0,0 +1,14 @@
+"""
+Word2Vec モデル管理クラス（中程度）
+頻度上位200,000語に語彙を絞ったモデルで連想語を取得
+"""
+
+from w2v_model import Word2VecModel
+
+
+class Word2VecModelMedium(Word2VecModel):
+    """Word2Vecモデル管理クラス（中程度: 上位200,000語）"""
+    
+    MODEL_NAME = "entity_vector.medium"
+    MODEL_TYPE = "word2vec-medium"
+    VOCAB_LIMIT = 200000